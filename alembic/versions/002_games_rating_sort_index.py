@@ -0,0 +1,25 @@
+"""Add stable sort index for keyset pagination
+
+Revision ID: 002
+Revises: 001
+Create Date: 2026-10-17 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '002'
+down_revision = '001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_games_rating_sort',
+        'games',
+        [sa.text('coalesce(rating, -1.0) DESC'), sa.text('id DESC')],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_games_rating_sort', table_name='games')
@@ -0,0 +1,46 @@
+"""Add trigram and full-text search indexes for game names
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-17 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = '003'
+down_revision = '002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.add_column(
+        'games',
+        sa.Column(
+            'search_vector',
+            postgresql.TSVECTOR(),
+            sa.Computed("to_tsvector('simple', coalesce(name, ''))", persisted=True),
+            nullable=True,
+        ),
+    )
+    op.create_index(
+        'ix_games_name_trgm',
+        'games',
+        ['name'],
+        postgresql_using='gin',
+        postgresql_ops={'name': 'gin_trgm_ops'},
+    )
+    op.create_index(
+        'ix_games_search_vector',
+        'games',
+        ['search_vector'],
+        postgresql_using='gin',
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_games_search_vector', table_name='games')
+    op.drop_index('ix_games_name_trgm', table_name='games')
+    op.drop_column('games', 'search_vector')
@@ -0,0 +1,93 @@
+"""Normalize platforms, genres and tags into dictionaries with link tables
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-17 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '004'
+down_revision = '003'
+branch_labels = None
+depends_on = None
+
+# (справочник, таблица связей, колонка связи, старая таблица)
+DICTIONARIES = [
+    ('platforms', 'game_platform_links', 'platform_id', 'game_platforms'),
+    ('genres', 'game_genre_links', 'genre_id', 'game_genres'),
+    ('tags', 'game_tag_links', 'tag_id', 'game_tags'),
+]
+
+
+def upgrade() -> None:
+    for dictionary, links, fk, legacy in DICTIONARIES:
+        op.create_table(
+            dictionary,
+            sa.Column('id', sa.Integer(), primary_key=True, autoincrement=False),
+            sa.Column('name', sa.String(length=128), nullable=False),
+        )
+        op.create_index(f'ix_{dictionary}_name_lower', dictionary, [sa.text('lower(name)')])
+
+        op.create_table(
+            links,
+            sa.Column(
+                'game_id',
+                sa.String(length=64),
+                sa.ForeignKey('games.id', ondelete='CASCADE'),
+                primary_key=True,
+            ),
+            sa.Column(
+                fk,
+                sa.Integer(),
+                sa.ForeignKey(f'{dictionary}.id', ondelete='CASCADE', onupdate='CASCADE'),
+                primary_key=True,
+            ),
+        )
+        op.create_index(f'ix_{links}_{fk}', links, [fk, 'game_id'])
+
+        # RAWG id старых записей неизвестны: временные отрицательные id
+        # заменятся настоящими при следующей синхронизации игры
+        op.execute(
+            f"""
+            INSERT INTO {dictionary} (id, name)
+            SELECT -row_number() OVER (ORDER BY name), name
+            FROM (SELECT DISTINCT name FROM {legacy}) AS names
+            """
+        )
+        op.execute(
+            f"""
+            INSERT INTO {links} (game_id, {fk})
+            SELECT DISTINCT l.game_id, d.id
+            FROM {legacy} AS l
+            JOIN {dictionary} AS d ON d.name = l.name
+            WHERE l.game_id IS NOT NULL
+            """
+        )
+        op.drop_table(legacy)
+
+    op.create_index('ix_game_screenshots_game_id', 'game_screenshots', ['game_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_game_screenshots_game_id', table_name='game_screenshots')
+
+    for dictionary, links, fk, legacy in reversed(DICTIONARIES):
+        op.create_table(
+            legacy,
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column(
+                'game_id', sa.String(length=64), sa.ForeignKey('games.id', ondelete='CASCADE')
+            ),
+            sa.Column('name', sa.String(length=128), nullable=False),
+        )
+        op.execute(
+            f"""
+            INSERT INTO {legacy} (game_id, name)
+            SELECT l.game_id, d.name
+            FROM {links} AS l
+            JOIN {dictionary} AS d ON d.id = l.{fk}
+            """
+        )
+        op.drop_table(links)
+        op.drop_table(dictionary)
@@ -0,0 +1,20 @@
+"""Index games.updated_at for catalog version lookups
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-17 00:00:00
+"""
+from alembic import op
+
+revision = '005'
+down_revision = '004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_games_updated_at', 'games', ['updated_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_games_updated_at', table_name='games')
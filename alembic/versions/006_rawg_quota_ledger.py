@@ -0,0 +1,30 @@
+"""RAWG request quota ledger
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-17 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '006'
+down_revision = '005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'rawg_quota',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('purpose', sa.String(length=32), nullable=False),
+        sa.Column('requests', sa.Integer(), nullable=False),
+        sa.Column('failed', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('recorded_at', sa.DateTime(timezone=True), nullable=False),
+    )
+    op.create_index('ix_rawg_quota_recorded_at', 'rawg_quota', ['recorded_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_rawg_quota_recorded_at', table_name='rawg_quota')
+    op.drop_table('rawg_quota')
@@ -0,0 +1,56 @@
+"""Background sync runs with checkpoints
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-17 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = '007'
+down_revision = '006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'sync_runs',
+        sa.Column('id', sa.String(length=36), primary_key=True),
+        sa.Column('status', sa.String(length=16), nullable=False),
+        sa.Column('start_page', sa.Integer(), nullable=False),
+        sa.Column('pages', sa.Integer(), nullable=False),
+        sa.Column('page_size', sa.Integer(), nullable=False),
+        sa.Column('load_details', sa.Boolean(), nullable=False, server_default=sa.false()),
+        sa.Column('details_limit', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('cache_mode', sa.String(length=16), nullable=True),
+        sa.Column('checkpoint_page', sa.Integer(), nullable=False),
+        sa.Column('resumed_from', sa.Integer(), nullable=False),
+        sa.Column('total_synced', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('new_games', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('updated_games', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('details_loaded', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('details_failed', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('requests_used', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('budget_exhausted', sa.Boolean(), nullable=False, server_default=sa.false()),
+        sa.Column('cancel_requested', sa.Boolean(), nullable=False, server_default=sa.false()),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('owner', sa.String(length=255), nullable=True),
+        sa.Column(
+            'stages',
+            postgresql.JSONB(astext_type=sa.Text()),
+            nullable=False,
+            server_default=sa.text("'{}'::jsonb"),
+        ),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('started_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index('ix_sync_runs_status', 'sync_runs', ['status'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_sync_runs_status', table_name='sync_runs')
+    op.drop_table('sync_runs')
@@ -0,0 +1,44 @@
+"""Delta sync: high-water marks and sync run mode
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-17 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '008'
+down_revision = '007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'sync_state',
+        sa.Column('name', sa.String(length=64), primary_key=True),
+        sa.Column('high_water_mark', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+    )
+    op.add_column(
+        'sync_runs',
+        sa.Column('mode', sa.String(length=16), nullable=False, server_default='full'),
+    )
+    op.add_column('sync_runs', sa.Column('dates', sa.String(length=32), nullable=True))
+    op.add_column('sync_runs', sa.Column('since', sa.DateTime(timezone=True), nullable=True))
+    op.add_column(
+        'sync_runs', sa.Column('high_water_mark', sa.DateTime(timezone=True), nullable=True)
+    )
+    op.add_column(
+        'sync_runs',
+        sa.Column('caught_up', sa.Boolean(), nullable=False, server_default=sa.false()),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('sync_runs', 'caught_up')
+    op.drop_column('sync_runs', 'high_water_mark')
+    op.drop_column('sync_runs', 'since')
+    op.drop_column('sync_runs', 'dates')
+    op.drop_column('sync_runs', 'mode')
+    op.drop_table('sync_state')
@@ -0,0 +1,27 @@
+"""Game content fingerprint for skipping no-op sync writes
+
+Revision ID: 009
+Revises: 008
+Create Date: 2026-10-17 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '009'
+down_revision = '008'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Заполняется при следующей синхронизации игры
+    op.add_column('games', sa.Column('content_hash', sa.String(length=64), nullable=True))
+    op.add_column(
+        'sync_runs',
+        sa.Column('unchanged_games', sa.Integer(), nullable=False, server_default='0'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('sync_runs', 'unchanged_games')
+    op.drop_column('games', 'content_hash')
@@ -0,0 +1,33 @@
+"""Transactional outbox for game events
+
+Revision ID: 010
+Revises: 009
+Create Date: 2026-10-17 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = '010'
+down_revision = '009'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'event_outbox',
+        sa.Column('id', sa.BigInteger(), primary_key=True, autoincrement=True),
+        sa.Column('event_type', sa.String(length=64), nullable=False),
+        sa.Column('payload', postgresql.JSONB(), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('available_at', sa.DateTime(timezone=True), nullable=False),
+    )
+    op.create_index('ix_event_outbox_available_at', 'event_outbox', ['available_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_event_outbox_available_at', table_name='event_outbox')
+    op.drop_table('event_outbox')
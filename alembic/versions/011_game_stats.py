@@ -0,0 +1,33 @@
+"""Per-game comment counters
+
+Revision ID: 011
+Revises: 010
+Create Date: 2026-10-17 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '011'
+down_revision = '010'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'game_stats',
+        sa.Column(
+            'game_id',
+            sa.String(length=64),
+            sa.ForeignKey('games.id', ondelete='CASCADE'),
+            primary_key=True,
+        ),
+        sa.Column('comment_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+    )
+    op.create_index('ix_game_stats_updated_at', 'game_stats', ['updated_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_game_stats_updated_at', table_name='game_stats')
+    op.drop_table('game_stats')
@@ -0,0 +1,21 @@
+"""Dead-letter state for event_outbox rows
+
+Revision ID: 012
+Revises: 011
+Create Date: 2026-10-17 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '012'
+down_revision = '011'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('event_outbox', sa.Column('failed_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('event_outbox', 'failed_at')
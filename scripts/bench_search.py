@@ -0,0 +1,118 @@
+"""
+Бенчмарк поиска по названию игр на большом каталоге.
+
+Заполняет БД синтетическими играми (id с префиксом bench-) и замеряет
+latency SQLGameRepository.list_games/count_games для каждого режима поиска.
+Перед запуском примените миграции (make migrate). Запускать на отдельной БД:
+
+    uv run python scripts/bench_search.py --database-url postgresql+asyncpg://... --rows 500000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+
+from game_service.repo.sql.repositories import SQLGameRepository  # noqa: E402
+
+WORDS = (
+    "dark souls grand theft auto legend zelda witcher wild hunt space station cyber punk "
+    "shadow empire galaxy racing football tactics dragon quest final fantasy battle royale "
+    "farm simulator escape dungeon knight hollow city builder"
+).split()
+
+# asyncpg передает параметры без типа: массив и границы приводим явно,
+# иначе Postgres не выберет перегрузку cardinality/generate_series
+SEED_SQL = """
+WITH w AS (SELECT CAST(:words AS text[]) AS a)
+INSERT INTO games (id, rawg_id, slug, name, rating, created_at, updated_at)
+SELECT
+    'bench-' || i,
+    1000000000 + i,
+    'bench-' || i,
+    initcap(
+        w.a[1 + (random() * (cardinality(w.a) - 1))::int] || ' ' ||
+        w.a[1 + (random() * (cardinality(w.a) - 1))::int] || ' ' ||
+        w.a[1 + (random() * (cardinality(w.a) - 1))::int]
+    ) || ' ' || i,
+    round((random() * 5)::numeric, 2),
+    now(),
+    now()
+FROM w, generate_series(CAST(:start AS integer), CAST(:stop AS integer)) AS i
+ON CONFLICT DO NOTHING
+"""
+
+QUERIES = ["souls", "grand theft", "witcher hunt", "dragn quest", "zeld"]
+
+
+async def seed(session_factory, rows: int) -> None:
+    async with session_factory() as session:
+        existing = (
+            await session.execute(text("SELECT count(*) FROM games WHERE id LIKE 'bench-%'"))
+        ).scalar_one()
+        if existing >= rows:
+            print(f"Seed: {existing} bench rows already present")
+            return
+        print(f"Seed: inserting {rows - existing} rows...")
+        chunk = 50_000
+        for start in range(existing + 1, rows + 1, chunk):
+            stop = min(start + chunk - 1, rows)
+            await session.execute(text(SEED_SQL), {"words": WORDS, "start": start, "stop": stop})
+            await session.commit()
+        await session.execute(text("ANALYZE games"))
+        await session.commit()
+
+
+async def measure(session_factory, mode: str, search: str, repeats: int) -> list[float]:
+    timings = []
+    async with session_factory() as session:
+        repo = SQLGameRepository(session)
+        for _ in range(repeats):
+            started = time.perf_counter()
+            await repo.list_games(search=search, search_mode=mode, limit=20)
+            await repo.count_games(search=search, search_mode=mode)
+            timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+async def cleanup(session_factory) -> None:
+    async with session_factory() as session:
+        await session.execute(text("DELETE FROM games WHERE id LIKE 'bench-%'"))
+        await session.commit()
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--database-url", required=True)
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--cleanup", action="store_true", help="Удалить bench-строки после замера")
+    args = parser.parse_args()
+
+    engine = create_async_engine(args.database_url)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    try:
+        await seed(session_factory, args.rows)
+        print(f"{'mode':<10} {'query':<14} {'p50, ms':>9} {'p95, ms':>9}")
+        for mode in ("substring", "fulltext", "fuzzy"):
+            for search in QUERIES:
+                timings = sorted(await measure(session_factory, mode, search, args.repeats))
+                p95 = timings[max(0, int(len(timings) * 0.95) - 1)]
+                print(f"{mode:<10} {search:<14} {statistics.median(timings):>9.1f} {p95:>9.1f}")
+        if args.cleanup:
+            await cleanup(session_factory)
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,156 @@
+"""
+Бенчмарк записи игр синхронизацией: сколько SQL-запросов и записанных строк
+стоит upsert одной игры и пачки игр.
+
+Создает синтетические игры (id с префиксом bench-, по умолчанию 20 тегов и
+10 скриншотов у каждой) и прогоняет сценарии: вставка новых игр, повторная
+запись тех же данных, мелкое изменение (рейтинг, один тег, один скриншот).
+Запросы считаются событиями before_cursor_execute/after_cursor_execute движка.
+Чтобы сравнить "до" и "после", запустите скрипт на обеих ревизиях. Перед
+запуском примените миграции (make migrate). Запускать на отдельной БД:
+
+    uv run python scripts/bench_upsert.py --database-url postgresql+asyncpg://... --games 200
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import sys
+import time
+from dataclasses import replace
+from pathlib import Path
+
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+
+from game_service.domain.models import Game, Genre, Platform, Screenshot, Tag  # noqa: E402
+from game_service.repo.sql.repositories import SQLGameRepository  # noqa: E402
+
+# Диапазоны id, которые не пересекаются с настоящими данными RAWG
+BENCH_RAWG_ID = 2_000_000_000
+BENCH_DICTIONARY_ID = 1_900_000_000
+
+
+class StatementCounter:
+    """Считает запросы и строки, измененные INSERT/UPDATE/DELETE"""
+
+    def __init__(self, engine):
+        self.statements = 0
+        self.rows_written = 0
+        event.listen(engine.sync_engine, "before_cursor_execute", self._before)
+        event.listen(engine.sync_engine, "after_cursor_execute", self._after)
+
+    def reset(self) -> None:
+        self.statements = 0
+        self.rows_written = 0
+
+    def _before(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements += 1
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().split(None, 1)[0].upper() in ("INSERT", "UPDATE", "DELETE"):
+            self.rows_written += max(cursor.rowcount or 0, 0)
+
+
+def make_game(i: int, tags: int, screenshots: int) -> Game:
+    rawg_id = BENCH_RAWG_ID + i
+    return Game(
+        id=f"bench-{i}",
+        rawg_id=rawg_id,
+        slug=f"bench-{i}",
+        name=f"Bench Game {i}",
+        description="Synthetic game for bench_upsert.py",
+        rating=round((i % 50) / 10, 2),
+        platforms=[
+            Platform(id=BENCH_DICTIONARY_ID + k, name=f"bench platform {k}") for k in range(3)
+        ],
+        genres=[Genre(id=BENCH_DICTIONARY_ID + k, name=f"bench genre {k}") for k in range(2)],
+        tags=[
+            Tag(id=BENCH_DICTIONARY_ID + (i + k) % 100, name=f"bench tag {(i + k) % 100}")
+            for k in range(tags)
+        ],
+        screenshots=[
+            Screenshot(id=0, game_id=f"bench-{i}", url=f"https://bench.local/{i}/{k}.jpg")
+            for k in range(screenshots)
+        ],
+    )
+
+
+def small_change(game: Game) -> Game:
+    """Новый рейтинг, один тег заменен, один скриншот заменен"""
+    new_tag = Tag(id=BENCH_DICTIONARY_ID + 100, name="bench tag changed")
+    new_shot = Screenshot(id=0, game_id=game.id, url=f"https://bench.local/{game.id}/new.jpg")
+    return replace(
+        game,
+        rating=(game.rating or 0) + 0.01,
+        tags=[*game.tags[1:], new_tag],
+        screenshots=[*game.screenshots[1:], new_shot],
+    )
+
+
+async def run_single(session_factory, counter, name: str, games: list[Game]) -> None:
+    counter.reset()
+    started = time.perf_counter()
+    async with session_factory() as session:
+        repo = SQLGameRepository(session)
+        for game in games:
+            await repo.upsert_game(game)
+    report(name, counter, time.perf_counter() - started, len(games))
+
+
+async def run_batch(session_factory, counter, name: str, games: list[Game]) -> None:
+    counter.reset()
+    started = time.perf_counter()
+    async with session_factory() as session:
+        await SQLGameRepository(session).upsert_many(games)
+    report(name, counter, time.perf_counter() - started, len(games))
+
+
+def report(name: str, counter: StatementCounter, seconds: float, games: int) -> None:
+    print(
+        f"{name:<26} {counter.statements / games:>12.1f} {counter.rows_written / games:>12.1f} "
+        f"{seconds * 1000 / games:>10.2f}"
+    )
+
+
+async def cleanup(session_factory) -> None:
+    async with session_factory() as session:
+        await session.execute(text("DELETE FROM games WHERE id LIKE 'bench-%'"))
+        for table in ("platforms", "genres", "tags"):
+            await session.execute(
+                text(f"DELETE FROM {table} WHERE id >= :start"), {"start": BENCH_DICTIONARY_ID}
+            )
+        await session.commit()
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--database-url", required=True)
+    parser.add_argument("--games", type=int, default=200)
+    parser.add_argument("--tags", type=int, default=20)
+    parser.add_argument("--screenshots", type=int, default=10)
+    args = parser.parse_args()
+
+    engine = create_async_engine(args.database_url)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    counter = StatementCounter(engine)
+    games = [make_game(i, args.tags, args.screenshots) for i in range(args.games)]
+    changed = [small_change(game) for game in games]
+    try:
+        await cleanup(session_factory)
+        print(f"{'scenario (per game)':<26} {'statements':>12} {'rows written':>12} {'ms':>10}")
+        await run_single(session_factory, counter, "upsert_game: insert", games)
+        await run_single(session_factory, counter, "upsert_game: unchanged", games)
+        await run_single(session_factory, counter, "upsert_game: small change", changed)
+        await run_batch(session_factory, counter, "upsert_many: unchanged", changed)
+        await run_batch(session_factory, counter, "upsert_many: small change", games)
+    finally:
+        await cleanup(session_factory)
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
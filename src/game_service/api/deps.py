@@ -6,8 +6,15 @@ from fastapi import Depends, Request
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
 from game_service.clients.rawg_client import RAWGClient
+from game_service.clients.response_cache import RAWGResponseCache
 from game_service.core.config import Settings
 from game_service.services.game_service import GameAppService
+from game_service.services.detail_hydrator import DetailDemand
+from game_service.services.dictionaries import DictionaryCache
+from game_service.services.facets import FacetIndex
+from game_service.services.game_cache import GameDetailCache
+from game_service.services.rawg_budget import RAWGBudget
+from game_service.services.sync_jobs import SyncJobManager
 from game_service.repo.sql.repositories import SQLGameRepository
 from game_service.mq.publisher import EventPublisher
 
@@ -35,14 +42,22 @@ def get_game_repository(
     return SQLGameRepository(session)
 
 
-async def get_rawg_client(
-    settings: Annotated[Settings, Depends(get_settings)],
-) -> AsyncIterator[RAWGClient]:
-    client = RAWGClient(settings.rawg_base_url, settings.rawg_api_key)
-    try:
-        yield client
-    finally:
-        await client.close()
+def get_rawg_budget(request: Request) -> RAWGBudget:
+    budget = getattr(request.app.state, "rawg_budget", None)
+    if not budget:
+        raise RuntimeError("RAWG request budget is not initialized")
+    return budget
+
+
+def get_rawg_cache(request: Request) -> RAWGResponseCache | None:
+    return getattr(request.app.state, "rawg_cache", None)
+
+
+def get_rawg_client(request: Request) -> RAWGClient:
+    client = getattr(request.app.state, "rawg_client", None)
+    if not client:
+        raise RuntimeError("RAWG client is not initialized")
+    return client
 
 
 def get_event_publisher(request: Request) -> EventPublisher:
@@ -52,15 +67,72 @@ def get_event_publisher(request: Request) -> EventPublisher:
     return publisher
 
 
+def get_game_cache(request: Request) -> GameDetailCache | None:
+    return getattr(request.app.state, "game_cache", None)
+
+
+def get_facet_index(request: Request) -> FacetIndex | None:
+    return getattr(request.app.state, "facet_index", None)
+
+
+def get_dictionary_cache(request: Request) -> DictionaryCache:
+    dictionaries = getattr(request.app.state, "dictionaries", None)
+    if not dictionaries:
+        raise RuntimeError("Dictionary cache is not initialized")
+    return dictionaries
+
+
+def get_detail_demand(request: Request) -> DetailDemand | None:
+    return getattr(request.app.state, "detail_demand", None)
+
+
+def get_sync_jobs(request: Request) -> SyncJobManager:
+    jobs = getattr(request.app.state, "sync_jobs", None)
+    if not jobs:
+        raise RuntimeError("Sync job manager is not initialized")
+    return jobs
+
+
 def get_game_service(
+    game_repo: Annotated[SQLGameRepository, Depends(get_game_repository)],
+    settings: Annotated[Settings, Depends(get_settings)],
+    event_publisher: Annotated[EventPublisher, Depends(get_event_publisher)],
+    game_cache: Annotated[GameDetailCache | None, Depends(get_game_cache)],
+    facet_index: Annotated[FacetIndex | None, Depends(get_facet_index)],
+    dictionaries: Annotated[DictionaryCache, Depends(get_dictionary_cache)],
+    detail_demand: Annotated[DetailDemand | None, Depends(get_detail_demand)],
+) -> GameAppService:
+    """Сервис для чтения каталога - без клиента RAWG"""
+    return GameAppService(
+        game_repo=game_repo,
+        rawg_client=None,
+        settings=settings,
+        event_publisher=event_publisher,
+        game_cache=game_cache,
+        facet_index=facet_index,
+        dictionaries=dictionaries,
+        detail_demand=detail_demand,
+    )
+
+
+def get_sync_game_service(
     game_repo: Annotated[SQLGameRepository, Depends(get_game_repository)],
     rawg_client: Annotated[RAWGClient, Depends(get_rawg_client)],
     settings: Annotated[Settings, Depends(get_settings)],
     event_publisher: Annotated[EventPublisher, Depends(get_event_publisher)],
+    game_cache: Annotated[GameDetailCache | None, Depends(get_game_cache)],
+    facet_index: Annotated[FacetIndex | None, Depends(get_facet_index)],
+    dictionaries: Annotated[DictionaryCache, Depends(get_dictionary_cache)],
+    detail_demand: Annotated[DetailDemand | None, Depends(get_detail_demand)],
 ) -> GameAppService:
+    """Сервис для синхронизации из RAWG - с общим клиентом RAWG приложения"""
     return GameAppService(
         game_repo=game_repo,
         rawg_client=rawg_client,
         settings=settings,
         event_publisher=event_publisher,
+        game_cache=game_cache,
+        facet_index=facet_index,
+        dictionaries=dictionaries,
+        detail_demand=detail_demand,
     )
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Iterable, Optional
+
+from fastapi import Request, Response
+
+from game_service.core.config import Settings
+
+
+def make_etag(*parts: object) -> str:
+    """Сильный ETag: хэш от версии ресурса и всего, что влияет на тело ответа"""
+    raw = "|".join("" if part is None else str(part) for part in parts)
+    return '"' + hashlib.sha256(raw.encode()).hexdigest()[:32] + '"'
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime]) -> bool:
+    """
+    Проверка условного запроса (RFC 9110): If-None-Match приоритетнее
+    If-Modified-Since, который учитывается только без If-None-Match.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in candidates or etag in candidates
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError, IndexError):
+            # Неразборчивый заголовок игнорируется
+            return False
+        if since is None:
+            return False
+        # "-0000" и дата без зоны дают naive datetime - по RFC это UTC.
+        # В заголовке точность до секунды
+        return _as_utc(last_modified).replace(microsecond=0) <= _as_utc(since)
+    return False
+
+
+def set_cache_headers(
+    response: Response,
+    settings: Settings,
+    etag: str,
+    last_modified: Optional[datetime],
+    surrogate_keys: Iterable[str] = (),
+) -> None:
+    response.headers["ETag"] = etag
+    if last_modified:
+        response.headers["Last-Modified"] = format_datetime(_as_utc(last_modified), usegmt=True)
+    response.headers["Cache-Control"] = (
+        f"public, max-age={settings.http_cache_max_age}, "
+        f"stale-while-revalidate={settings.http_cache_stale_while_revalidate}"
+    )
+    keys = " ".join(surrogate_keys)
+    if keys:
+        # Ключи для точечной очистки кэша CDN/прокси (Fastly, Varnish xkey)
+        response.headers["Surrogate-Key"] = keys
+
+
+def not_modified(
+    settings: Settings,
+    etag: str,
+    last_modified: Optional[datetime],
+    surrogate_keys: Iterable[str] = (),
+) -> Response:
+    response = Response(status_code=304)
+    set_cache_headers(response, settings, etag, last_modified, surrogate_keys)
+    return response
+
+
+def _as_utc(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
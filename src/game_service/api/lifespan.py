@@ -1,37 +1,112 @@
 import asyncio
 from contextlib import asynccontextmanager
-from typing import AsyncIterator
+from typing import AsyncIterator, List
 
+import httpx
 from fastapi import FastAPI
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
+from game_service.clients.rawg_client import RAWGClient
+from game_service.clients.response_cache import RAWGResponseCache
 from game_service.core.config import Settings
 from game_service.core.db import init_engine, init_session_factory, close_engine
 from game_service.core.logging import get_logger
+from game_service.domain.events import GameStatsUpdatedEvent
 from game_service.mq.consumer import EventConsumer
 from game_service.mq.publisher import EventPublisher
+from game_service.repo.sql.repositories import SQLGameRepository
+from game_service.services.comment_stats import CommentStatsAggregator
+from game_service.services.detail_hydrator import DetailDemand, DetailHydrator
+from game_service.services.dictionaries import DictionaryCache
+from game_service.services.facets import FacetDocument, FacetIndex
+from game_service.services.game_cache import GameDetailCache
+from game_service.services.game_service import GameAppService
+from game_service.services.outbox_relay import OutboxRelay
+from game_service.services.rawg_budget import RAWGBudget
+from game_service.services.sync_jobs import SyncJobManager
 
 log = get_logger(__name__)
 
 
-async def handle_comment_deleted(event_data: dict):
-    """Обработчик события удаления комментария - можно использовать для обновления статистики"""
-    try:
-        entity_id = event_data.get("entity_id")
-        entity_type = event_data.get("entity_type")
+def build_comment_stats_handler(aggregator: CommentStatsAggregator):
+    """
+    Обработчик comment_created и comment_deleted: учитывает комментарий в счетчике игры.
+    Возвращает future записи пачки - consumer подтвердит сообщение после нее.
+    """
 
-        if entity_type != "game":
-            return
+    async def handle_comment_event(event_data: dict):
+        if event_data.get("entity_type") != "game":
+            return None
 
+        entity_id = event_data.get("entity_id")
+        event_type = event_data.get("event_type")
         if not entity_id:
-            log.warning(f"Invalid event data for comment_deleted: {event_data}")
+            log.warning(f"Invalid event data for {event_type}: {event_data}")
+            return None
+
+        delta = 1 if event_type == "comment_created" else -1
+        log.debug(f"Comment counter of game {entity_id} changed by {delta}")
+        return aggregator.record(str(entity_id), delta)
+
+    return handle_comment_event
+
+
+def build_comment_stats_flushed(game_cache: GameDetailCache, publisher: EventPublisher):
+    """
+    Сброс карточек игр с записанными счетчиками комментариев: в кэше этой реплики сразу,
+    в остальных - по broadcast-событию game_stats_updated.
+    """
+
+    async def on_flushed(game_ids: List[str]):
+        for game_id in game_ids:
+            game_cache.invalidate(game_id)
+        unconfirmed = await publisher.publish_many([GameStatsUpdatedEvent(game_ids=game_ids)])
+        if unconfirmed:
+            # Другие реплики отдадут прежний счетчик не дольше GAME_CACHE_TTL
+            log.warning(f"game_stats_updated for {len(game_ids)} games not confirmed by broker")
+
+    return on_flushed
+
+
+def build_game_stats_handler(game_cache: GameDetailCache):
+    """Обработчик game_stats_updated: сбрасывает карточки игр в кэше этой реплики"""
+
+    async def handle_game_stats_updated(event_data: dict):
+        for game_id in event_data.get("game_ids") or []:
+            game_cache.invalidate(game_id)
+
+    return handle_game_stats_updated
+
+
+def build_game_synced_handler(
+    game_cache: GameDetailCache,
+    facet_index: FacetIndex,
+    dictionaries: DictionaryCache,
+    session_factory: async_sessionmaker[AsyncSession],
+):
+    """
+    Обработчик game_synced и game_updated: сбрасывает карточку игры в кэше этой реплики,
+    обновляет игру в индексе фасетов и помечает справочники устаревшими.
+    """
+
+    async def handle_game_synced(event_data: dict):
+        game_id = event_data.get("game_id")
+        slug = event_data.get("slug")
+        if not game_id and not slug:
+            log.warning(f"Invalid event data for {event_data.get('event_type')}: {event_data}")
             return
+        game_cache.invalidate(game_id, slug)
+        dictionaries.mark_stale()
+        log.debug(f"Game cache invalidated for {game_id or slug}")
 
-        # Здесь можно добавить логику обновления статистики игры
-        # Например, обновление счетчика комментариев
-        log.debug(f"Comment deleted for game {entity_id}")
+        if facet_index.ready and game_id:
+            # В событии нет id справочников, поэтому берем игру из БД
+            async with session_factory() as session:
+                game = await SQLGameRepository(session).get_by_id(game_id)
+            if game:
+                facet_index.upsert(FacetDocument.from_game(game))
 
-    except Exception as e:
-        log.error(f"Error handling comment_deleted event: {e}")
+    return handle_game_synced
 
 
 async def start_consumer(consumer: EventConsumer):
@@ -50,6 +125,10 @@ def build_lifespan(settings: Settings):
         # --- Startup ---
         log.info("Starting service...", extra={"app": settings.app_name, "env": settings.env})
         consumer_task = None
+        budget_task = None
+        hydrator_task = None
+        relay_task = None
+        comment_stats_task = None
 
         try:
             # DB engine & session factory
@@ -80,18 +159,164 @@ def build_lifespan(settings: Settings):
             app.state.session_factory = sf
             log.info("Database connection initialized successfully")
 
+            # Бюджет запросов к RAWG - один на процесс, общий для всех клиентов
+            rawg_budget = RAWGBudget(
+                sf,
+                budget=settings.rawg_request_budget,
+                reserve=settings.rawg_budget_reserve,
+                period=settings.rawg_budget_period,
+                rate=settings.rawg_rate_limit,
+                burst=settings.rawg_rate_burst,
+                flush_interval=settings.rawg_budget_flush_interval,
+            )
+            await rawg_budget.load()
+            budget_task = asyncio.create_task(rawg_budget.run())
+            app.state.rawg_budget = rawg_budget
+            log.info("RAWG request budget loaded", extra={"used": rawg_budget.used})
+
+            # Кэш ответов RAWG на диске - общий для всех клиентов процесса
+            rawg_cache = None
+            if settings.rawg_cache_mode != "off":
+                rawg_cache = RAWGResponseCache(
+                    settings.rawg_cache_path,
+                    ttls={
+                        "list": settings.rawg_cache_ttl_list,
+                        "search": settings.rawg_cache_ttl_search,
+                        "game": settings.rawg_cache_ttl_game,
+                        "screenshots": settings.rawg_cache_ttl_screenshots,
+                    },
+                )
+                app.state.rawg_cache = rawg_cache
+
+            # Один клиент RAWG на процесс: пул соединений и TLS-сессии живут между запросами
+            rawg_client = RAWGClient(
+                settings.rawg_base_url,
+                settings.rawg_api_key,
+                timeout=settings.rawg_timeout,
+                budget=rawg_budget,
+                cache=rawg_cache,
+                cache_mode=settings.rawg_cache_mode,
+                limits=httpx.Limits(
+                    max_connections=settings.rawg_max_connections,
+                    max_keepalive_connections=settings.rawg_max_keepalive_connections,
+                    keepalive_expiry=settings.rawg_keepalive_expiry,
+                ),
+                http2=settings.rawg_http2,
+            )
+            app.state.rawg_client = rawg_client
+
+            game_cache = GameDetailCache(
+                maxsize=settings.game_cache_size, ttl=settings.game_cache_ttl
+            )
+            app.state.game_cache = game_cache
+
+            dictionaries = DictionaryCache(sf)
+            app.state.dictionaries = dictionaries
+
+            facet_index = FacetIndex()
+            app.state.facet_index = facet_index
+            try:
+                async with sf() as session:
+                    await facet_index.load(SQLGameRepository(session))
+                log.info("Facet index built", extra={"games": len(facet_index)})
+            except Exception as e:
+                # Сервис работает и без фасетов, /games/facets ответит 503
+                log.error(f"Failed to build facet index: {e}")
+
             # Initialize event publisher
             publisher = EventPublisher(settings)
             await publisher.connect()
             app.state.event_publisher = publisher
             log.info("Event publisher initialized successfully")
 
+            # События игр пишутся в event_outbox вместе с играми, в брокер их отправляет relay
+            if settings.event_outbox_enabled:
+                relay = OutboxRelay(
+                    sf,
+                    publisher,
+                    batch_size=settings.outbox_relay_batch_size,
+                    interval=settings.outbox_relay_interval,
+                    retry_delay=settings.outbox_retry_delay,
+                    max_attempts=settings.outbox_max_attempts,
+                )
+                relay_task = asyncio.create_task(relay.run())
+                app.state.outbox_relay = relay
+                log.info("Outbox relay started")
+
+            detail_demand = None
+            if settings.detail_hydration_enabled:
+                detail_demand = DetailDemand(
+                    half_life=settings.detail_demand_half_life,
+                    max_games=settings.detail_demand_max_games,
+                )
+                app.state.detail_demand = detail_demand
+
+            @asynccontextmanager
+            async def game_service_scope() -> AsyncIterator[GameAppService]:
+                # Фоновым задачам нужна своя сессия: сессия запроса закрывается с ответом
+                async with sf() as session:
+                    yield GameAppService(
+                        game_repo=SQLGameRepository(session),
+                        rawg_client=rawg_client,
+                        settings=settings,
+                        event_publisher=publisher,
+                        game_cache=game_cache,
+                        facet_index=facet_index,
+                        dictionaries=dictionaries,
+                        detail_demand=detail_demand,
+                    )
+
+            sync_jobs = SyncJobManager(
+                sf,
+                game_service_scope,
+                owner=settings.hostname,
+                heartbeat_interval=settings.sync_job_heartbeat_interval,
+                stale_after=settings.sync_job_stale_after,
+            )
+            app.state.sync_jobs = sync_jobs
+            resumed = await sync_jobs.resume_interrupted()
+            log.info("Sync job manager started", extra={"resumed_jobs": resumed})
+
+            # Детали игр, которые открывают без описания, догружаются в фоне по спросу
+            if detail_demand:
+                hydrator = DetailHydrator(
+                    detail_demand,
+                    game_service_scope,
+                    rawg_budget,
+                    interval=settings.detail_hydration_interval,
+                    batch_size=settings.detail_hydration_batch_size,
+                    min_score=settings.detail_demand_min_score,
+                )
+                hydrator_task = asyncio.create_task(hydrator.run())
+                app.state.detail_hydrator = hydrator
+
+            # Счетчики комментариев пишутся пачками; записанные игры сбрасываются из кэшей реплик
+            comment_stats = CommentStatsAggregator(
+                sf,
+                flush_interval=settings.comment_stats_flush_interval_ms / 1000,
+                # Больше consumer_prefetch неподтвержденных событий брокер не выдаст
+                max_batch=min(settings.comment_stats_max_batch, settings.consumer_prefetch),
+                on_flushed=build_comment_stats_flushed(game_cache, publisher),
+            )
+            comment_stats_task = asyncio.create_task(comment_stats.run())
+            app.state.comment_stats = comment_stats
+
             # Initialize event consumer
             consumer = EventConsumer(settings)
             await consumer.connect()
 
             # Регистрируем обработчики событий
-            consumer.register_handler("comment_deleted", handle_comment_deleted)
+            comment_stats_handler = build_comment_stats_handler(comment_stats)
+            consumer.register_handler("comment_created", comment_stats_handler)
+            consumer.register_handler("comment_deleted", comment_stats_handler)
+            game_synced_handler = build_game_synced_handler(
+                game_cache, facet_index, dictionaries, sf
+            )
+            consumer.register_handler("game_synced", game_synced_handler, broadcast=True)
+            consumer.register_handler("game_updated", game_synced_handler, broadcast=True)
+            consumer.register_handler(
+                "game_stats_updated", build_game_stats_handler(game_cache), broadcast=True
+            )
 
             # Запускаем consumer в фоновой задаче
             consumer_task = asyncio.create_task(start_consumer(consumer))
@@ -114,6 +339,17 @@ def build_lifespan(settings: Settings):
             log.info("Shutting down service...")
             app.state.ready = False
 
+            # Незавершенные задачи синхронизации остаются running и продолжатся после рестарта
+            if hasattr(app.state, "sync_jobs"):
+                await app.state.sync_jobs.shutdown()
+
+            if hydrator_task:
+                hydrator_task.cancel()
+                try:
+                    await hydrator_task
+                except asyncio.CancelledError:
+                    pass
+
             # Останавливаем consumer
             if hasattr(app.state, "consumer_task") and app.state.consumer_task:
                 app.state.consumer_task.cancel()
@@ -126,11 +362,46 @@ def build_lifespan(settings: Settings):
                 await app.state.consumer.close()
                 log.info("Event consumer closed")
 
+            # Неподтвержденные события брокер выдаст заново, поэтому остаток не пишем
+            if comment_stats_task:
+                comment_stats_task.cancel()
+                try:
+                    await comment_stats_task
+                except asyncio.CancelledError:
+                    pass
+                app.state.comment_stats.close()
+
+            if hasattr(app.state, "rawg_client"):
+                await app.state.rawg_client.close()
+
+            # Сохраняем в журнал расход запросов к RAWG, накопленный с последней записи
+            if budget_task:
+                budget_task.cancel()
+                try:
+                    await budget_task
+                except asyncio.CancelledError:
+                    pass
+                try:
+                    await app.state.rawg_budget.flush()
+                except Exception as e:
+                    log.error(f"Failed to flush RAWG quota ledger: {e}")
+
+            # Неотправленные события остаются в event_outbox до следующего запуска
+            if relay_task:
+                relay_task.cancel()
+                try:
+                    await relay_task
+                except asyncio.CancelledError:
+                    pass
+
             # Close event publisher
             if hasattr(app.state, "event_publisher"):
                 await app.state.event_publisher.close()
                 log.info("Event publisher closed")
 
+            if getattr(app.state, "rawg_cache", None):
+                app.state.rawg_cache.close()
+
             # Close DB engine
             await close_engine(engine)
 
@@ -1,48 +1,147 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 
+from game_service.clients.response_cache import ResponseCacheMissError
+from game_service.domain.models import SyncRun
 from game_service.dtos.http import (
+    GameBatchRequest,
+    GameBatchResponse,
     GameDetailResponse,
+    GameFacetsResponse,
     GameListResponse,
     GameQuery,
     SyncGameRequest,
     SyncBatchRequest,
-    SyncBatchResponse,
+    SyncBudgetResponse,
+    SyncJobListResponse,
+    SyncJobResponse,
 )
 from game_service.services.game_service import GameAppService
+from game_service.services.cursors import InvalidCursorError
+from game_service.services.facets import FacetIndexNotReadyError
+from game_service.services.rawg_budget import BudgetExceededError, RAWGBudget
+from game_service.services.sync_jobs import (
+    SyncJobManager,
+    SyncJobNotFoundError,
+    SyncJobStateError,
+)
 from game_service.api.deps import (
     get_game_service,
+    get_rawg_budget,
+    get_settings,
+    get_sync_game_service,
+    get_sync_jobs,
 )
+from game_service.api.http_cache import is_not_modified, make_etag, not_modified, set_cache_headers
+from game_service.core.config import Settings
 from game_service.core.logging import get_logger
 
 log = get_logger(__name__)
 
 games_router = APIRouter(prefix="/games", tags=["Games"])
 
+# Surrogate-Key всех страниц списка: очищается в CDN после синхронизации
+LIST_SURROGATE_KEY = "games-list"
+
 
 @games_router.get("/", response_model=GameListResponse)
 async def list_games(
+    request: Request,
+    response: Response,
     query: GameQuery = Depends(),
     game_service: GameAppService = Depends(get_game_service),
+    settings: Settings = Depends(get_settings),
 ):
     try:
+        # Версия страницы - время последнего изменения каталога и параметры запроса
+        last_modified = await game_service.catalog_version()
+        etag = make_etag("games", last_modified, query.model_dump_json())
+        if is_not_modified(request, etag, last_modified):
+            return not_modified(settings, etag, last_modified, [LIST_SURROGATE_KEY])
+
         result = await game_service.list_games(query)
+        set_cache_headers(response, settings, etag, last_modified, [LIST_SURROGATE_KEY])
         return result
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         log.error(f"Error in list_games: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 
+@games_router.get("/facets", response_model=GameFacetsResponse)
+async def get_facets(
+    query: GameQuery = Depends(),
+    game_service: GameAppService = Depends(get_game_service),
+):
+    """
+    Количество игр для каждого жанра, платформы, возрастного рейтинга и года
+    с учетом тех же фильтров, что и у списка игр.
+    """
+    try:
+        return await game_service.get_facets(query)
+    except FacetIndexNotReadyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        log.error(f"Error in get_facets: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+
+@games_router.post("/batch", response_model=GameBatchResponse)
+async def get_games_batch(
+    payload: GameBatchRequest,
+    game_service: GameAppService = Depends(get_game_service),
+):
+    """
+    Массовое получение игр по id, slug или RAWG id (до 500 ключей) одним запросом к БД.
+    Ненайденные ключи возвращаются в missing.
+    """
+    try:
+        return await game_service.get_games_batch(payload)
+    except Exception as e:
+        log.error(f"Error in get_games_batch: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+
+@games_router.get("/sync/budget", response_model=SyncBudgetResponse)
+async def get_sync_budget(budget: RAWGBudget = Depends(get_rawg_budget)):
+    """
+    Расход бюджета запросов к RAWG за текущий период: сколько осталось всего
+    и сколько доступно массовой синхронизации (за вычетом резерва).
+    """
+    try:
+        return SyncBudgetResponse(**budget.snapshot())
+    except Exception as e:
+        log.error(f"Error in get_sync_budget: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+
 @games_router.get("/{game_id}", response_model=GameDetailResponse)
 async def get_game(
     game_id: str,
+    request: Request,
+    response: Response,
     game_service: GameAppService = Depends(get_game_service),
+    settings: Settings = Depends(get_settings),
 ):
     try:
+        # Условный запрос проверяем по версии игры, не загружая карточку
+        if "if-none-match" in request.headers or "if-modified-since" in request.headers:
+            version = await game_service.get_game_version(game_id)
+            if version:
+                version_id, _, updated_at, comment_count = version
+                # Счетчик комментариев меняется без updated_at игры
+                etag = make_etag("game", version_id, updated_at, comment_count)
+                if is_not_modified(request, etag, updated_at):
+                    keys = [f"game-{version_id}"]
+                    return not_modified(settings, etag, updated_at, keys)
+
         game = await game_service.get_game(game_id)
         if not game:
             raise HTTPException(status_code=404, detail="Game not found")
+        etag = make_etag("game", game.id, game.updated_at, game.comment_count)
+        set_cache_headers(response, settings, etag, game.updated_at, [f"game-{game.id}"])
         return game
     except HTTPException:
         raise
@@ -54,27 +153,69 @@ async def get_game(
 @games_router.post("/sync", response_model=GameDetailResponse)
 async def sync_game(
     payload: SyncGameRequest,
-    game_service: GameAppService = Depends(get_game_service),
+    game_service: GameAppService = Depends(get_sync_game_service),
 ):
     try:
         if not payload.is_valid:
             raise HTTPException(status_code=400, detail="rawg_slug or rawg_id is required")
-        game = await game_service.sync_game(rawg_id=payload.rawg_id, slug=payload.rawg_slug)
+        game = await game_service.sync_game(
+            rawg_id=payload.rawg_id, slug=payload.rawg_slug, cache_mode=payload.cache_mode
+        )
         return game
     except HTTPException:
         raise
+    except BudgetExceededError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    except ResponseCacheMissError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         log.error(f"Error in sync_game: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 
-@games_router.post("/sync/batch", response_model=SyncBatchResponse)
+def _job_response(run: SyncRun) -> SyncJobResponse:
+    return SyncJobResponse(
+        id=run.id,
+        status=run.status,
+        start_page=run.start_page,
+        last_page=run.last_page,
+        page_size=run.page_size,
+        load_details=run.load_details,
+        details_limit=run.details_limit,
+        cache_mode=run.cache_mode,
+        mode=run.mode,
+        dates=run.dates,
+        since=run.since,
+        high_water_mark=run.high_water_mark,
+        caught_up=run.caught_up,
+        checkpoint_page=run.checkpoint_page,
+        pages_done=run.pages_done,
+        pages_total=run.pages,
+        total_synced=run.total_synced,
+        new_games=run.new_games,
+        updated_games=run.updated_games,
+        unchanged_games=run.unchanged_games,
+        details_loaded=run.details_loaded,
+        details_failed=run.details_failed,
+        requests_used=run.requests_used,
+        budget_exhausted=run.budget_exhausted,
+        cancel_requested=run.cancel_requested,
+        error=run.error,
+        eta_seconds=SyncJobManager.eta_seconds(run),
+        stages=run.stages or {},
+        created_at=run.created_at,
+        started_at=run.started_at,
+        finished_at=run.finished_at,
+    )
+
+
+@games_router.post("/sync/batch", response_model=SyncJobResponse, status_code=202)
 async def sync_games_batch(
     payload: SyncBatchRequest,
-    game_service: GameAppService = Depends(get_game_service),
+    jobs: SyncJobManager = Depends(get_sync_jobs),
 ):
     """
-    Массовая синхронизация игр из RAWG API.
+    Массовая синхронизация игр из RAWG API - запускается фоновой задачей.
 
     Стратегия оптимизации запросов:
     - Использует дешевый запрос list_games (1 запрос на страницу)
@@ -83,16 +224,80 @@ async def sync_games_batch(
 
     Пример: синхронизация 10 страниц по 40 игр = 10 запросов, ~400 игр в базе.
     Если load_details=True и details_limit=100, дополнительно 200 запросов для деталей.
+
+    mode=delta - инкрементальное обновление: только игры, изменившиеся в RAWG с
+    прошлой delta-синхронизации; pages - верхняя граница обхода.
+
+    Возвращает задачу (202); прогресс - GET /games/sync/jobs/{id}. Синхронизация
+    не расходует резерв бюджета (RAWG_BUDGET_RESERVE): дойдя до него, задача
+    останавливается со статусом stopped и может быть продолжена позже.
     """
     try:
-        result = await game_service.sync_games_batch(
+        run = await jobs.submit(
             start_page=payload.start_page,
             pages=payload.pages,
             page_size=payload.page_size,
             load_details=payload.load_details,
             details_limit=payload.details_limit,
+            cache_mode=payload.cache_mode,
+            mode=payload.mode,
+            dates=payload.dates,
         )
-        return SyncBatchResponse(**result)
+        return _job_response(run)
     except Exception as e:
         log.error(f"Error in sync_games_batch: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+
+@games_router.get("/sync/jobs", response_model=SyncJobListResponse)
+async def list_sync_jobs(
+    limit: int = Query(default=20, ge=1, le=100),
+    jobs: SyncJobManager = Depends(get_sync_jobs),
+):
+    """Последние задачи массовой синхронизации"""
+    try:
+        runs = await jobs.list_recent(limit)
+        return SyncJobListResponse(items=[_job_response(run) for run in runs])
+    except Exception as e:
+        log.error(f"Error in list_sync_jobs: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+
+@games_router.get("/sync/jobs/{job_id}", response_model=SyncJobResponse)
+async def get_sync_job(job_id: str, jobs: SyncJobManager = Depends(get_sync_jobs)):
+    """Прогресс задачи: страницы, записанные игры, потраченные запросы и ETA"""
+    try:
+        return _job_response(await jobs.get(job_id))
+    except SyncJobNotFoundError:
+        raise HTTPException(status_code=404, detail="Sync job not found")
+    except Exception as e:
+        log.error(f"Error in get_sync_job: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+
+@games_router.post("/sync/jobs/{job_id}/cancel", response_model=SyncJobResponse)
+async def cancel_sync_job(job_id: str, jobs: SyncJobManager = Depends(get_sync_jobs)):
+    """Отменить задачу; записанное до контрольной точки сохраняется"""
+    try:
+        return _job_response(await jobs.cancel(job_id))
+    except SyncJobNotFoundError:
+        raise HTTPException(status_code=404, detail="Sync job not found")
+    except SyncJobStateError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        log.error(f"Error in cancel_sync_job: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+
+@games_router.post("/sync/jobs/{job_id}/resume", response_model=SyncJobResponse, status_code=202)
+async def resume_sync_job(job_id: str, jobs: SyncJobManager = Depends(get_sync_jobs)):
+    """Продолжить остановленную, отмененную или упавшую задачу со следующей страницы"""
+    try:
+        return _job_response(await jobs.resume(job_id))
+    except SyncJobNotFoundError:
+        raise HTTPException(status_code=404, detail="Sync job not found")
+    except SyncJobStateError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        log.error(f"Error in resume_sync_job: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
@@ -1,28 +1,46 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 
-from game_service.api.deps import get_session
-from game_service.repo.sql.repositories import SQLGameRepository
+from game_service.api.deps import get_dictionary_cache, get_settings
+from game_service.api.http_cache import is_not_modified, make_etag, not_modified, set_cache_headers
+from game_service.core.config import Settings
 from game_service.core.logging import get_logger
+from game_service.services.dictionaries import DictionaryCache, DictionarySnapshot
 
 log = get_logger(__name__)
 
 genres_router = APIRouter(prefix="/genres", tags=["Genres"])
 
+DICTIONARIES_SURROGATE_KEY = "dictionaries"
+
+
+async def _snapshot(
+    request: Request,
+    dictionaries: DictionaryCache,
+) -> tuple[DictionarySnapshot, str, bool]:
+    """Снимок справочников, его ETag и признак того, что у клиента актуальная версия"""
+    snapshot = await dictionaries.get()
+    etag = make_etag("dictionaries", snapshot.digest)
+    return snapshot, etag, is_not_modified(request, etag, snapshot.built_at)
+
 
 @genres_router.get("/")
 async def list_genres(
-    session: AsyncSession = Depends(get_session),
+    request: Request,
+    response: Response,
+    dictionaries: DictionaryCache = Depends(get_dictionary_cache),
+    settings: Settings = Depends(get_settings),
 ):
     """
     Получить список всех доступных жанров/категорий игр.
     """
     try:
-        repo = SQLGameRepository(session)
-        genres = await repo.list_genres()
-        return {"genres": genres, "total": len(genres)}
+        snapshot, etag, fresh = await _snapshot(request, dictionaries)
+        if fresh:
+            return not_modified(settings, etag, snapshot.built_at, [DICTIONARIES_SURROGATE_KEY])
+        set_cache_headers(response, settings, etag, snapshot.built_at, [DICTIONARIES_SURROGATE_KEY])
+        return {"genres": snapshot.genres, "total": len(snapshot.genres)}
     except Exception as e:
         log.error(f"Error in list_genres: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
@@ -30,15 +48,20 @@ async def list_genres(
 
 @genres_router.get("/platforms")
 async def list_platforms(
-    session: AsyncSession = Depends(get_session),
+    request: Request,
+    response: Response,
+    dictionaries: DictionaryCache = Depends(get_dictionary_cache),
+    settings: Settings = Depends(get_settings),
 ):
     """
     Получить список всех доступных платформ.
     """
     try:
-        repo = SQLGameRepository(session)
-        platforms = await repo.list_platforms()
-        return {"platforms": platforms, "total": len(platforms)}
+        snapshot, etag, fresh = await _snapshot(request, dictionaries)
+        if fresh:
+            return not_modified(settings, etag, snapshot.built_at, [DICTIONARIES_SURROGATE_KEY])
+        set_cache_headers(response, settings, etag, snapshot.built_at, [DICTIONARIES_SURROGATE_KEY])
+        return {"platforms": snapshot.platforms, "total": len(snapshot.platforms)}
     except Exception as e:
         log.error(f"Error in list_platforms: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
@@ -46,7 +69,10 @@ async def list_platforms(
 
 @genres_router.get("/age-ratings")
 async def list_age_ratings(
-    session: AsyncSession = Depends(get_session),
+    request: Request,
+    response: Response,
+    dictionaries: DictionaryCache = Depends(get_dictionary_cache),
+    settings: Settings = Depends(get_settings),
 ):
     """
     Получить список всех доступных возрастных рейтингов (ESRB).
@@ -54,9 +80,38 @@ async def list_age_ratings(
     Примеры рейтингов: "Everyone", "Everyone 10+", "Teen", "Mature", "Adults Only", "Rating Pending"
     """
     try:
-        repo = SQLGameRepository(session)
-        age_ratings = await repo.list_age_ratings()
-        return {"age_ratings": age_ratings, "total": len(age_ratings)}
+        snapshot, etag, fresh = await _snapshot(request, dictionaries)
+        if fresh:
+            return not_modified(settings, etag, snapshot.built_at, [DICTIONARIES_SURROGATE_KEY])
+        set_cache_headers(response, settings, etag, snapshot.built_at, [DICTIONARIES_SURROGATE_KEY])
+        return {"age_ratings": snapshot.age_ratings, "total": len(snapshot.age_ratings)}
     except Exception as e:
         log.error(f"Error in list_age_ratings: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+
+@genres_router.get("/all-filters")
+async def list_all_filters(
+    request: Request,
+    response: Response,
+    dictionaries: DictionaryCache = Depends(get_dictionary_cache),
+    settings: Settings = Depends(get_settings),
+):
+    """
+    Все справочники для фильтров каталога одним запросом: жанры, платформы
+    и возрастные рейтинги. version меняется только при изменении содержимого.
+    """
+    try:
+        snapshot, etag, fresh = await _snapshot(request, dictionaries)
+        if fresh:
+            return not_modified(settings, etag, snapshot.built_at, [DICTIONARIES_SURROGATE_KEY])
+        set_cache_headers(response, settings, etag, snapshot.built_at, [DICTIONARIES_SURROGATE_KEY])
+        return {
+            "version": snapshot.version,
+            "genres": snapshot.genres,
+            "platforms": snapshot.platforms,
+            "age_ratings": snapshot.age_ratings,
+        }
+    except Exception as e:
+        log.error(f"Error in list_all_filters: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
@@ -1,4 +1,4 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Request
 
 from game_service.api.v1.games_router import games_router
 from game_service.api.v1.genres_router import genres_router
@@ -11,3 +11,34 @@ api_v1.include_router(genres_router)
 @api_v1.get("/healthz")
 async def healthz():
     return {"status": "ok"}
+
+
+@api_v1.get("/metrics")
+async def metrics(request: Request):
+    """Внутренние счетчики сервиса"""
+    result = {}
+    game_cache = getattr(request.app.state, "game_cache", None)
+    if game_cache:
+        result["game_cache"] = game_cache.stats()
+    facet_index = getattr(request.app.state, "facet_index", None)
+    if facet_index:
+        result["facet_index"] = {"ready": facet_index.ready, "games": len(facet_index)}
+    rawg_cache = getattr(request.app.state, "rawg_cache", None)
+    if rawg_cache:
+        result["rawg_cache"] = await rawg_cache.stats()
+    event_publisher = getattr(request.app.state, "event_publisher", None)
+    if event_publisher:
+        result["event_publisher"] = event_publisher.stats()
+    consumer = getattr(request.app.state, "consumer", None)
+    if consumer:
+        result["event_consumer"] = consumer.stats()
+    outbox_relay = getattr(request.app.state, "outbox_relay", None)
+    if outbox_relay:
+        result["event_outbox"] = await outbox_relay.stats()
+    detail_hydrator = getattr(request.app.state, "detail_hydrator", None)
+    if detail_hydrator:
+        result["detail_hydration"] = detail_hydrator.stats()
+    comment_stats = getattr(request.app.state, "comment_stats", None)
+    if comment_stats:
+        result["comment_stats"] = comment_stats.stats()
+    return result
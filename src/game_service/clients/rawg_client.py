@@ -1,26 +1,107 @@
 from __future__ import annotations
 
-from typing import Any, Dict, Optional
+import copy
+from typing import TYPE_CHECKING, Any, Dict, Optional
 
 import httpx
 
+from game_service.clients.response_cache import (
+    CacheMode,
+    RAWGResponseCache,
+    ResponseCacheMissError,
+)
+from game_service.core.logging import get_logger
+
+if TYPE_CHECKING:
+    from game_service.services.rawg_budget import RAWGBudget
+
+log = get_logger(__name__)
+
 
 class RAWGClient:
-    """Клиент для работы с RAWG API"""
+    """
+    Клиент для работы с RAWG API.
 
-    def __init__(self, base_url: str, api_key: str, timeout: float = 10.0):
+    Каждый запрос помечается назначением (purpose) и, если передан budget,
+    учитывается в общем бюджете запросов и проходит через его rate limiter.
+    Если передан cache, ответы берутся из кэша на диске и не расходуют бюджет
+    (см. RAWGResponseCache и cache_mode).
+
+    Клиент рассчитан на все время жизни приложения: пул соединений (limits)
+    и TLS-сессии переиспользуются между запросами.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        api_key: str,
+        timeout: float = 10.0,
+        budget: Optional["RAWGBudget"] = None,
+        cache: Optional[RAWGResponseCache] = None,
+        cache_mode: CacheMode = "normal",
+        limits: Optional[httpx.Limits] = None,
+        http2: bool = False,
+    ):
         # Convert AnyHttpUrl to string if needed
         base_url_str = str(base_url).rstrip("/")
         self.base_url = base_url_str
         self.api_key = api_key
         self.timeout = timeout
-        self._client = httpx.AsyncClient(base_url=self.base_url, timeout=timeout)
+        self.budget = budget
+        self.cache = cache
+        self.cache_mode = cache_mode
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                log.warning("HTTP/2 for RAWG requires the h2 package, falling back to HTTP/1.1")
+                http2 = False
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            timeout=timeout,
+            limits=limits or httpx.Limits(),
+            http2=http2,
+        )
 
     async def close(self) -> None:
         await self._client.aclose()
 
+    def with_cache_mode(self, cache_mode: CacheMode) -> "RAWGClient":
+        """Тот же клиент (общие соединения, бюджет и кэш) с другим режимом кэша"""
+        client = copy.copy(self)
+        client.cache_mode = cache_mode
+        return client
+
+    async def _get(self, url: str, params: Dict[str, Any], purpose: str) -> Dict[str, Any]:
+        cache = self.cache if self.cache_mode != "off" else None
+        if cache and self.cache_mode != "refresh":
+            cache_only = self.cache_mode == "cache_only"
+            cached = await cache.get(url, params, allow_stale=cache_only)
+            if cached is not None:
+                return cached
+            if cache_only:
+                raise ResponseCacheMissError(f"RAWG response for {url} is not cached")
+
+        if self.budget:
+            await self.budget.acquire(purpose)
+        try:
+            response = await self._client.get(url, params=params)
+            response.raise_for_status()
+        except Exception:
+            if self.budget:
+                self.budget.record_failure(purpose)
+            raise
+        data = response.json()
+        if cache:
+            await cache.put(url, params, data)
+        return data
+
     async def fetch_game(
-        self, *, slug: Optional[str] = None, rawg_id: Optional[int] = None
+        self,
+        *,
+        slug: Optional[str] = None,
+        rawg_id: Optional[int] = None,
+        purpose: str = "game",
     ) -> Dict[str, Any]:
         if not slug and not rawg_id:
             raise ValueError("slug or rawg_id is required")
@@ -31,12 +112,10 @@ class RAWGClient:
             url = f"/games/{rawg_id}"
 
         params = {"key": self.api_key}
-        response = await self._client.get(url, params=params)
-        response.raise_for_status()
-        return response.json()
+        return await self._get(url, params, purpose)
 
     async def search_games(
-        self, *, search: str, page: int = 1, page_size: int = 20
+        self, *, search: str, page: int = 1, page_size: int = 20, purpose: str = "search"
     ) -> Dict[str, Any]:
         params = {
             "key": self.api_key,
@@ -44,9 +123,7 @@ class RAWGClient:
             "page": page,
             "page_size": page_size,
         }
-        response = await self._client.get("/games", params=params)
-        response.raise_for_status()
-        return response.json()
+        return await self._get("/games", params, purpose)
 
     async def list_games(
         self,
@@ -57,6 +134,7 @@ class RAWGClient:
         dates: Optional[str] = None,  # Фильтр по датам, например "2020-01-01,2024-12-31"
         platforms: Optional[str] = None,  # ID платформ через запятую
         genres: Optional[str] = None,  # ID жанров через запятую
+        purpose: str = "list",
     ) -> Dict[str, Any]:
         """
         Получить список игр из RAWG API (дешевый запрос - 1 запрос на страницу).
@@ -76,12 +154,8 @@ class RAWGClient:
         if genres:
             params["genres"] = genres
 
-        response = await self._client.get("/games", params=params)
-        response.raise_for_status()
-        return response.json()
+        return await self._get("/games", params, purpose)
 
-    async def fetch_screenshots(self, game_id: int) -> Dict[str, Any]:
+    async def fetch_screenshots(self, game_id: int, purpose: str = "screenshots") -> Dict[str, Any]:
         params = {"key": self.api_key}
-        response = await self._client.get(f"/games/{game_id}/screenshots", params=params)
-        response.raise_for_status()
-        return response.json()
+        return await self._get(f"/games/{game_id}/screenshots", params, purpose)
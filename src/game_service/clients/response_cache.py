@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import asyncio
+import gzip
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Literal, Optional
+
+CacheMode = Literal["normal", "cache_only", "refresh", "off"]
+
+# Параметры, которые не входят в ключ кэша
+_IGNORED_PARAMS = frozenset({"key"})
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    endpoint TEXT NOT NULL,
+    path TEXT NOT NULL,
+    params TEXT NOT NULL,
+    body BLOB NOT NULL,
+    fetched_at REAL NOT NULL
+)
+"""
+
+
+class ResponseCacheMissError(LookupError):
+    """В режиме cache_only ответа нет в кэше"""
+
+
+def endpoint_of(path: str, params: Dict[str, Any]) -> str:
+    """Тип запроса RAWG, по нему выбирается TTL: list, search, game, screenshots"""
+    parts = [part for part in path.strip("/").split("/") if part]
+    if parts == ["games"]:
+        return "search" if params.get("search") else "list"
+    if len(parts) == 3 and parts[2] == "screenshots":
+        return "screenshots"
+    return "game"
+
+
+def cache_key(path: str, params: Dict[str, Any]) -> str:
+    """Ключ - хэш пути и параметров без API-ключа"""
+    payload = json.dumps(
+        [path, sorted((k, str(v)) for k, v in params.items() if k not in _IGNORED_PARAMS)]
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class RAWGResponseCache:
+    """
+    Кэш ответов RAWG API на диске (SQLite, тела сжаты gzip).
+
+    TTL задается по типу запроса. Режимы:
+    - normal: свежий ответ из кэша, иначе запрос к RAWG;
+    - cache_only: только кэш, включая устаревшие записи (офлайн-переобработка),
+      при промахе - ResponseCacheMissError;
+    - refresh: всегда запрос к RAWG, ответ перезаписывает кэш;
+    - off: кэш не используется.
+    Работа с SQLite идет в отдельном потоке, чтобы не блокировать event loop.
+    """
+
+    def __init__(self, path: str, ttls: Dict[str, float], default_ttl: float = 3600.0):
+        self.path = path
+        self.ttls = ttls
+        self.default_ttl = default_ttl
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self._lock = threading.Lock()
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(_SCHEMA)
+        self._conn.commit()
+
+    def ttl_for(self, endpoint: str) -> float:
+        return self.ttls.get(endpoint, self.default_ttl)
+
+    async def get(
+        self, path: str, params: Dict[str, Any], *, allow_stale: bool = False
+    ) -> Optional[Dict[str, Any]]:
+        endpoint = endpoint_of(path, params)
+        row = await asyncio.to_thread(self._read, cache_key(path, params))
+        if row is None or (not allow_stale and time.time() - row[1] > self.ttl_for(endpoint)):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(gzip.decompress(row[0]))
+
+    async def put(self, path: str, params: Dict[str, Any], data: Dict[str, Any]) -> None:
+        body = gzip.compress(json.dumps(data).encode())
+        await asyncio.to_thread(
+            self._write,
+            (
+                cache_key(path, params),
+                endpoint_of(path, params),
+                path,
+                json.dumps({k: v for k, v in params.items() if k not in _IGNORED_PARAMS}),
+                body,
+                time.time(),
+            ),
+        )
+        self.stores += 1
+
+    async def stats(self) -> Dict[str, Any]:
+        entries, size = await asyncio.to_thread(self._size)
+        return {
+            "entries": entries,
+            "bytes": size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stores": self.stores,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _size(self) -> tuple:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT count(*), coalesce(sum(length(body)), 0) FROM responses"
+            ).fetchone()
+
+    def _read(self, key: str) -> Optional[tuple]:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT body, fetched_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+
+    def _write(self, row: tuple) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(key, endpoint, path, params, body, fetched_at) VALUES (?, ?, ?, ?, ?, ?)",
+                row,
+            )
+            self._conn.commit()
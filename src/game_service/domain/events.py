@@ -1,15 +1,21 @@
 from __future__ import annotations
 
-from pydantic import BaseModel
-from datetime import datetime
+import uuid
+from pydantic import BaseModel, Field
+from datetime import datetime, timezone
 from typing import Optional, List
 
+from game_service.domain.models import SavedGame
+
 
 class GameEvent(BaseModel):
     """Базовое событие игры"""
 
     event_type: str
-    timestamp: datetime = datetime.utcnow()
+    # Уникален для события и сохраняется при повторной отправке (outbox):
+    # по нему подписчики пропускают повторно доставленные события
+    event_id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    timestamp: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     service: str = "game-service"
 
 
@@ -36,3 +42,33 @@ class GameUpdatedEvent(GameEvent):
     name: str
     slug: str
     changes: dict = {}
+
+
+class GameStatsUpdatedEvent(GameEvent):
+    """Счетчики комментариев игр записаны в БД - реплики сбрасывают их карточки из кэша"""
+
+    event_type: str = "game_stats_updated"
+    game_ids: List[str]
+
+
+def game_saved_event(saved: SavedGame) -> GameEvent:
+    """Новая игра - game_synced, изменившаяся - game_updated со списком изменений"""
+    game = saved.game
+    if saved.status == "inserted":
+        return GameSyncedEvent(
+            game_id=game.id,
+            rawg_id=game.rawg_id,
+            name=game.name,
+            slug=game.slug,
+            platforms=[p.name for p in game.platforms],
+            genres=[g.name for g in game.genres],
+            rating=game.rating,
+            release_date=game.release_date.isoformat() if game.release_date else None,
+        )
+    return GameUpdatedEvent(
+        game_id=game.id,
+        rawg_id=game.rawg_id,
+        name=game.name,
+        slug=game.slug,
+        changes=saved.changes,
+    )
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from dataclasses import dataclass, field
 from datetime import date, datetime
-from typing import List, Optional
+from typing import Any, Dict, List, Literal, Optional
 
 
 @dataclass
@@ -17,6 +17,12 @@ class Genre:
     name: str
 
 
+@dataclass
+class Tag:
+    id: int
+    name: str
+
+
 @dataclass
 class Screenshot:
     id: int
@@ -44,7 +50,156 @@ class Game:
     age_rating: Optional[str] = None
     platforms: List[Platform] = field(default_factory=list)
     genres: List[Genre] = field(default_factory=list)
-    tags: List[str] = field(default_factory=list)
+    tags: List[Tag] = field(default_factory=list)
     screenshots: List[Screenshot] = field(default_factory=list)
+    # Ведет game-service по событиям комментариев, синхронизация его не трогает
+    comment_count: int = 0
+    created_at: datetime = field(default_factory=datetime.utcnow)
+    updated_at: datetime = field(default_factory=datetime.utcnow)
+
+
+# Итог записи игры: inserted - новая, updated - данные изменились, unchanged - совпали
+# с сохраненными (запись пропущена), kept - у игры уже есть детали (keep_details)
+GameWriteStatus = Literal["inserted", "updated", "unchanged", "kept"]
+
+
+@dataclass
+class SavedGame:
+    """Игра после записи синхронизацией; changes - изменения по полям (для updated)"""
+
+    game: Game
+    status: GameWriteStatus
+    changes: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def written(self) -> bool:
+        return self.status in ("inserted", "updated")
+
+
+@dataclass
+class OutboxEvent:
+    """Событие из event_outbox, ожидающее публикации"""
+
+    id: int
+    event_type: str
+    payload: Dict[str, Any]
+    attempts: int = 0
+
+
+@dataclass
+class GameSummary:
+    """Краткая карточка игры для списка (без описания, тегов и скриншотов)"""
+
+    id: str
+    name: str
+    slug: str
+    release_date: Optional[date] = None
+    metacritic: Optional[int] = None
+    rating: Optional[float] = None
+    background_image: Optional[str] = None
+    platforms: List[str] = field(default_factory=list)
+    genres: List[str] = field(default_factory=list)
+    comment_count: int = 0
+
+
+# Режимы поиска по названию:
+# substring - ILIKE '%term%' (ускоряется trigram-индексом), порядок каталога;
+# fulltext - полнотекстовый поиск по словам, сортировка по релевантности с учетом рейтинга;
+# fuzzy - поиск по похожести (опечатки), сортировка по похожести с учетом рейтинга
+SearchMode = Literal["substring", "fulltext", "fuzzy"]
+
+# Как считать total в списке игр:
+# exact - точное количество (в том же запросе, что и страница);
+# estimate - оценка планировщика PostgreSQL, дешево для широких запросов;
+# none - не считать вовсе
+TotalMode = Literal["exact", "estimate", "none"]
+
+# Значение ключа сортировки для игр без рейтинга (такие игры идут в конце списка)
+NULL_RATING_SORT = -1.0
+
+
+@dataclass(frozen=True)
+class PageCursor:
+    """Позиция в списке игр для keyset-пагинации по ключу (rating DESC, id DESC)"""
+
+    rating: float
+    game_id: str
+    backward: bool = False
+
+    @classmethod
+    def after(cls, game: Game | GameSummary) -> "PageCursor":
+        rating = game.rating if game.rating is not None else NULL_RATING_SORT
+        return cls(rating=rating, game_id=game.id)
+
+    @classmethod
+    def before(cls, game: Game | GameSummary) -> "PageCursor":
+        rating = game.rating if game.rating is not None else NULL_RATING_SORT
+        return cls(rating=rating, game_id=game.id, backward=True)
+
+
+SyncRunStatus = Literal["queued", "running", "completed", "failed", "cancelled", "stopped"]
+
+# full - обход каталога по рейтингу; delta - только изменения с прошлой delta-синхронизации
+SyncMode = Literal["full", "delta"]
+
+# Статусы, в которых задача синхронизации больше не выполняется
+SYNC_RUN_FINISHED = frozenset({"completed", "failed", "cancelled", "stopped"})
+
+
+@dataclass
+class SyncRun:
+    """
+    Фоновая задача массовой синхронизации.
+
+    checkpoint_page - последняя страница, до которой (включительно) все страницы
+    записаны вместе с деталями; продолжение начинается со следующей.
+
+    В режиме delta страницы идут по дате обновления в RAWG (сначала свежие):
+    since - отметка прошлой delta-синхронизации, игры не новее нее уже известны;
+    high_water_mark - самая поздняя дата обновления среди загруженных задачей игр;
+    caught_up - задача дошла до известных данных или до конца списка.
+    """
+
+    id: str
+    status: SyncRunStatus
+    start_page: int
+    pages: int
+    page_size: int
+    load_details: bool = False
+    details_limit: int = 0
+    cache_mode: Optional[str] = None
+    mode: SyncMode = "full"
+    dates: Optional[str] = None
+    since: Optional[datetime] = None
+    high_water_mark: Optional[datetime] = None
+    caught_up: bool = False
+    checkpoint_page: int = 0
+    resumed_from: int = 0
+    total_synced: int = 0
+    new_games: int = 0
+    updated_games: int = 0
+    unchanged_games: int = 0
+    details_loaded: int = 0
+    details_failed: int = 0
+    requests_used: int = 0
+    budget_exhausted: bool = False
+    cancel_requested: bool = False
+    error: Optional[str] = None
+    owner: Optional[str] = None
+    stages: Dict[str, Any] = field(default_factory=dict)
     created_at: datetime = field(default_factory=datetime.utcnow)
     updated_at: datetime = field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    @property
+    def last_page(self) -> int:
+        return self.start_page + self.pages - 1
+
+    @property
+    def pages_done(self) -> int:
+        return self.checkpoint_page - self.start_page + 1
+
+    @property
+    def finished(self) -> bool:
+        return self.status in SYNC_RUN_FINISHED
@@ -1,8 +1,18 @@
 from __future__ import annotations
 
-from typing import List, Optional, Protocol
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Protocol, Sequence, Tuple
 
-from game_service.domain.models import Game, Screenshot
+from game_service.domain.models import (
+    Game,
+    GameSummary,
+    OutboxEvent,
+    PageCursor,
+    SavedGame,
+    Screenshot,
+    SearchMode,
+    SyncRun,
+)
 
 
 class GameRepository(Protocol):
@@ -12,8 +22,11 @@ class GameRepository(Protocol):
         self,
         *,
         search: Optional[str] = None,
+        search_mode: SearchMode = "substring",
         platform: Optional[str] = None,
         genre: Optional[str] = None,
+        platform_id: Optional[int] = None,
+        genre_id: Optional[int] = None,
         age_rating: Optional[str] = None,
         year_from: Optional[int] = None,
         year_to: Optional[int] = None,
@@ -21,14 +34,54 @@ class GameRepository(Protocol):
         rating_to: Optional[float] = None,
         limit: int = 20,
         offset: int = 0,
+        cursor: Optional[PageCursor] = None,
     ) -> List[Game]: ...
 
     async def count_games(
         self,
         *,
         search: Optional[str] = None,
+        search_mode: SearchMode = "substring",
         platform: Optional[str] = None,
         genre: Optional[str] = None,
+        platform_id: Optional[int] = None,
+        genre_id: Optional[int] = None,
+        age_rating: Optional[str] = None,
+        year_from: Optional[int] = None,
+        year_to: Optional[int] = None,
+        rating_from: Optional[float] = None,
+        rating_to: Optional[float] = None,
+    ) -> int: ...
+
+    async def list_summaries(
+        self,
+        *,
+        search: Optional[str] = None,
+        search_mode: SearchMode = "substring",
+        platform: Optional[str] = None,
+        genre: Optional[str] = None,
+        platform_id: Optional[int] = None,
+        genre_id: Optional[int] = None,
+        age_rating: Optional[str] = None,
+        year_from: Optional[int] = None,
+        year_to: Optional[int] = None,
+        rating_from: Optional[float] = None,
+        rating_to: Optional[float] = None,
+        limit: int = 20,
+        offset: int = 0,
+        cursor: Optional[PageCursor] = None,
+        with_total: bool = False,
+    ) -> Tuple[List[GameSummary], Optional[int]]: ...
+
+    async def estimate_games(
+        self,
+        *,
+        search: Optional[str] = None,
+        search_mode: SearchMode = "substring",
+        platform: Optional[str] = None,
+        genre: Optional[str] = None,
+        platform_id: Optional[int] = None,
+        genre_id: Optional[int] = None,
         age_rating: Optional[str] = None,
         year_from: Optional[int] = None,
         year_to: Optional[int] = None,
@@ -40,7 +93,24 @@ class GameRepository(Protocol):
 
     async def get_by_slug(self, slug: str) -> Optional[Game]: ...
 
-    async def upsert_game(self, game: Game) -> Game: ...
+    async def get_many(
+        self,
+        *,
+        ids: Sequence[str] = (),
+        slugs: Sequence[str] = (),
+        rawg_ids: Sequence[int] = (),
+        fields: Iterable[str] = (),
+    ) -> List[dict]: ...
+
+    async def get_version(self, identifier: str) -> Optional[Tuple[str, str, datetime, int]]: ...
+
+    async def max_updated_at(self) -> Optional[datetime]: ...
+
+    async def upsert_game(self, game: Game, *, outbox: bool = False) -> SavedGame: ...
+
+    async def upsert_many(
+        self, games: Sequence[Game], *, keep_details: bool = False, outbox: bool = False
+    ) -> List[SavedGame]: ...
 
 
 class ScreenshotRepository(Protocol):
@@ -53,3 +123,60 @@ class ScreenshotRepository(Protocol):
         game_id: str,
         screenshots: List[Screenshot],
     ) -> None: ...
+
+
+class QuotaRepository(Protocol):
+    """Журнал расхода запросов к RAWG API"""
+
+    async def record_usage(
+        self, usage: Dict[str, Tuple[int, int]], recorded_at: Optional[datetime] = None
+    ) -> None: ...
+
+    async def usage_since(self, since: Optional[datetime]) -> Dict[str, Tuple[int, int]]: ...
+
+
+class SyncRunRepository(Protocol):
+    """Фоновые задачи массовой синхронизации"""
+
+    async def add(self, run: SyncRun) -> SyncRun: ...
+
+    async def get(self, run_id: str) -> Optional[SyncRun]: ...
+
+    async def list_recent(self, limit: int = 20) -> List[SyncRun]: ...
+
+    async def update(self, run_id: str, **values) -> Optional[SyncRun]: ...
+
+    async def claim_interrupted(self, owner: str, stale_before: datetime) -> List[SyncRun]: ...
+
+
+class SyncStateRepository(Protocol):
+    """Отметки инкрементальной синхронизации (high-water mark)"""
+
+    async def get_high_water_mark(self, name: str) -> Optional[datetime]: ...
+
+    async def advance_high_water_mark(self, name: str, value: datetime) -> datetime: ...
+
+
+class EventOutboxRepository(Protocol):
+    """Исходящие события, записанные в одной транзакции с данными"""
+
+    async def claim(self, limit: int) -> List[OutboxEvent]: ...
+
+    async def settle(
+        self,
+        published: Sequence[int],
+        failed: Sequence[int],
+        *,
+        dead: Sequence[int] = (),
+        postponed: Sequence[int] = (),
+        error: Optional[str] = None,
+        retry_at: Optional[datetime] = None,
+    ) -> None: ...
+
+    async def count(self, *, dead: bool = False) -> int: ...
+
+
+class GameStatsRepository(Protocol):
+    """Счетчики игр, которые ведутся по событиям других сервисов"""
+
+    async def apply_comment_deltas(self, deltas: Dict[str, int]) -> List[str]: ...
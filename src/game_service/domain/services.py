@@ -1,13 +1,93 @@
 from __future__ import annotations
 
-from datetime import datetime
+import hashlib
+import json
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
 
-from game_service.domain.models import Game, Genre, Platform, Screenshot
+from game_service.domain.models import Game, Genre, Platform, Screenshot, Tag
+
+# Поля игры, которые приходят из RAWG (id и rawg_id - ключи, даты - служебные)
+CONTENT_FIELDS = (
+    "slug",
+    "name",
+    "description",
+    "metacritic",
+    "rating",
+    "release_date",
+    "developer",
+    "publisher",
+    "background_image",
+    "website",
+    "playtime",
+    "age_rating",
+)
+
+# Длинные поля: в изменениях только отметка, без старого и нового значения
+_LARGE_FIELDS = frozenset({"description"})
+
+_COLLECTIONS = ("platforms", "genres", "tags")
+
+
+def content_hash(game: Game) -> str:
+    """Отпечаток данных игры из RAWG: совпадает - значит, перезаписывать нечего"""
+    payload = [
+        [_plain(getattr(game, name)) for name in CONTENT_FIELDS],
+        *(sorted((item.id, item.name) for item in getattr(game, name)) for name in _COLLECTIONS),
+        [shot.url for shot in game.screenshots],
+    ]
+    return hashlib.sha256(json.dumps(payload, ensure_ascii=False).encode()).hexdigest()
+
+
+def game_changes(old: Game, new: Game) -> Dict[str, Any]:
+    """
+    Изменения по полям: {"rating": {"old": 4.1, "new": 4.3}},
+    для справочников и скриншотов - {"genres": {"added": [...], "removed": [...]}},
+    для description - {"description": {"changed": true}}.
+    """
+    changes: Dict[str, Any] = {}
+    for name in CONTENT_FIELDS:
+        old_value, new_value = _plain(getattr(old, name)), _plain(getattr(new, name))
+        if old_value == new_value:
+            continue
+        if name in _LARGE_FIELDS:
+            changes[name] = {"changed": True}
+        else:
+            changes[name] = {"old": old_value, "new": new_value}
+    lists = {
+        name: (
+            [item.name for item in getattr(old, name)],
+            [item.name for item in getattr(new, name)],
+        )
+        for name in _COLLECTIONS
+    }
+    lists["screenshots"] = ([s.url for s in old.screenshots], [s.url for s in new.screenshots])
+    for name, (old_items, new_items) in lists.items():
+        added = [item for item in new_items if item not in old_items]
+        removed = [item for item in old_items if item not in new_items]
+        if added or removed:
+            changes[name] = {"added": added, "removed": removed}
+    return changes
+
+
+def _plain(value: Any) -> Any:
+    return value.isoformat() if hasattr(value, "isoformat") else value
 
 
 class GameFactory:
     """Фабрика для создания доменных моделей из RAWG данных"""
 
+    @staticmethod
+    def rawg_updated_at(data: dict) -> Optional[datetime]:
+        """Дата последнего обновления игры в RAWG (поле updated, время в UTC)"""
+        if not data.get("updated"):
+            return None
+        try:
+            updated = datetime.fromisoformat(data["updated"].replace("Z", "+00:00"))
+        except ValueError:
+            return None
+        return updated if updated.tzinfo else updated.replace(tzinfo=timezone.utc)
+
     @staticmethod
     def from_rawg_list_item(data: dict) -> Game:
         """
@@ -102,6 +182,10 @@ class GameFactory:
             age_rating=(data.get("esrb_rating") or {}).get("name"),
             platforms=platforms,
             genres=genres,
-            tags=[tag.get("name") for tag in (data.get("tags") or []) if tag.get("name")],
+            tags=[
+                Tag(id=tag["id"], name=tag["name"])
+                for tag in (data.get("tags") or [])
+                if tag.get("id") and tag.get("name")
+            ],
             screenshots=screenshots,
         )
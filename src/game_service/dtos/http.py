@@ -1,9 +1,12 @@
 from __future__ import annotations
 
 from datetime import date, datetime
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
+
+from game_service.clients.response_cache import CacheMode
+from game_service.domain.models import SearchMode, SyncMode, TotalMode
 
 
 class GameListItem(BaseModel):
@@ -16,11 +19,30 @@ class GameListItem(BaseModel):
     background_image: Optional[str]
     platforms: List[str] = Field(default_factory=list)
     genres: List[str] = Field(default_factory=list)
+    comment_count: int = Field(default=0, description="Количество комментариев к игре")
 
 
 class GameListResponse(BaseModel):
-    total: int
+    total: Optional[int] = Field(
+        description="Количество игр по фильтрам (None при total_mode=none)"
+    )
+    total_is_estimate: bool = Field(default=False, description="total - оценка, а не точное число")
     items: List[GameListItem]
+    next_cursor: Optional[str] = Field(default=None, description="Курсор следующей страницы")
+    prev_cursor: Optional[str] = Field(default=None, description="Курсор предыдущей страницы")
+
+
+class FacetValue(BaseModel):
+    value: str
+    count: int
+
+
+class GameFacetsResponse(BaseModel):
+    total: int
+    genres: List[FacetValue]
+    platforms: List[FacetValue]
+    age_ratings: List[FacetValue]
+    years: List[FacetValue]
 
 
 class GameDetailResponse(BaseModel):
@@ -41,14 +63,64 @@ class GameDetailResponse(BaseModel):
     genres: List[str]
     tags: List[str]
     screenshots: List[str]
+    comment_count: int = Field(default=0, description="Количество комментариев к игре")
     created_at: datetime
     updated_at: datetime
 
 
+# Поля, доступные для выборки в POST /games/batch (по умолчанию - поля элемента списка)
+BATCH_FIELDS = tuple(GameDetailResponse.model_fields) + ("rawg_id",)
+BATCH_DEFAULT_FIELDS = tuple(GameListItem.model_fields)
+BATCH_MAX_KEYS = 500
+
+
+class GameBatchRequest(BaseModel):
+    ids: List[str] = Field(default_factory=list, description="id игр")
+    slugs: List[str] = Field(default_factory=list, description="slug игр")
+    rawg_ids: List[int] = Field(default_factory=list, description="RAWG id игр")
+    fields: Optional[List[str]] = Field(
+        default=None,
+        description="Какие поля вернуть (по умолчанию - поля элемента списка игр)",
+    )
+
+    @model_validator(mode="after")
+    def _validate(self) -> "GameBatchRequest":
+        keys = len(self.ids) + len(self.slugs) + len(self.rawg_ids)
+        if keys == 0:
+            raise ValueError("ids, slugs or rawg_ids is required")
+        if keys > BATCH_MAX_KEYS:
+            raise ValueError(f"Too many keys: {keys} > {BATCH_MAX_KEYS}")
+        unknown = set(self.fields or ()) - set(BATCH_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+        return self
+
+
+class GameBatchMissing(BaseModel):
+    ids: List[str] = Field(default_factory=list)
+    slugs: List[str] = Field(default_factory=list)
+    rawg_ids: List[int] = Field(default_factory=list)
+
+
+class GameBatchResponse(BaseModel):
+    items: List[Dict[str, Any]]
+    missing: GameBatchMissing
+
+
 class GameQuery(BaseModel):
     search: Optional[str] = Field(default=None, description="Поиск по названию игры")
-    platform: Optional[str] = Field(default=None, description="Фильтр по платформе")
-    genre: Optional[str] = Field(default=None, description="Фильтр по жанру/категории")
+    search_mode: SearchMode = Field(
+        default="substring",
+        description="Режим поиска: substring (подстрока), fulltext (по словам), fuzzy (с опечатками)",
+    )
+    platform: Optional[str] = Field(
+        default=None, description="Фильтр по платформе (точное название, без учета регистра)"
+    )
+    genre: Optional[str] = Field(
+        default=None, description="Фильтр по жанру/категории (точное название, без учета регистра)"
+    )
+    platform_id: Optional[int] = Field(default=None, description="Фильтр по RAWG id платформы")
+    genre_id: Optional[int] = Field(default=None, description="Фильтр по RAWG id жанра")
     age_rating: Optional[str] = Field(
         default=None, description="Фильтр по возрастному рейтингу (ESRB)"
     )
@@ -58,11 +130,22 @@ class GameQuery(BaseModel):
     rating_to: Optional[float] = Field(default=None, ge=0.0, le=5.0, description="Рейтинг до")
     page: int = Field(default=1, ge=1)
     page_size: int = Field(default=20, ge=1, le=100)
+    total_mode: TotalMode = Field(
+        default="exact",
+        description="Подсчет total: exact (точно), estimate (оценка планировщика), none (без total)",
+    )
+    cursor: Optional[str] = Field(
+        default=None,
+        description="Курсор из next_cursor/prev_cursor предыдущего ответа (page игнорируется)",
+    )
 
 
 class SyncGameRequest(BaseModel):
     rawg_slug: Optional[str] = None
     rawg_id: Optional[int] = None
+    cache_mode: Optional[CacheMode] = Field(
+        default=None, description="Режим кэша ответов RAWG (по умолчанию из настроек)"
+    )
 
     @property
     def is_valid(self) -> bool:
@@ -79,12 +162,99 @@ class SyncBatchRequest(BaseModel):
     details_limit: int = Field(
         default=0, ge=0, description="Максимум игр для загрузки деталей (0 = все на страницах)"
     )
+    cache_mode: Optional[CacheMode] = Field(
+        default=None,
+        description=(
+            "Режим кэша ответов RAWG: normal, cache_only (переобработка сохраненных "
+            "ответов без запросов к RAWG), refresh, off. По умолчанию из настроек"
+        ),
+    )
+    mode: SyncMode = Field(
+        default="full",
+        description=(
+            "full - обход по рейтингу; delta - только игры, обновленные в RAWG с прошлой "
+            "delta-синхронизации (обход по дате обновления до уже известных данных)"
+        ),
+    )
+    dates: Optional[str] = Field(
+        default=None,
+        pattern=r"^\d{4}-\d{2}-\d{2},\d{4}-\d{2}-\d{2}$",
+        description="Окно дат релиза, например 2024-01-01,2024-12-31; обход до конца списка",
+    )
+
+
+class SyncStageStats(BaseModel):
+    items: int = Field(description="Обработано элементов (страниц или игр)")
+    seconds: float = Field(description="Время работы стадии")
+    per_second: float = Field(description="Пропускная способность стадии, элементов в секунду")
 
 
-class SyncBatchResponse(BaseModel):
+class SyncJobResponse(BaseModel):
+    id: str
+    status: str = Field(description="queued, running, completed, failed, cancelled, stopped")
+    start_page: int
+    last_page: int
+    page_size: int
+    load_details: bool
+    details_limit: int
+    cache_mode: Optional[str] = None
+    mode: str = Field(description="full или delta")
+    dates: Optional[str] = None
+    since: Optional[datetime] = Field(
+        default=None, description="delta: отметка прошлой delta-синхронизации"
+    )
+    high_water_mark: Optional[datetime] = Field(
+        default=None, description="Самая поздняя дата обновления в RAWG среди загруженных игр"
+    )
+    caught_up: bool = Field(
+        description="Обход дошел до уже известных данных или до конца списка RAWG"
+    )
+    checkpoint_page: int = Field(
+        description="Последняя страница, до которой все страницы записаны вместе с деталями"
+    )
+    pages_done: int
+    pages_total: int
     total_synced: int
     new_games: int
     updated_games: int
+    unchanged_games: int = Field(description="Данные совпали с сохраненными - запись пропущена")
     details_loaded: int
+    details_failed: int
     requests_used: int
-    pages_processed: int
+    budget_exhausted: bool = Field(
+        description="Остановлена: исчерпан бюджет запросов к RAWG (можно продолжить позже)"
+    )
+    cancel_requested: bool
+    error: Optional[str] = None
+    eta_seconds: Optional[float] = Field(
+        default=None, description="Оценка оставшегося времени по скорости текущего запуска"
+    )
+    stages: Dict[str, SyncStageStats] = Field(
+        default_factory=dict, description="Статистика стадий конвейера текущего запуска"
+    )
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+
+class SyncJobListResponse(BaseModel):
+    items: List[SyncJobResponse]
+
+
+class RequestUsage(BaseModel):
+    requests: int = Field(description="Отправлено запросов")
+    failed: int = Field(description="Из них неуспешных")
+
+
+class SyncBudgetResponse(BaseModel):
+    budget: int = Field(description="Бюджет запросов к RAWG за период")
+    reserve: int = Field(description="Резерв, недоступный массовой синхронизации")
+    used: int
+    remaining: int
+    available_for_sync: int = Field(description="Сколько запросов еще может сделать синхронизация")
+    period: str
+    period_start: Optional[datetime] = None
+    rate_per_second: float
+    by_purpose: Dict[str, RequestUsage] = Field(
+        default_factory=dict, description="Расход по назначению запросов"
+    )
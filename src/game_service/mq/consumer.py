@@ -1,26 +1,115 @@
+import asyncio
+import functools
 import json
 import logging
+import time
+import zlib
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Callable, Deque, Dict, List, Optional, Set, Tuple, Union
+
 import aio_pika
-from aio_pika.abc import AbstractRobustConnection
-from typing import Dict, Callable, Any
+from aio_pika.abc import AbstractIncomingMessage, AbstractRobustConnection
+
 from ..core.config import Settings, load_settings
+from .dedupe import EventDeduplicator
+from .metrics import LatencyWindow
 
 logger = logging.getLogger(__name__)
 
+# Сообщение и его разобранное тело (None - тело не разобрать)
+Delivery = Tuple[AbstractIncomingMessage, Optional[Dict[str, Any]]]
+# Результат обработки: True/False или future, если обработчик завершит работу позже
+Outcome = Union[bool, "asyncio.Future[Any]"]
+
+
+class ConsumerMetrics:
+    """Счетчики consumer: задержка доставки (lag) и время обработки"""
+
+    def __init__(self):
+        self.received = 0
+        self.processed = 0
+        self.failed = 0
+        self.duplicates = 0
+        self.ack_batches = 0
+        # От публикации (timestamp сообщения) до начала обработки
+        self.lag = LatencyWindow()
+        self.handler_latency = LatencyWindow()
+
+    def stats(self) -> dict:
+        return {
+            "received": self.received,
+            "processed": self.processed,
+            "failed": self.failed,
+            "duplicates": self.duplicates,
+            "ack_batches": self.ack_batches,
+            "lag_ms": self.lag.stats(),
+            "handler_ms": self.handler_latency.stats(),
+        }
+
 
 class EventConsumer:
+    """
+    Потребитель событий из exchange blog_events.
+
+    Сообщения общей очереди обрабатываются пулом воркеров: каждое попадает в
+    одну из concurrency полос по хэшу entity_id (game_id), так что события
+    одной сущности обрабатываются по порядку, а медленный обработчик
+    задерживает только свою полосу (при concurrency = 1 полоса одна). Обработанные сообщения
+    подтверждаются пачками (ack multiple) - до последнего сообщения, перед
+    которым обработаны все полученные; упавшие уходят в DLQ (reject).
+    Одновременно в обработке не больше prefetch сообщений.
+
+    Обработчик может вернуть asyncio.Future - тогда сообщение подтверждается,
+    когда она завершится (например, после записи накопленной пачки в БД), а
+    полоса тем временем берет следующие сообщения.
+
+    События общей очереди с уже обработанным event_id (или message_id)
+    подтверждаются без обработки - брокер выдает заново неподтвержденные
+    сообщения после рестарта, а outbox может отправить событие дважды.
+    """
+
     def __init__(self, settings: Settings | None = None):
         self.settings = settings or load_settings()
         self.connection: AbstractRobustConnection = None
         self.channel: aio_pika.abc.AbstractChannel = None
         self.handlers: Dict[str, Callable] = {}
+        # Обработчики, которые должны сработать на каждой реплике (например, сброс кэшей)
+        self.broadcast_handlers: Dict[str, Callable] = {}
+        self.prefetch = self.settings.consumer_prefetch
+        self.concurrency = self.settings.consumer_concurrency
+        # Пачка подтверждений не больше prefetch, иначе брокер перестанет выдавать сообщения
+        self.ack_batch_size = min(self.settings.consumer_ack_batch_size, self.prefetch)
+        self.ack_interval = self.settings.consumer_ack_interval
+        self.metrics = ConsumerMetrics()
+        self.dedupe: Optional[EventDeduplicator] = None
+        if self.settings.consumer_dedupe_enabled:
+            self.dedupe = EventDeduplicator(
+                max_entries=self.settings.consumer_dedupe_max_entries,
+                ttl=self.settings.consumer_dedupe_ttl,
+                bloom_path=self._dedupe_bloom_path(),
+                error_rate=self.settings.consumer_dedupe_error_rate,
+            )
+        self._dedupe_saver: Optional[asyncio.Task] = None
+        self._lanes: List[asyncio.Queue[Delivery]] = []
+        # Полученные, но еще не подтвержденные сообщения - в порядке доставки
+        self._unacked: Deque[AbstractIncomingMessage] = deque()
+        # Обработанные из _unacked: True - ждет ack, False - уже отклонено
+        self._settled: Dict[AbstractIncomingMessage, bool] = {}
+        # Задачи, подтверждающие сообщения по завершении отложенной обработки
+        self._settling: Set[asyncio.Task] = set()
+
+    def _dedupe_bloom_path(self) -> Optional[str]:
+        # Реплики с общим томом не перезаписывают фильтры друг друга
+        path = self.settings.consumer_dedupe_bloom_path
+        return path.replace("{hostname}", self.settings.hostname) or None
 
     async def connect(self):
         try:
             self.connection = await aio_pika.connect_robust(self.settings.rabbitmq_url)
             self.channel = await self.connection.channel()
 
-            await self.channel.set_qos(prefetch_count=10)
+            await self.channel.set_qos(prefetch_count=self.prefetch)
 
             logger.info("Event consumer connected to RabbitMQ successfully")
 
@@ -28,9 +117,21 @@ class EventConsumer:
             logger.error(f"Failed to connect to RabbitMQ: {e}")
             raise
 
-    def register_handler(self, event_type: str, handler: Callable[[Dict[str, Any]], None]):
-        self.handlers[event_type] = handler
-        logger.debug(f"Handler registered for event type: {event_type}")
+    def register_handler(
+        self,
+        event_type: str,
+        handler: Callable[[Dict[str, Any]], None],
+        broadcast: bool = False,
+    ):
+        """
+        broadcast=False - событие обрабатывает одна из реплик (общая очередь);
+        broadcast=True - каждая реплика через собственную временную очередь.
+        """
+        if broadcast:
+            self.broadcast_handlers[event_type] = handler
+        else:
+            self.handlers[event_type] = handler
+        logger.debug(f"Handler registered for event type: {event_type} (broadcast={broadcast})")
 
     async def start_consuming(self, queue_name: str = "games_events"):
         if not self.channel:
@@ -53,41 +154,255 @@ class EventConsumer:
 
         # Также биндим на возможные события от других сервисов
         # Например, если нужно слушать события комментариев при удалении игры
+        await queue.bind(exchange, "comments.comment_created")
         await queue.bind(exchange, "comments.comment_deleted")
 
-        logger.info(f"Started consuming from queue: {queue_name}")
-
-        async with queue.iterator() as queue_iter:
-            async for message in queue_iter:
-                async with message.process():
-                    try:
-                        event_data = json.loads(message.body.decode())
-                        routing_key = message.routing_key or ""
-
-                        # Определяем тип события по routing_key или по event_type в теле сообщения
-                        if routing_key.startswith("games."):
-                            event_type = event_data.get("event_type")
-                        elif routing_key.startswith("comments."):
-                            # Обработка событий от comment_service
-                            event_type = event_data.get("event_type")
-                        else:
-                            event_type = event_data.get("event_type")
-
-                        if event_type and event_type in self.handlers:
-                            await self.handlers[event_type](event_data)
-                            logger.debug(
-                                f"Event processed: {event_type} (routing_key: {routing_key})"
-                            )
-                        else:
-                            logger.warning(
-                                f"No handler for event type: {event_type} (routing_key: {routing_key})"
-                            )
-
-                    except Exception as e:
-                        logger.error(f"Error processing message: {e}")
-                        # Message will be rejected and go to DLQ
+        if self.broadcast_handlers:
+            # Эксклюзивная очередь с именем от брокера живет, пока жива реплика
+            broadcast_queue = await self.channel.declare_queue(exclusive=True, auto_delete=True)
+            await broadcast_queue.bind(exchange, "games.*")
+            await broadcast_queue.consume(self._on_broadcast_message)
+            logger.info(f"Started consuming broadcast queue: {broadcast_queue.name}")
+
+        if self.dedupe and self.dedupe.bloom_path and self._dedupe_saver is None:
+            self._dedupe_saver = asyncio.create_task(self._save_dedupe_periodically())
+
+        logger.info(
+            f"Started consuming from queue: {queue_name} "
+            f"(concurrency={self.concurrency}, prefetch={self.prefetch})"
+        )
+
+        await self._consume(queue)
+
+    def stats(self) -> dict:
+        return {
+            **self.metrics.stats(),
+            "dedupe": self.dedupe.stats() if self.dedupe else None,
+            "concurrency": self.concurrency,
+            "prefetch": self.prefetch,
+            "in_flight": len(self._unacked),
+            # В обработчиках, включая ждущие завершения отложенной обработки
+            "processing": len(self._unacked) - len(self._settled) - self._queued(),
+            "lanes": [lane.qsize() for lane in self._lanes],
+        }
+
+    async def _consume(self, queue: aio_pika.abc.AbstractQueue):
+        self._lanes = [asyncio.Queue() for _ in range(self.concurrency)]
+        workers = [asyncio.create_task(self._lane_worker(lane)) for lane in self._lanes]
+        acker = asyncio.create_task(self._ack_periodically())
+        try:
+            async with queue.iterator() as queue_iter:
+                async for message in queue_iter:
+                    event_data = self._decode(message)
+                    self._unacked.append(message)
+                    self._lanes[self._lane_index(message, event_data)].put_nowait(
+                        (message, event_data)
+                    )
+        finally:
+            for task in (*workers, acker):
+                task.cancel()
+            await asyncio.gather(*workers, acker, return_exceptions=True)
+            # Необработанные сообщения брокер выдаст заново после закрытия канала
+            await self._flush_acks()
+
+    def _lane_index(
+        self, message: AbstractIncomingMessage, event_data: Optional[Dict[str, Any]]
+    ) -> int:
+        key = event_data and (event_data.get("entity_id") or event_data.get("game_id"))
+        if not key:
+            # Без ключа порядок не важен - распределяем по кругу
+            return message.delivery_tag % self.concurrency
+        return zlib.crc32(str(key).encode()) % self.concurrency
+
+    def _queued(self) -> int:
+        return sum(lane.qsize() for lane in self._lanes)
+
+    async def _lane_worker(self, lane: asyncio.Queue):
+        while True:
+            message, event_data = await lane.get()
+            outcome = event_data is not None and await self._process(message, event_data)
+            if isinstance(outcome, asyncio.Future):
+                outcome.add_done_callback(functools.partial(self._on_deferred_done, message))
+                continue
+            await self._settle(message, outcome)
+
+    def _on_deferred_done(self, message: AbstractIncomingMessage, future: asyncio.Future):
+        if future.cancelled():
+            # Обработчик остановлен: брокер выдаст сообщение заново после закрытия канала
+            return
+        handled = future.exception() is None
+        if not handled:
+            self.metrics.failed += 1
+            logger.error(f"Deferred processing failed: {future.exception()}")
+        task = asyncio.create_task(self._settle(message, handled))
+        self._settling.add(task)
+        task.add_done_callback(self._settling.discard)
+
+    async def _settle(self, message: AbstractIncomingMessage, handled: bool):
+        if not handled:
+            try:
+                # Сообщение уходит в DLQ
+                await message.reject(requeue=False)
+            except Exception as e:
+                logger.error(f"Failed to reject message: {e}")
+        self._settled[message] = handled
+        if len(self._settled) >= self.ack_batch_size:
+            await self._flush_acks()
+
+    async def _ack_periodically(self):
+        while True:
+            await asyncio.sleep(self.ack_interval)
+            await self._flush_acks()
+
+    async def _flush_acks(self):
+        """Подтвердить одним ack multiple обработанные сообщения в начале очереди доставки"""
+        last = None
+        while self._unacked and self._unacked[0] in self._settled:
+            message = self._unacked.popleft()
+            if self._settled.pop(message):
+                last = message
+        if last is None:
+            return
+        try:
+            await last.ack(multiple=True)
+            self.metrics.ack_batches += 1
+        except Exception as e:
+            # Канал переоткрыт: брокер выдаст неподтвержденные сообщения заново
+            logger.error(f"Failed to ack messages: {e}")
+
+    async def _on_broadcast_message(self, message: aio_pika.abc.AbstractIncomingMessage):
+        async with message.process():
+            await self._dispatch(message, self.broadcast_handlers, warn_unhandled=False)
+
+    async def _dispatch(
+        self,
+        message: aio_pika.abc.AbstractIncomingMessage,
+        handlers: Dict[str, Callable],
+        warn_unhandled: bool = True,
+    ) -> bool:
+        event_data = self._decode(message)
+        if event_data is None:
+            return False
+        return await self._await_outcome(
+            await self._handle(message, event_data, handlers, warn_unhandled)
+        )
+
+    async def _await_outcome(self, outcome: Outcome) -> bool:
+        if not isinstance(outcome, asyncio.Future):
+            return outcome
+        try:
+            await outcome
+        except Exception as e:
+            self.metrics.failed += 1
+            logger.error(f"Deferred processing failed: {e}")
+            return False
+        return True
+
+    async def _process(
+        self, message: AbstractIncomingMessage, event_data: Dict[str, Any]
+    ) -> Outcome:
+        """Обработать событие общей очереди, пропустив уже обработанное"""
+        event_id = event_data.get("event_id") or message.message_id
+        if not self.dedupe or not event_id:
+            return await self._handle(message, event_data, self.handlers)
+        event_id = str(event_id)
+        if not self.dedupe.claim(event_id):
+            self.metrics.duplicates += 1
+            logger.debug(f"Skipping duplicate event {event_id} ({event_data.get('event_type')})")
+            return True
+        outcome = await self._handle(message, event_data, self.handlers)
+        if isinstance(outcome, asyncio.Future):
+            outcome.add_done_callback(
+                lambda future: self._finish_claim(event_id, _succeeded(future))
+            )
+        else:
+            self._finish_claim(event_id, outcome)
+        return outcome
+
+    def _finish_claim(self, event_id: str, handled: bool) -> None:
+        if handled:
+            self.dedupe.commit(event_id)
+        else:
+            self.dedupe.release(event_id)
+
+    async def _save_dedupe_periodically(self):
+        while True:
+            await asyncio.sleep(self.settings.consumer_dedupe_save_interval)
+            self._save_dedupe()
+
+    def _save_dedupe(self):
+        try:
+            self.dedupe.save()
+        except Exception as e:
+            logger.error(f"Failed to save dedupe filter: {e}")
+
+    def _decode(self, message: AbstractIncomingMessage) -> Optional[Dict[str, Any]]:
+        self.metrics.received += 1
+        try:
+            return json.loads(message.body.decode())
+        except Exception as e:
+            self.metrics.failed += 1
+            logger.error(f"Error decoding message: {e}")
+            return None
+
+    async def _handle(
+        self,
+        message: AbstractIncomingMessage,
+        event_data: Dict[str, Any],
+        handlers: Dict[str, Callable],
+        warn_unhandled: bool = True,
+    ) -> Outcome:
+        """
+        Вызвать обработчик события; False - обработчик упал, future - обработчик
+        завершит работу позже (ее возвращает сам обработчик)
+        """
+        if message.timestamp:
+            timestamp = message.timestamp
+            if timestamp.tzinfo is None:
+                timestamp = timestamp.replace(tzinfo=timezone.utc)
+            self.metrics.lag.observe((datetime.now(timezone.utc) - timestamp).total_seconds())
+        started = time.perf_counter()
+        try:
+            routing_key = message.routing_key or ""
+
+            # Определяем тип события по routing_key или по event_type в теле сообщения
+            if routing_key.startswith("games."):
+                event_type = event_data.get("event_type")
+            elif routing_key.startswith("comments."):
+                # Обработка событий от comment_service
+                event_type = event_data.get("event_type")
+            else:
+                event_type = event_data.get("event_type")
+
+            result = None
+            if event_type and event_type in handlers:
+                result = await handlers[event_type](event_data)
+                logger.debug(f"Event processed: {event_type} (routing_key: {routing_key})")
+            elif warn_unhandled:
+                logger.warning(
+                    f"No handler for event type: {event_type} (routing_key: {routing_key})"
+                )
+
+        except Exception as e:
+            self.metrics.failed += 1
+            logger.error(f"Error processing message: {e}")
+            return False
+        self.metrics.processed += 1
+        self.metrics.handler_latency.observe(time.perf_counter() - started)
+        if isinstance(result, asyncio.Future):
+            return result
+        return True
 
     async def close(self):
+        if self._dedupe_saver:
+            self._dedupe_saver.cancel()
+            self._dedupe_saver = None
+        if self.dedupe:
+            self._save_dedupe()
         if self.connection:
             await self.connection.close()
             logger.info("Event consumer connection closed")
+
+
+def _succeeded(future: asyncio.Future) -> bool:
+    return not future.cancelled() and future.exception() is None
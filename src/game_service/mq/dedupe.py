@@ -0,0 +1,202 @@
+import hashlib
+import logging
+import math
+import os
+import struct
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class BloomFilter:
+    """
+    Фильтр Блума на m бит и k хэшей (двойное хэширование blake2b).
+    Ложноположительный ответ возможен с вероятностью error_rate при capacity
+    элементах, ложноотрицательный - нет.
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = capacity
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[i >> 3] & (1 << (i & 7)) for i in self._positions(key))
+
+    def add(self, key: str) -> None:
+        for i in self._positions(key):
+            self.bits[i >> 3] |= 1 << (i & 7)
+        self.count += 1
+
+    def clear(self) -> None:
+        self.bits = bytearray(len(self.bits))
+        self.count = 0
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+
+class EventDeduplicator:
+    """
+    Id недавно обработанных событий - чтобы не применять повторно доставленные.
+
+    Последние max_entries id за ttl секунд хранятся в LRU (точный ответ,
+    память ограничена). Если задан bloom_path, обработанные id добавляются
+    еще и в два поколения фильтра Блума (текущее и предыдущее, каждое - на
+    ttl секунд или max_entries событий), которые сохраняются на диск: после
+    рестарта LRU пуст, а брокер выдает заново все неподтвержденные сообщения.
+    Новое событие фильтр может принять за повтор с вероятностью error_rate.
+
+    claim вызывается перед обработкой, commit - после успешной, release -
+    если обработка не удалась (событие можно будет обработать снова).
+    """
+
+    _HEADER = struct.Struct("<4sHIIdII")
+    _MAGIC = b"GSDD"
+    _VERSION = 1
+
+    def __init__(
+        self,
+        *,
+        max_entries: int = 100000,
+        ttl: float = 3600.0,
+        bloom_path: Optional[str] = None,
+        error_rate: float = 1e-6,
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.bloom_path = bloom_path
+        # event_id -> момент claim (monotonic), от старых к новым
+        self._recent: "OrderedDict[str, float]" = OrderedDict()
+        self._bloom: Optional[Tuple[BloomFilter, BloomFilter]] = None
+        self._generation_started = time.time()
+        if bloom_path:
+            self._bloom = (
+                BloomFilter(max_entries, error_rate),
+                BloomFilter(max_entries, error_rate),
+            )
+            self._load()
+        self.duplicates = 0
+        self.bloom_hits = 0
+
+    def claim(self, event_id: str) -> bool:
+        """Отметить событие как обрабатываемое; False - его уже обработали"""
+        now = time.monotonic()
+        self._expire(now)
+        if event_id in self._recent:
+            self._recent.move_to_end(event_id)
+            self.duplicates += 1
+            return False
+        if self._bloom and any(event_id in generation for generation in self._bloom):
+            self.duplicates += 1
+            self.bloom_hits += 1
+            return False
+        self._recent[event_id] = now
+        if len(self._recent) > self.max_entries:
+            self._recent.popitem(last=False)
+        return True
+
+    def commit(self, event_id: str) -> None:
+        """Событие обработано - запомнить его и после рестарта"""
+        if not self._bloom:
+            return
+        self._rotate()
+        self._bloom[0].add(event_id)
+
+    def release(self, event_id: str) -> None:
+        """Обработка не удалась - повторная доставка должна обработать событие"""
+        self._recent.pop(event_id, None)
+
+    def save(self) -> None:
+        """Сохранить фильтр Блума на диск (атомарно, через временный файл)"""
+        if not self._bloom or not self.bloom_path:
+            return
+        current, previous = self._bloom
+        header = self._HEADER.pack(
+            self._MAGIC,
+            self._VERSION,
+            current.size,
+            current.hashes,
+            self._generation_started,
+            current.count,
+            previous.count,
+        )
+        path = Path(self.bloom_path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(path.suffix + ".tmp")
+        with open(tmp_path, "wb") as fp:
+            fp.write(header)
+            fp.write(current.bits)
+            fp.write(previous.bits)
+        os.replace(tmp_path, path)
+
+    def stats(self) -> dict:
+        result = {
+            "recent": len(self._recent),
+            "max_entries": self.max_entries,
+            "duplicates": self.duplicates,
+        }
+        if self._bloom:
+            result["bloom_hits"] = self.bloom_hits
+            result["bloom_entries"] = self._bloom[0].count + self._bloom[1].count
+        return result
+
+    def _expire(self, now: float) -> None:
+        while self._recent:
+            event_id, claimed_at = next(iter(self._recent.items()))
+            if now - claimed_at < self.ttl:
+                break
+            self._recent.popitem(last=False)
+
+    def _rotate(self) -> None:
+        current, previous = self._bloom
+        now = time.time()
+        if now - self._generation_started < self.ttl and current.count < current.capacity:
+            return
+        # Предыдущее поколение старше ttl - очищаем его и делаем текущим
+        previous.clear()
+        if now - self._generation_started >= 2 * self.ttl:
+            current.clear()
+        self._bloom = (previous, current)
+        self._generation_started = now
+
+    def _load(self) -> None:
+        try:
+            with open(self.bloom_path, "rb") as fp:
+                data = fp.read()
+        except FileNotFoundError:
+            return
+        except OSError as e:
+            logger.error(f"Failed to read dedupe filter {self.bloom_path}: {e}")
+            return
+        current, previous = self._bloom
+        length = len(current.bits)
+        try:
+            magic, version, size, hashes, started, current_count, previous_count = (
+                self._HEADER.unpack_from(data)
+            )
+        except struct.error:
+            magic = None
+        if (
+            magic != self._MAGIC
+            or version != self._VERSION
+            or (size, hashes) != (current.size, current.hashes)
+            or len(data) != self._HEADER.size + 2 * length
+        ):
+            # Файл от других настроек - начинаем с пустого фильтра
+            logger.warning(f"Ignoring incompatible dedupe filter {self.bloom_path}")
+            return
+        offset = self._HEADER.size
+        current.bits = bytearray(data[offset : offset + length])
+        previous.bits = bytearray(data[offset + length :])
+        current.count, previous.count = current_count, previous_count
+        self._generation_started = started
+        self._rotate()
@@ -0,0 +1,31 @@
+from collections import deque
+from typing import List, Optional
+
+
+class LatencyWindow:
+    """Задержки последних window операций, сек; сводка - в миллисекундах"""
+
+    def __init__(self, window: int = 1000):
+        self._values: deque[float] = deque(maxlen=window)
+
+    def observe(self, seconds: float) -> None:
+        self._values.append(seconds)
+
+    def stats(self) -> dict:
+        values = sorted(self._values)
+        return {
+            "avg": _ms(sum(values) / len(values)) if values else None,
+            "p50": _ms(_percentile(values, 0.5)),
+            "p95": _ms(_percentile(values, 0.95)),
+            "max": _ms(values[-1]) if values else None,
+        }
+
+
+def _percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return round(seconds * 1000, 2) if seconds is not None else None
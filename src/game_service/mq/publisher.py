@@ -1,23 +1,77 @@
+import asyncio
 import json
 import logging
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
 import aio_pika
 from aio_pika.abc import AbstractRobustConnection
+from pamqp.commands import Basic
+
 from ..core.config import Settings, load_settings
+from .metrics import LatencyWindow
 
 logger = logging.getLogger(__name__)
 
 
+class PublishNotConfirmedError(RuntimeError):
+    """Брокер не подтвердил публикацию (nack)"""
+
+
+class PublishMetrics:
+    """Счетчики публикации: задержка до подтверждения брокером и неудачи"""
+
+    def __init__(self):
+        self.published = 0
+        self.failed = 0
+        self.nacked = 0
+        self.batches = 0
+        self.latency = LatencyWindow()
+
+    def observe(self, seconds: float) -> None:
+        self.published += 1
+        self.latency.observe(seconds)
+
+    def stats(self) -> dict:
+        return {
+            "published": self.published,
+            "failed": self.failed,
+            "nacked": self.nacked,
+            "batches": self.batches,
+            "latency_ms": self.latency.stats(),
+        }
+
+
 class EventPublisher:
+    """
+    Публикация событий в exchange blog_events с подтверждениями брокера.
+
+    publish ждет подтверждения одного события. publish_many и publish_payloads
+    отправляют пачку конвейером: подтверждения ждут одновременно до
+    max_in_flight событий.
+    enqueue кладет событие в буфер, который уходит через publish_many, когда
+    наберется batch_size событий или пройдет batch_delay секунд; flush
+    отправляет буфер сразу и возвращает неподтвержденные события.
+    """
+
     def __init__(self, settings: Settings | None = None):
         self.settings = settings or load_settings()
         self.connection: AbstractRobustConnection = None
         self.channel: aio_pika.abc.AbstractChannel = None
         self.exchange: aio_pika.abc.AbstractExchange = None
+        self.max_in_flight = self.settings.publisher_max_in_flight
+        self.confirm_timeout = self.settings.publisher_confirm_timeout
+        self.batch_size = self.settings.publisher_batch_size
+        self.batch_delay = self.settings.publisher_batch_delay
+        self.metrics = PublishMetrics()
+        self._buffer: list = []
+        self._flush_task: Optional[asyncio.Task] = None
 
     async def connect(self):
         try:
             self.connection = await aio_pika.connect_robust(self.settings.rabbitmq_url)
-            self.channel = await self.connection.channel()
+            self.channel = await self.connection.channel(publisher_confirms=True)
 
             self.exchange = await self.channel.declare_exchange(
                 "blog_events", aio_pika.ExchangeType.TOPIC, durable=True
@@ -29,29 +83,148 @@ class EventPublisher:
             logger.error(f"Failed to connect to RabbitMQ: {e}")
             raise
 
+    @property
+    def connected(self) -> bool:
+        """Канал к брокеру открыт (robust-соединение может быть в процессе переподключения)"""
+        return self.exchange is not None and self.channel is not None and not self.channel.is_closed
+
     async def publish(self, event):
         if not self.exchange:
             logger.error("Event publisher not connected")
             return
 
         try:
-            message_body = json.dumps(event.dict()).encode()
-            message = aio_pika.Message(
-                body=message_body,
-                content_type="application/json",
-                delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
+            await self._publish_confirmed(
+                event.event_type, event.model_dump_json().encode(), event.event_id
             )
-
-            routing_key = f"games.{event.event_type}"
-            await self.exchange.publish(message, routing_key=routing_key)
-
-            logger.debug(f"Event published: {event.event_type} -> {routing_key}")
+            logger.debug(f"Event published: {event.event_type}")
 
         except Exception as e:
             logger.error(f"Failed to publish event: {e}")
             raise
 
+    async def publish_many(self, events: Sequence) -> List:
+        """Опубликовать пачку событий; возвращает события, которые брокер не подтвердил"""
+        failed = await self._publish_batch(
+            [
+                (event.event_type, event.model_dump_json().encode(), event.event_id)
+                for event in events
+            ]
+        )
+        return [events[i] for i in failed]
+
+    async def publish_payloads(
+        self, payloads: Sequence[Dict[str, Any]], nacked: Optional[List[int]] = None
+    ) -> List[int]:
+        """
+        Опубликовать пачку уже сериализованных событий (словари с event_type),
+        например из event_outbox; возвращает номера неподтвержденных. В nacked
+        добавляются номера тех из них, которые брокер явно отклонил (nack);
+        остальные не подтверждены из-за таймаута или потери связи.
+        """
+        return await self._publish_batch(
+            [
+                (payload["event_type"], json.dumps(payload).encode(), payload.get("event_id"))
+                for payload in payloads
+            ],
+            nacked,
+        )
+
+    async def enqueue(self, event) -> None:
+        """Положить событие в буфер; подтверждение не ждем (см. flush)"""
+        self._buffer.append(event)
+        if len(self._buffer) >= self.batch_size or not self.batch_delay:
+            await self.flush()
+        elif self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def flush(self) -> List:
+        """Отправить буфер сейчас; возвращает события, которые брокер не подтвердил"""
+        if self._flush_task is not None and self._flush_task is not asyncio.current_task():
+            self._flush_task.cancel()
+        self._flush_task = None
+        events, self._buffer = self._buffer, []
+        return await self.publish_many(events)
+
+    def stats(self) -> dict:
+        return {
+            **self.metrics.stats(),
+            "buffered": len(self._buffer),
+            "max_in_flight": self.max_in_flight,
+        }
+
     async def close(self):
+        if self._buffer:
+            failed = await self.flush()
+            if failed:
+                logger.error(f"{len(failed)} buffered events were not published on close")
         if self.connection:
             await self.connection.close()
             logger.info("Event publisher connection closed")
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.batch_delay)
+        await self.flush()
+
+    async def _publish_batch(
+        self,
+        messages: List[Tuple[str, bytes, Optional[str]]],
+        nacked: Optional[List[int]] = None,
+    ) -> List[int]:
+        """Конвейер с окном max_in_flight; возвращает номера неподтвержденных сообщений"""
+        if not messages:
+            return []
+        if not self.exchange:
+            logger.error("Event publisher not connected")
+            return list(range(len(messages)))
+
+        self.metrics.batches += 1
+        failed = []
+        window = asyncio.Semaphore(self.max_in_flight)
+
+        async def send(index: int, event_type: str, body: bytes, event_id: Optional[str]) -> None:
+            try:
+                await self._publish_confirmed(event_type, body, event_id)
+            except Exception as e:
+                logger.error(f"Failed to publish event {event_type}: {e}")
+                failed.append(index)
+                if nacked is not None and isinstance(e, PublishNotConfirmedError):
+                    nacked.append(index)
+            finally:
+                window.release()
+
+        tasks = []
+        for index, (event_type, body, event_id) in enumerate(messages):
+            # Новое событие уходит, только когда освобождается место в окне
+            await window.acquire()
+            tasks.append(asyncio.create_task(send(index, event_type, body, event_id)))
+        await asyncio.gather(*tasks)
+
+        logger.debug(f"Published {len(messages) - len(failed)} of {len(messages)} events")
+        return sorted(failed)
+
+    async def _publish_confirmed(
+        self, event_type: str, body: bytes, event_id: Optional[str] = None
+    ) -> None:
+        message = aio_pika.Message(
+            body=body,
+            content_type="application/json",
+            delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
+            message_id=event_id,
+            # По нему подписчики считают задержку доставки
+            timestamp=datetime.now(timezone.utc),
+        )
+        routing_key = f"games.{event_type}"
+        started = time.perf_counter()
+        try:
+            confirmation = await self.exchange.publish(
+                message, routing_key=routing_key, timeout=self.confirm_timeout
+            )
+        except Exception:
+            self.metrics.failed += 1
+            raise
+        if not isinstance(confirmation, Basic.Ack):
+            self.metrics.failed += 1
+            self.metrics.nacked += 1
+            raise PublishNotConfirmedError(f"broker did not confirm {routing_key}")
+        self.metrics.observe(time.perf_counter() - started)
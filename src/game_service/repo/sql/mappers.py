@@ -1,6 +1,18 @@
 from __future__ import annotations
 
-from game_service.domain.models import Game, Genre, Platform, Screenshot
+from dataclasses import fields
+
+from sqlalchemy import Row
+
+from game_service.domain.models import (
+    Game,
+    GameSummary,
+    Genre,
+    Platform,
+    Screenshot,
+    SyncRun,
+    Tag,
+)
 from game_service.repo.sql import models as m
 
 
@@ -20,36 +32,37 @@ def game_to_domain(model: m.GameModel) -> Game:
         website=model.website,
         playtime=model.playtime,
         age_rating=model.age_rating,
-        platforms=[Platform(id=idx, name=p.name) for idx, p in enumerate(model.platforms, start=1)],
-        genres=[Genre(id=idx, name=g.name) for idx, g in enumerate(model.genres, start=1)],
-        tags=[t.name for t in model.tags],
+        platforms=[Platform(id=p.id, name=p.name) for p in model.platforms],
+        genres=[Genre(id=g.id, name=g.name) for g in model.genres],
+        tags=[Tag(id=t.id, name=t.name) for t in model.tags],
         screenshots=[Screenshot(id=s.id, game_id=model.id, url=s.url) for s in model.screenshots],
+        comment_count=model.stats.comment_count if model.stats else 0,
         created_at=model.created_at,
         updated_at=model.updated_at,
     )
 
 
-def game_to_model(domain: Game) -> m.GameModel:
-    model = m.GameModel(
-        id=domain.id,
-        rawg_id=domain.rawg_id,
-        slug=domain.slug,
-        name=domain.name,
-        description=domain.description,
-        metacritic=domain.metacritic,
-        rating=domain.rating,
-        release_date=domain.release_date,
-        developer=domain.developer,
-        publisher=domain.publisher,
-        background_image=domain.background_image,
-        website=domain.website,
-        playtime=domain.playtime,
-        age_rating=domain.age_rating,
+def summary_from_row(row: Row) -> GameSummary:
+    return GameSummary(
+        id=row.id,
+        name=row.name,
+        slug=row.slug,
+        release_date=row.release_date,
+        metacritic=row.metacritic,
+        rating=row.rating,
+        background_image=row.background_image,
+        platforms=list(row.platforms or []),
+        genres=list(row.genres or []),
+        comment_count=row.comment_count or 0,
     )
 
-    model.platforms = [m.PlatformModel(name=p.name) for p in domain.platforms]
-    model.genres = [m.GenreModel(name=g.name) for g in domain.genres]
-    model.tags = [m.TagModel(name=name) for name in domain.tags]
-    model.screenshots = [m.ScreenshotModel(url=s.url) for s in domain.screenshots]
 
-    return model
+SYNC_RUN_FIELDS = tuple(f.name for f in fields(SyncRun))
+
+
+def sync_run_to_domain(model: m.SyncRunModel) -> SyncRun:
+    return SyncRun(**{name: getattr(model, name) for name in SYNC_RUN_FIELDS})
+
+
+def sync_run_to_model(run: SyncRun) -> m.SyncRunModel:
+    return m.SyncRunModel(**{name: getattr(run, name) for name in SYNC_RUN_FIELDS})
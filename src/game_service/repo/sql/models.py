@@ -2,7 +2,24 @@ from __future__ import annotations
 
 from datetime import date, datetime, timezone
 
-from sqlalchemy import Date, DateTime, ForeignKey, Integer, String, Text, Float
+from sqlalchemy import (
+    BigInteger,
+    Boolean,
+    Column,
+    Computed,
+    Date,
+    DateTime,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    Table,
+    Text,
+    func,
+    literal_column,
+)
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
 
@@ -31,60 +48,223 @@ class GameModel(Base):
     website: Mapped[str | None] = mapped_column(String(512))
     playtime: Mapped[int | None]
     age_rating: Mapped[str | None] = mapped_column(String(64))
+    # Отпечаток данных из RAWG: совпадает - синхронизация не перезаписывает игру
+    content_hash: Mapped[str | None] = mapped_column(String(64))
+    # Поддерживается самой БД при каждом INSERT/UPDATE name
+    search_vector: Mapped[str | None] = mapped_column(
+        TSVECTOR,
+        Computed("to_tsvector('simple', coalesce(name, ''))", persisted=True),
+        deferred=True,
+    )
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utcnow)
     updated_at: Mapped[datetime] = mapped_column(
-        DateTime(timezone=True), default=utcnow, onupdate=utcnow
+        DateTime(timezone=True), default=utcnow, onupdate=utcnow, index=True
     )
 
+    # Связи со справочниками пишутся репозиторием напрямую в таблицы связей
     platforms: Mapped[list[PlatformModel]] = relationship(
-        "PlatformModel", cascade="all, delete-orphan", back_populates="game"
+        "PlatformModel",
+        secondary="game_platform_links",
+        viewonly=True,
+        order_by="PlatformModel.name",
     )
     genres: Mapped[list[GenreModel]] = relationship(
-        "GenreModel", cascade="all, delete-orphan", back_populates="game"
+        "GenreModel",
+        secondary="game_genre_links",
+        viewonly=True,
+        order_by="GenreModel.name",
     )
     tags: Mapped[list[TagModel]] = relationship(
-        "TagModel", cascade="all, delete-orphan", back_populates="game"
+        "TagModel",
+        secondary="game_tag_links",
+        viewonly=True,
+        order_by="TagModel.name",
     )
     screenshots: Mapped[list[ScreenshotModel]] = relationship(
         "ScreenshotModel", cascade="all, delete-orphan", back_populates="game"
     )
+    # Счетчики пишет CommentStatsAggregator; строки может не быть (счетчики нулевые)
+    stats: Mapped[GameStatsModel | None] = relationship(
+        "GameStatsModel", viewonly=True, lazy="selectin"
+    )
+
+
+# Ключ сортировки каталога: игры без рейтинга идут в конце.
+# Литерал (а не bind-параметр) нужен, чтобы выражение совпадало с индексом.
+rating_sort_key = func.coalesce(GameModel.rating, literal_column("-1.0"))
+
+Index("ix_games_rating_sort", rating_sort_key.desc(), GameModel.id.desc())
+Index(
+    "ix_games_name_trgm",
+    GameModel.name,
+    postgresql_using="gin",
+    postgresql_ops={"name": "gin_trgm_ops"},
+)
+Index("ix_games_search_vector", GameModel.search_vector, postgresql_using="gin")
+
+
+# Справочники платформ, жанров и тегов. id - идентификатор RAWG;
+# отрицательные id - записи, перенесенные из старой схемы без RAWG id,
+# они заменяются настоящими при следующей синхронизации (ON UPDATE CASCADE).
 
 
 class PlatformModel(Base):
-    __tablename__ = "game_platforms"
+    __tablename__ = "platforms"
 
-    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
-    game_id: Mapped[str] = mapped_column(ForeignKey("games.id", ondelete="CASCADE"))
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
     name: Mapped[str] = mapped_column(String(128))
 
-    game: Mapped[GameModel] = relationship(back_populates="platforms")
-
 
 class GenreModel(Base):
-    __tablename__ = "game_genres"
+    __tablename__ = "genres"
 
-    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
-    game_id: Mapped[str] = mapped_column(ForeignKey("games.id", ondelete="CASCADE"))
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
     name: Mapped[str] = mapped_column(String(128))
 
-    game: Mapped[GameModel] = relationship(back_populates="genres")
-
 
 class TagModel(Base):
-    __tablename__ = "game_tags"
+    __tablename__ = "tags"
 
-    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
-    game_id: Mapped[str] = mapped_column(ForeignKey("games.id", ondelete="CASCADE"))
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
     name: Mapped[str] = mapped_column(String(128))
 
-    game: Mapped[GameModel] = relationship(back_populates="tags")
+
+Index("ix_platforms_name_lower", func.lower(PlatformModel.name))
+Index("ix_genres_name_lower", func.lower(GenreModel.name))
+Index("ix_tags_name_lower", func.lower(TagModel.name))
+
+
+def _link_table(name: str, target: str) -> Table:
+    fk = f"{target}_id"
+    return Table(
+        name,
+        Base.metadata,
+        Column(
+            "game_id",
+            String(64),
+            ForeignKey("games.id", ondelete="CASCADE"),
+            primary_key=True,
+        ),
+        Column(
+            fk,
+            Integer,
+            ForeignKey(f"{target}s.id", ondelete="CASCADE", onupdate="CASCADE"),
+            primary_key=True,
+        ),
+        # PK (game_id, X_id) обслуживает чтение связей игры, этот индекс - фильтры по X
+        Index(f"ix_{name}_{fk}", fk, "game_id"),
+    )
+
+
+game_platform_links = _link_table("game_platform_links", "platform")
+game_genre_links = _link_table("game_genre_links", "genre")
+game_tag_links = _link_table("game_tag_links", "tag")
 
 
 class ScreenshotModel(Base):
     __tablename__ = "game_screenshots"
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
-    game_id: Mapped[str] = mapped_column(ForeignKey("games.id", ondelete="CASCADE"))
+    game_id: Mapped[str] = mapped_column(ForeignKey("games.id", ondelete="CASCADE"), index=True)
     url: Mapped[str] = mapped_column(String(512))
 
     game: Mapped[GameModel] = relationship(back_populates="screenshots")
+
+
+class RawgQuotaModel(Base):
+    """Журнал расхода запросов к RAWG: одна строка - пачка запросов одного назначения"""
+
+    __tablename__ = "rawg_quota"
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    purpose: Mapped[str] = mapped_column(String(32))
+    requests: Mapped[int] = mapped_column(Integer)
+    failed: Mapped[int] = mapped_column(Integer, default=0)
+    recorded_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=utcnow, index=True
+    )
+
+
+class SyncRunModel(Base):
+    """Фоновые задачи массовой синхронизации и их контрольные точки"""
+
+    __tablename__ = "sync_runs"
+
+    id: Mapped[str] = mapped_column(String(36), primary_key=True)
+    status: Mapped[str] = mapped_column(String(16), index=True)
+    start_page: Mapped[int] = mapped_column(Integer)
+    pages: Mapped[int] = mapped_column(Integer)
+    page_size: Mapped[int] = mapped_column(Integer)
+    load_details: Mapped[bool] = mapped_column(Boolean, default=False)
+    details_limit: Mapped[int] = mapped_column(Integer, default=0)
+    cache_mode: Mapped[str | None] = mapped_column(String(16))
+    mode: Mapped[str] = mapped_column(String(16), default="full")
+    dates: Mapped[str | None] = mapped_column(String(32))
+    since: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
+    high_water_mark: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
+    caught_up: Mapped[bool] = mapped_column(Boolean, default=False)
+    checkpoint_page: Mapped[int] = mapped_column(Integer)
+    resumed_from: Mapped[int] = mapped_column(Integer)
+    total_synced: Mapped[int] = mapped_column(Integer, default=0)
+    new_games: Mapped[int] = mapped_column(Integer, default=0)
+    updated_games: Mapped[int] = mapped_column(Integer, default=0)
+    unchanged_games: Mapped[int] = mapped_column(Integer, default=0)
+    details_loaded: Mapped[int] = mapped_column(Integer, default=0)
+    details_failed: Mapped[int] = mapped_column(Integer, default=0)
+    requests_used: Mapped[int] = mapped_column(Integer, default=0)
+    budget_exhausted: Mapped[bool] = mapped_column(Boolean, default=False)
+    cancel_requested: Mapped[bool] = mapped_column(Boolean, default=False)
+    error: Mapped[str | None] = mapped_column(Text)
+    owner: Mapped[str | None] = mapped_column(String(255))
+    stages: Mapped[dict] = mapped_column(JSONB, default=dict)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utcnow)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=utcnow, onupdate=utcnow
+    )
+    started_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
+    finished_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
+
+
+class SyncStateModel(Base):
+    """Отметки инкрементальной синхронизации: до какой даты обновления в RAWG все загружено"""
+
+    __tablename__ = "sync_state"
+
+    name: Mapped[str] = mapped_column(String(64), primary_key=True)
+    high_water_mark: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=utcnow, onupdate=utcnow
+    )
+
+
+class EventOutboxModel(Base):
+    """События, записанные вместе с играми; фоновый relay публикует и удаляет их"""
+
+    __tablename__ = "event_outbox"
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    event_type: Mapped[str] = mapped_column(String(64))
+    payload: Mapped[dict] = mapped_column(JSONB)
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    last_error: Mapped[str | None] = mapped_column(Text)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utcnow)
+    # Не раньше этого момента relay возьмет событие (повтор после неудачи)
+    available_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=utcnow, index=True
+    )
+    # Событие исчерпало попытки публикации: relay его больше не берет
+    failed_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
+
+
+class GameStatsModel(Base):
+    """Счетчики игры из событий других сервисов (комментарии)"""
+
+    __tablename__ = "game_stats"
+
+    game_id: Mapped[str] = mapped_column(
+        ForeignKey("games.id", ondelete="CASCADE"), primary_key=True
+    )
+    comment_count: Mapped[int] = mapped_column(Integer, default=0)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=utcnow, onupdate=utcnow, index=True
+    )
@@ -1,17 +1,271 @@
 from __future__ import annotations
 
-from typing import List, Optional
+import json
+from dataclasses import replace
+from datetime import date as date_type, datetime
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Sequence, Tuple
 
-from sqlalchemy import delete, func, select
+from sqlalchemy import (
+    ARRAY,
+    Column,
+    ColumnElement,
+    Integer,
+    Row,
+    ScalarSelect,
+    Select,
+    String,
+    Table,
+    and_,
+    any_,
+    column,
+    delete,
+    exists,
+    func,
+    insert,
+    literal,
+    literal_column,
+    or_,
+    select,
+    text,
+    tuple_,
+    update,
+    values,
+)
+from sqlalchemy.dialects.postgresql import aggregate_order_by, insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import InstrumentedAttribute, aliased, selectinload
 
-from game_service.domain.models import Game, Screenshot
-from game_service.domain.repositories import GameRepository, ScreenshotRepository
+from game_service.domain.models import (
+    Game,
+    GameSummary,
+    OutboxEvent,
+    PageCursor,
+    Screenshot,
+    SavedGame,
+    SearchMode,
+    SyncRun,
+)
+from game_service.domain.events import GameEvent, game_saved_event
+from game_service.domain.repositories import (
+    EventOutboxRepository,
+    GameRepository,
+    GameStatsRepository,
+    QuotaRepository,
+    ScreenshotRepository,
+    SyncRunRepository,
+    SyncStateRepository,
+)
+from game_service.domain.services import CONTENT_FIELDS, content_hash, game_changes
 from game_service.repo.sql import models as m
 from game_service.repo.sql import mappers
 
 
+# Поля игры, которые перезаписывает синхронизация (id и rawg_id - ключи)
+UPSERT_COLUMNS = (*CONTENT_FIELDS, "content_hash")
+
+# Доля рейтинга в итоговой оценке ранжированного поиска (остальное - релевантность)
+SEARCH_RATING_WEIGHT = 0.3
+
+
+def _search_relevance(search: str, search_mode: SearchMode) -> ColumnElement[float]:
+    if search_mode == "fulltext":
+        return func.ts_rank_cd(
+            m.GameModel.search_vector, func.websearch_to_tsquery("simple", search)
+        )
+    return func.similarity(m.GameModel.name, search)
+
+
+def _search_score(search: str, search_mode: SearchMode) -> ColumnElement[float]:
+    """Релевантность, смешанная с рейтингом (рейтинг RAWG в диапазоне 0..5)"""
+    rating = func.coalesce(m.GameModel.rating, 0.0) / 5.0
+    return (
+        _search_relevance(search, search_mode) * (1 - SEARCH_RATING_WEIGHT)
+        + rating * SEARCH_RATING_WEIGHT
+    )
+
+
+def _dictionary_ids(model: type[m.PlatformModel | m.GenreModel], name: str) -> Select:
+    """id справочника по точному (без учета регистра) названию"""
+    return select(model.id).where(func.lower(model.name) == name.lower())
+
+
+def _linked(link_column: Column, value: int | Select) -> ColumnElement[bool]:
+    """EXISTS по таблице связей: точное совпадение id справочника"""
+    table = link_column.table
+    match = link_column.in_(value) if isinstance(value, Select) else link_column == value
+    return exists().where(table.c.game_id == m.GameModel.id, match)
+
+
+def _comment_count() -> ColumnElement[int]:
+    """Счетчик комментариев игры; строки в game_stats может не быть"""
+    return func.coalesce(
+        select(m.GameStatsModel.comment_count)
+        .where(m.GameStatsModel.game_id == m.GameModel.id)
+        .scalar_subquery(),
+        0,
+    )
+
+
+def _aggregated(attribute: InstrumentedAttribute, link_column: Column) -> ScalarSelect:
+    """Массив значений справочника, связанных с игрой, в порядке названий"""
+    dictionary = attribute.class_
+    return (
+        select(func.array_agg(aggregate_order_by(attribute, dictionary.name)))
+        .join_from(link_column.table, dictionary, link_column == dictionary.id)
+        .where(link_column.table.c.game_id == m.GameModel.id)
+        .scalar_subquery()
+    )
+
+
+def _apply_filters(
+    query: Select,
+    *,
+    search: Optional[str] = None,
+    search_mode: SearchMode = "substring",
+    platform: Optional[str] = None,
+    genre: Optional[str] = None,
+    platform_id: Optional[int] = None,
+    genre_id: Optional[int] = None,
+    age_rating: Optional[str] = None,
+    year_from: Optional[int] = None,
+    year_to: Optional[int] = None,
+    rating_from: Optional[float] = None,
+    rating_to: Optional[float] = None,
+) -> Select:
+    """Общие фильтры для list_games/count_games"""
+    if search:
+        if search_mode == "fulltext":
+            query = query.where(
+                m.GameModel.search_vector.op("@@")(func.websearch_to_tsquery("simple", search))
+            )
+        elif search_mode == "fuzzy":
+            # Оператор % использует GIN-индекс pg_trgm и порог pg_trgm.similarity_threshold
+            query = query.where(m.GameModel.name.op("%")(search))
+        else:
+            query = query.where(m.GameModel.name.ilike(f"%{search}%"))
+    # EXISTS вместо JOIN: join по таблицам связей размножает строки игры,
+    # что ломает LIMIT и keyset-пагинацию
+    if platform_id is not None:
+        query = query.where(_linked(m.game_platform_links.c.platform_id, platform_id))
+    elif platform:
+        query = query.where(
+            _linked(m.game_platform_links.c.platform_id, _dictionary_ids(m.PlatformModel, platform))
+        )
+    if genre_id is not None:
+        query = query.where(_linked(m.game_genre_links.c.genre_id, genre_id))
+    elif genre:
+        query = query.where(
+            _linked(m.game_genre_links.c.genre_id, _dictionary_ids(m.GenreModel, genre))
+        )
+    if age_rating:
+        query = query.where(m.GameModel.age_rating.ilike(f"%{age_rating}%"))
+    if year_from:
+        query = query.where(m.GameModel.release_date >= date_type(year_from, 1, 1))
+    if year_to:
+        query = query.where(m.GameModel.release_date <= date_type(year_to, 12, 31))
+    if rating_from is not None:
+        query = query.where(m.GameModel.rating >= rating_from)
+    if rating_to is not None:
+        query = query.where(m.GameModel.rating <= rating_to)
+    return query
+
+
+def _order_page(
+    query: Select,
+    *,
+    search: Optional[str],
+    search_mode: SearchMode,
+    limit: int,
+    offset: int,
+    cursor: Optional[PageCursor],
+) -> Select:
+    """Сортировка, keyset-условие курсора и LIMIT/OFFSET для страницы каталога"""
+    sort_key = tuple_(m.rating_sort_key, m.GameModel.id)
+    if search and search_mode != "substring":
+        if cursor is not None:
+            raise ValueError("cursor is not supported for ranked search")
+        query = query.order_by(
+            _search_score(search, search_mode).desc(), m.GameModel.id.desc()
+        ).offset(offset)
+    elif cursor is not None:
+        position = tuple_(literal(cursor.rating), literal(cursor.game_id))
+        if cursor.backward:
+            query = query.where(sort_key > position).order_by(
+                m.rating_sort_key.asc(), m.GameModel.id.asc()
+            )
+        else:
+            query = query.where(sort_key < position).order_by(
+                m.rating_sort_key.desc(), m.GameModel.id.desc()
+            )
+    else:
+        query = query.order_by(m.rating_sort_key.desc(), m.GameModel.id.desc()).offset(offset)
+    return query.limit(limit)
+
+
+async def _sync_children(
+    session: AsyncSession,
+    parent_column: Column,
+    child_column: Column,
+    children: Dict[str, Iterable[Any]],
+) -> None:
+    """
+    Привести дочерние строки каждой игры к набору из children
+    (game_id -> значения child_column) двумя запросами на всю пачку:
+    DELETE только исчезнувших и INSERT только новых пар (game_id, значение).
+    Неизменившийся набор не порождает записей, сколько бы в нем ни было строк.
+    """
+    if not children:
+        return
+    table: Table = parent_column.table
+    pairs = list(
+        dict.fromkeys((parent, child) for parent, items in children.items() for child in items)
+    )
+    stale = parent_column.in_(list(children))
+    if pairs:
+        stale = and_(stale, tuple_(parent_column, child_column).not_in(pairs))
+    await session.execute(delete(table).where(stale))
+    if not pairs:
+        return
+    incoming = values(
+        column(parent_column.key, parent_column.type),
+        column(child_column.key, child_column.type),
+        name="incoming",
+    ).data(pairs)
+    parent, child = incoming.c[parent_column.key], incoming.c[child_column.key]
+    # ON CONFLICT - на случай параллельной записи той же связи
+    await session.execute(
+        pg_insert(table)
+        .from_select(
+            [parent_column.key, child_column.key],
+            select(parent, child).where(
+                ~exists().where(parent_column == parent, child_column == child)
+            ),
+        )
+        .on_conflict_do_nothing()
+    )
+
+
+async def _add_outbox_events(session: AsyncSession, events: Sequence[GameEvent]) -> None:
+    """Добавить события в event_outbox в текущей транзакции (без commit)"""
+    if not events:
+        return
+    now = m.utcnow()
+    await session.execute(
+        insert(m.EventOutboxModel).values(
+            [
+                {
+                    "event_type": event.event_type,
+                    "payload": event.model_dump(mode="json"),
+                    "attempts": 0,
+                    "created_at": now,
+                    "available_at": now,
+                }
+                for event in events
+            ]
+        )
+    )
+
+
 class SQLGameRepository(GameRepository):
     def __init__(self, session: AsyncSession):
         self.session = session
@@ -20,8 +274,11 @@ class SQLGameRepository(GameRepository):
         self,
         *,
         search: Optional[str] = None,
+        search_mode: SearchMode = "substring",
         platform: Optional[str] = None,
         genre: Optional[str] = None,
+        platform_id: Optional[int] = None,
+        genre_id: Optional[int] = None,
         age_rating: Optional[str] = None,
         year_from: Optional[int] = None,
         year_to: Optional[int] = None,
@@ -29,74 +286,219 @@ class SQLGameRepository(GameRepository):
         rating_to: Optional[float] = None,
         limit: int = 20,
         offset: int = 0,
+        cursor: Optional[PageCursor] = None,
     ) -> List[Game]:
-        from datetime import date as date_type
+        """
+        Список игр в порядке (rating DESC, id DESC).
+
+        Если передан cursor, используется keyset-пагинация (offset игнорируется):
+        стоимость запроса не зависит от глубины страницы. Для cursor.backward
+        возвращаются игры перед курсором, но в том же прямом порядке.
 
+        В режимах поиска fulltext/fuzzy игры сортируются по релевантности,
+        смешанной с рейтингом; курсор в этом случае не поддерживается.
+        """
         query = select(m.GameModel).options(
             selectinload(m.GameModel.platforms),
             selectinload(m.GameModel.genres),
             selectinload(m.GameModel.tags),
             selectinload(m.GameModel.screenshots),
         )
-        if search:
-            query = query.where(m.GameModel.name.ilike(f"%{search}%"))
-        if platform:
-            query = query.join(m.GameModel.platforms).where(
-                m.PlatformModel.name.ilike(f"%{platform}%")
-            )
-        if genre:
-            query = query.join(m.GameModel.genres).where(m.GenreModel.name.ilike(f"%{genre}%"))
-        if age_rating:
-            query = query.where(m.GameModel.age_rating.ilike(f"%{age_rating}%"))
-        if year_from:
-            query = query.where(m.GameModel.release_date >= date_type(year_from, 1, 1))
-        if year_to:
-            query = query.where(m.GameModel.release_date <= date_type(year_to, 12, 31))
-        if rating_from is not None:
-            query = query.where(m.GameModel.rating >= rating_from)
-        if rating_to is not None:
-            query = query.where(m.GameModel.rating <= rating_to)
-        query = query.offset(offset).limit(limit)
+        query = _apply_filters(
+            query,
+            search=search,
+            search_mode=search_mode,
+            platform=platform,
+            genre=genre,
+            platform_id=platform_id,
+            genre_id=genre_id,
+            age_rating=age_rating,
+            year_from=year_from,
+            year_to=year_to,
+            rating_from=rating_from,
+            rating_to=rating_to,
+        )
+        query = _order_page(
+            query, search=search, search_mode=search_mode, limit=limit, offset=offset, cursor=cursor
+        )
         result = await self.session.execute(query)
-        models = result.scalars().unique().all()
+        models = list(result.scalars().all())
+        if cursor is not None and cursor.backward:
+            models.reverse()
         return [mappers.game_to_domain(model) for model in models]
 
     async def count_games(
         self,
         *,
         search: Optional[str] = None,
+        search_mode: SearchMode = "substring",
         platform: Optional[str] = None,
         genre: Optional[str] = None,
+        platform_id: Optional[int] = None,
+        genre_id: Optional[int] = None,
         age_rating: Optional[str] = None,
         year_from: Optional[int] = None,
         year_to: Optional[int] = None,
         rating_from: Optional[float] = None,
         rating_to: Optional[float] = None,
     ) -> int:
-        from datetime import date as date_type
-
         query = select(func.count(m.GameModel.id))
-        if search:
-            query = query.where(m.GameModel.name.ilike(f"%{search}%"))
-        if platform:
-            query = query.join(m.GameModel.platforms).where(
-                m.PlatformModel.name.ilike(f"%{platform}%")
-            )
-        if genre:
-            query = query.join(m.GameModel.genres).where(m.GenreModel.name.ilike(f"%{genre}%"))
-        if age_rating:
-            query = query.where(m.GameModel.age_rating.ilike(f"%{age_rating}%"))
-        if year_from:
-            query = query.where(m.GameModel.release_date >= date_type(year_from, 1, 1))
-        if year_to:
-            query = query.where(m.GameModel.release_date <= date_type(year_to, 12, 31))
-        if rating_from is not None:
-            query = query.where(m.GameModel.rating >= rating_from)
-        if rating_to is not None:
-            query = query.where(m.GameModel.rating <= rating_to)
+        query = _apply_filters(
+            query,
+            search=search,
+            search_mode=search_mode,
+            platform=platform,
+            genre=genre,
+            platform_id=platform_id,
+            genre_id=genre_id,
+            age_rating=age_rating,
+            year_from=year_from,
+            year_to=year_to,
+            rating_from=rating_from,
+            rating_to=rating_to,
+        )
         result = await self.session.execute(query)
         return result.scalar_one() or 0
 
+    async def list_summaries(
+        self,
+        *,
+        search: Optional[str] = None,
+        search_mode: SearchMode = "substring",
+        platform: Optional[str] = None,
+        genre: Optional[str] = None,
+        platform_id: Optional[int] = None,
+        genre_id: Optional[int] = None,
+        age_rating: Optional[str] = None,
+        year_from: Optional[int] = None,
+        year_to: Optional[int] = None,
+        rating_from: Optional[float] = None,
+        rating_to: Optional[float] = None,
+        limit: int = 20,
+        offset: int = 0,
+        cursor: Optional[PageCursor] = None,
+        with_total: bool = False,
+    ) -> Tuple[List[GameSummary], Optional[int]]:
+        """
+        Страница каталога для списка игр одним запросом к БД.
+
+        Выбираются только нужные списку колонки, названия платформ и жанров
+        агрегируются в массивы на стороне БД - без загрузки ORM-объектов игр,
+        тегов, скриншотов и описаний.
+
+        with_total - дополнительно вернуть общее количество по фильтрам в том же
+        запросе: некоррелированный скалярный подзапрос (выполняется один раз) по тем
+        же фильтрам, но без условия курсора, LIMIT и OFFSET.
+        """
+        filters = dict(
+            search=search,
+            search_mode=search_mode,
+            platform=platform,
+            genre=genre,
+            platform_id=platform_id,
+            genre_id=genre_id,
+            age_rating=age_rating,
+            year_from=year_from,
+            year_to=year_to,
+            rating_from=rating_from,
+            rating_to=rating_to,
+        )
+        query = select(
+            m.GameModel.id,
+            m.GameModel.name,
+            m.GameModel.slug,
+            m.GameModel.release_date,
+            m.GameModel.metacritic,
+            m.GameModel.rating,
+            m.GameModel.background_image,
+            _aggregated(m.PlatformModel.name, m.game_platform_links.c.platform_id).label(
+                "platforms"
+            ),
+            _aggregated(m.GenreModel.name, m.game_genre_links.c.genre_id).label("genres"),
+            _comment_count().label("comment_count"),
+        )
+        if with_total:
+            filtered_ids = _apply_filters(select(m.GameModel.id), **filters).subquery()
+            total = select(func.count()).select_from(filtered_ids).scalar_subquery()
+            query = query.add_columns(total.label("total"))
+        query = _apply_filters(query, **filters)
+        query = _order_page(
+            query, search=search, search_mode=search_mode, limit=limit, offset=offset, cursor=cursor
+        )
+        rows = list((await self.session.execute(query)).all())
+        if cursor is not None and cursor.backward:
+            rows.reverse()
+
+        total_count: Optional[int] = None
+        if with_total:
+            if rows:
+                total_count = rows[0].total
+            else:
+                # Пустая страница не несет подзапрос: за пределами списка считаем отдельно
+                empty = cursor is None and offset == 0
+                total_count = 0 if empty else await self.count_games(**filters)
+        return [mappers.summary_from_row(row) for row in rows], total_count
+
+    async def estimate_games(
+        self,
+        *,
+        search: Optional[str] = None,
+        search_mode: SearchMode = "substring",
+        platform: Optional[str] = None,
+        genre: Optional[str] = None,
+        platform_id: Optional[int] = None,
+        genre_id: Optional[int] = None,
+        age_rating: Optional[str] = None,
+        year_from: Optional[int] = None,
+        year_to: Optional[int] = None,
+        rating_from: Optional[float] = None,
+        rating_to: Optional[float] = None,
+    ) -> int:
+        """
+        Приблизительное количество игр по оценке планировщика PostgreSQL.
+
+        Без фильтров берется reltuples из статистики таблицы, иначе - число строк
+        из EXPLAIN. Запрос не сканирует таблицу, но точность зависит от ANALYZE.
+        """
+        filters = dict(
+            search=search,
+            search_mode=search_mode,
+            platform=platform,
+            genre=genre,
+            platform_id=platform_id,
+            genre_id=genre_id,
+            age_rating=age_rating,
+            year_from=year_from,
+            year_to=year_to,
+            rating_from=rating_from,
+            rating_to=rating_to,
+        )
+        unfiltered = (
+            not any((search, platform, genre, age_rating, year_from, year_to))
+            and platform_id is None
+            and genre_id is None
+            and rating_from is None
+            and rating_to is None
+        )
+        if unfiltered:
+            result = await self.session.execute(
+                text("SELECT reltuples::bigint FROM pg_class WHERE oid = 'games'::regclass")
+            )
+            reltuples = result.scalar_one_or_none()
+            # -1/0 означает, что статистика еще не собиралась
+            if reltuples and reltuples > 0:
+                return int(reltuples)
+            return await self.count_games()
+
+        query = _apply_filters(select(m.GameModel.id), **filters)
+        connection = await self.session.connection()
+        compiled = query.compile(dialect=connection.dialect, compile_kwargs={"literal_binds": True})
+        result = await connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}")
+        plan = result.scalar_one()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
+
     async def get_by_id(self, game_id: str) -> Optional[Game]:
         query = (
             select(m.GameModel)
@@ -128,7 +530,244 @@ class SQLGameRepository(GameRepository):
         model = result.scalars().first()
         return mappers.game_to_domain(model) if model else None
 
-    async def upsert_game(self, game: Game) -> Game:
+    async def get_many(
+        self,
+        *,
+        ids: Sequence[str] = (),
+        slugs: Sequence[str] = (),
+        rawg_ids: Sequence[int] = (),
+        fields: Iterable[str] = (),
+    ) -> List[dict]:
+        """
+        Игры по набору id, slug и RAWG id одним запросом (= ANY(массив)).
+
+        Возвращает словари только с запрошенными полями (плюс id, slug и rawg_id
+        для сопоставления ключей); платформы, жанры, теги и скриншоты
+        агрегируются в массивы в том же запросе.
+        """
+        collections = {
+            "platforms": _aggregated(m.PlatformModel.name, m.game_platform_links.c.platform_id),
+            "genres": _aggregated(m.GenreModel.name, m.game_genre_links.c.genre_id),
+            "tags": _aggregated(m.TagModel.name, m.game_tag_links.c.tag_id),
+            "screenshots": (
+                select(
+                    func.array_agg(aggregate_order_by(m.ScreenshotModel.url, m.ScreenshotModel.id))
+                )
+                .where(m.ScreenshotModel.game_id == m.GameModel.id)
+                .scalar_subquery()
+            ),
+        }
+        computed = {**collections, "comment_count": _comment_count()}
+        columns = {"id": m.GameModel.id, "slug": m.GameModel.slug, "rawg_id": m.GameModel.rawg_id}
+        for name in fields:
+            if name in computed:
+                columns[name] = computed[name].label(name)
+            elif name not in columns:
+                columns[name] = getattr(m.GameModel, name)
+
+        conditions = []
+        if ids:
+            conditions.append(m.GameModel.id == any_(literal(list(ids), ARRAY(String))))
+        if slugs:
+            conditions.append(m.GameModel.slug == any_(literal(list(slugs), ARRAY(String))))
+        if rawg_ids:
+            conditions.append(m.GameModel.rawg_id == any_(literal(list(rawg_ids), ARRAY(Integer))))
+        if not conditions:
+            return []
+
+        query = select(*columns.values()).where(or_(*conditions))
+        result = await self.session.execute(query)
+        return [
+            {
+                name: (list(value or []) if name in collections else value)
+                for name, value in row._mapping.items()
+            }
+            for row in result.all()
+        ]
+
+    async def get_version(self, identifier: str) -> Optional[Tuple[str, str, datetime, int]]:
+        """(id, slug, updated_at, comment_count) игры по id или slug без загрузки самой игры"""
+        query = (
+            select(
+                m.GameModel.id,
+                m.GameModel.slug,
+                m.GameModel.updated_at,
+                _comment_count().label("comment_count"),
+            )
+            .where(or_(m.GameModel.id == identifier, m.GameModel.slug == identifier))
+            # Совпадение по id приоритетнее, как в get_game
+            .order_by((m.GameModel.id == identifier).desc())
+            .limit(1)
+        )
+        row = (await self.session.execute(query)).first()
+        return (row.id, row.slug, row.updated_at, row.comment_count) if row else None
+
+    async def max_updated_at(self) -> Optional[datetime]:
+        """
+        Время последнего изменения каталога, включая счетчики игр
+        (по индексам на updated_at обеих таблиц)
+        """
+        result = await self.session.execute(
+            select(
+                func.greatest(
+                    select(func.max(m.GameModel.updated_at)).scalar_subquery(),
+                    select(func.max(m.GameStatsModel.updated_at)).scalar_subquery(),
+                )
+            )
+        )
+        return result.scalar_one_or_none()
+
+    async def upsert_game(self, game: Game, *, outbox: bool = False) -> SavedGame:
+        saved = (await self.upsert_many([game], outbox=outbox))[0]
+        # Строки записаны мимо ORM - объекты из identity map могли устареть
+        stored = await self._load_games([saved.game.id])
+        return replace(saved, game=stored[saved.game.id])
+
+    async def upsert_many(
+        self, games: Sequence[Game], *, keep_details: bool = False, outbox: bool = False
+    ) -> List[SavedGame]:
+        """
+        Записать пачку игр одной транзакцией: один INSERT ... ON CONFLICT (rawg_id)
+        DO UPDATE для игр и пакетная запись скриншотов и связей со справочниками.
+
+        Игры, данные которых совпадают с сохраненными (content_hash), не
+        перезаписываются: не трогаются ни строка игры, ни связи, updated_at не
+        меняется. keep_details - не перезаписывать игры, у которых уже есть
+        детали (description). outbox - записать события game_synced/game_updated
+        новых и изменившихся игр в event_outbox той же транзакцией.
+        Возвращает SavedGame для каждой игры пачки (id - сохраненной игры), у
+        измененных - с изменениями по полям. Конкурентные синхронизации одной
+        и той же игры не конфликтуют: вставку делает БД.
+        """
+        # Одна строка на rawg_id: ON CONFLICT не может обновить строку дважды
+        by_rawg_id = {game.rawg_id: game for game in games}
+        if not by_rawg_id:
+            return []
+
+        hashes = {rawg_id: content_hash(game) for rawg_id, game in by_rawg_id.items()}
+        existing = {
+            row.rawg_id: row
+            for row in await self.session.execute(
+                select(
+                    m.GameModel.id,
+                    m.GameModel.rawg_id,
+                    m.GameModel.content_hash,
+                    m.GameModel.description.is_not(None).label("has_details"),
+                ).where(m.GameModel.rawg_id.in_(by_rawg_id))
+            )
+        }
+        results: Dict[int, SavedGame] = {}
+        to_write: List[Game] = []
+        for rawg_id, game in by_rawg_id.items():
+            row = existing.get(rawg_id)
+            if row and keep_details and row.has_details:
+                results[rawg_id] = SavedGame(replace(game, id=row.id), "kept")
+            elif row and row.content_hash == hashes[rawg_id]:
+                results[rawg_id] = SavedGame(replace(game, id=row.id), "unchanged")
+            else:
+                to_write.append(game)
+        if not to_write:
+            await self.session.commit()
+            return list(results.values())
+
+        # Прежние версии изменившихся игр - для списка изменений
+        previous = await self._load_games(
+            [existing[game.rawg_id].id for game in to_write if game.rawg_id in existing]
+        )
+        now = m.utcnow()
+        stmt = pg_insert(m.GameModel).values(
+            [
+                {
+                    "id": game.id,
+                    "rawg_id": game.rawg_id,
+                    **{name: getattr(game, name) for name in CONTENT_FIELDS},
+                    "content_hash": hashes[game.rawg_id],
+                    "created_at": now,
+                    "updated_at": now,
+                }
+                for game in to_write
+            ]
+        )
+        # Повторная проверка в самой БД: игру могла записать параллельная синхронизация
+        unchanged = m.GameModel.content_hash.is_distinct_from(stmt.excluded.content_hash)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[m.GameModel.rawg_id],
+            # id существующей игры не меняется: на него ссылаются связи и другие сервисы
+            set_={**{name: stmt.excluded[name] for name in UPSERT_COLUMNS}, "updated_at": now},
+            where=and_(unchanged, m.GameModel.description.is_(None)) if keep_details else unchanged,
+        ).returning(
+            m.GameModel.id,
+            m.GameModel.rawg_id,
+            m.GameModel.created_at,
+            m.GameModel.updated_at,
+            # xmax = 0 только у только что вставленной версии строки
+            literal_column("(xmax = 0)").label("inserted"),
+        )
+        rows = (await self.session.execute(stmt)).all()
+
+        saved: List[Game] = []
+        for row in rows:
+            game = replace(
+                by_rawg_id[row.rawg_id],
+                id=row.id,
+                created_at=row.created_at,
+                updated_at=row.updated_at,
+            )
+            game.screenshots = [replace(shot, game_id=row.id) for shot in game.screenshots]
+            saved.append(game)
+            old = previous.get(row.id)
+            if row.inserted or old is None:
+                results[row.rawg_id] = SavedGame(game, "inserted" if row.inserted else "updated")
+            else:
+                changes = game_changes(old, game)
+                # Пустой список изменений - у игры просто еще не было отпечатка
+                status = "updated" if changes else "unchanged"
+                results[row.rawg_id] = SavedGame(game, status, changes)
+        for game in to_write:
+            if game.rawg_id not in results:
+                # Пропущена проверкой в БД
+                row = existing.get(game.rawg_id)
+                results[game.rawg_id] = SavedGame(
+                    replace(game, id=row.id) if row else game, "unchanged"
+                )
+        if not saved:
+            await self.session.commit()
+            return [results[rawg_id] for rawg_id in by_rawg_id]
+
+        screenshots = m.ScreenshotModel.__table__.c
+        await _sync_children(
+            self.session,
+            screenshots.game_id,
+            screenshots.url,
+            {game.id: [shot.url for shot in game.screenshots] for game in saved},
+        )
+        await self._replace_links(
+            m.PlatformModel,
+            m.game_platform_links.c.platform_id,
+            {game.id: [(p.id, p.name) for p in game.platforms] for game in saved},
+        )
+        await self._replace_links(
+            m.GenreModel,
+            m.game_genre_links.c.genre_id,
+            {game.id: [(g.id, g.name) for g in game.genres] for game in saved},
+        )
+        await self._replace_links(
+            m.TagModel,
+            m.game_tag_links.c.tag_id,
+            {game.id: [(t.id, t.name) for t in game.tags] for game in saved},
+        )
+        if outbox:
+            await _add_outbox_events(
+                self.session,
+                [game_saved_event(entry) for entry in results.values() if entry.written],
+            )
+        await self.session.commit()
+        return [results[rawg_id] for rawg_id in by_rawg_id]
+
+    async def _load_games(self, game_ids: Sequence[str]) -> Dict[str, Game]:
+        """Игры со справочниками и скриншотами, перечитанные из БД"""
+        if not game_ids:
+            return {}
         query = (
             select(m.GameModel)
             .options(
@@ -137,43 +776,78 @@ class SQLGameRepository(GameRepository):
                 selectinload(m.GameModel.tags),
                 selectinload(m.GameModel.screenshots),
             )
-            .where(m.GameModel.rawg_id == game.rawg_id)
-        )
-        existing = await self.session.execute(query)
-        model = existing.scalars().first()
-        if model:
-            model.name = game.name
-            model.slug = game.slug
-            model.description = game.description
-            model.metacritic = game.metacritic
-            model.rating = game.rating
-            model.release_date = game.release_date
-            model.developer = game.developer
-            model.publisher = game.publisher
-            model.background_image = game.background_image
-            model.website = game.website
-            model.playtime = game.playtime
-            model.age_rating = game.age_rating
-            model.platforms = [m.PlatformModel(name=p.name) for p in game.platforms]
-            model.genres = [m.GenreModel(name=g.name) for g in game.genres]
-            model.tags = [m.TagModel(name=name) for name in game.tags]
-            model.screenshots = [m.ScreenshotModel(url=s.url) for s in game.screenshots]
-        else:
-            model = mappers.game_to_model(game)
-            self.session.add(model)
-        await self.session.commit()
-        await self.session.refresh(model, ["platforms", "genres", "tags", "screenshots"])
-        return mappers.game_to_domain(model)
+            .where(m.GameModel.id.in_(game_ids))
+            .execution_options(populate_existing=True)
+        )
+        models = (await self.session.execute(query)).scalars().all()
+        return {model.id: mappers.game_to_domain(model) for model in models}
+
+    async def _replace_links(
+        self,
+        dictionary: type[m.PlatformModel | m.GenreModel | m.TagModel],
+        link_column: Column,
+        links: Dict[str, List[Tuple[int, str]]],
+    ) -> None:
+        """
+        Записать значения в справочник и привести связи каждой игры к её набору
+        из links (game_id -> [(id, name)]).
+
+        Удаляются только связи, которых больше нет, добавляются только новые:
+        неизменившийся набор не порождает записей в таблицу связей.
+        """
+        by_game = {
+            game_id: {item_id: name for item_id, name in items if item_id and item_id > 0 and name}
+            for game_id, items in links.items()
+        }
+        by_id = {item_id: name for items in by_game.values() for item_id, name in items.items()}
+        if by_id:
+            rows = [{"id": item_id, "name": name} for item_id, name in by_id.items()]
+            # Перенесенные без RAWG id записи получают настоящий id (связи обновит каскад)
+            incoming = values(column("id", Integer), column("name", String), name="incoming").data(
+                list(by_id.items())
+            )
+            taken = aliased(dictionary)
+            await self.session.execute(
+                update(dictionary)
+                .where(
+                    dictionary.name == incoming.c.name,
+                    dictionary.id < 0,
+                    ~exists().where(taken.id == incoming.c.id),
+                )
+                .values(id=incoming.c.id)
+                .execution_options(synchronize_session=False)
+            )
+            stmt = pg_insert(dictionary).values(rows)
+            await self.session.execute(
+                stmt.on_conflict_do_update(
+                    index_elements=[dictionary.id],
+                    set_={"name": stmt.excluded.name},
+                    where=dictionary.name != stmt.excluded.name,
+                )
+            )
+
+        table: Table = link_column.table
+        await _sync_children(self.session, table.c.game_id, link_column, by_game)
 
     async def list_genres(self) -> List[str]:
-        """Получить список всех уникальных жанров"""
-        query = select(m.GenreModel.name).distinct().order_by(m.GenreModel.name)
+        """Получить список всех жанров, у которых есть игры"""
+        query = (
+            select(m.GenreModel.name)
+            .where(exists().where(m.game_genre_links.c.genre_id == m.GenreModel.id))
+            .distinct()
+            .order_by(m.GenreModel.name)
+        )
         result = await self.session.execute(query)
         return [row[0] for row in result.all()]
 
     async def list_platforms(self) -> List[str]:
-        """Получить список всех уникальных платформ"""
-        query = select(m.PlatformModel.name).distinct().order_by(m.PlatformModel.name)
+        """Получить список всех платформ, у которых есть игры"""
+        query = (
+            select(m.PlatformModel.name)
+            .where(exists().where(m.game_platform_links.c.platform_id == m.PlatformModel.id))
+            .distinct()
+            .order_by(m.PlatformModel.name)
+        )
         result = await self.session.execute(query)
         return [row[0] for row in result.all()]
 
@@ -188,6 +862,38 @@ class SQLGameRepository(GameRepository):
         result = await self.session.execute(query)
         return [row[0] for row in result.all() if row[0]]
 
+    async def search_game_ids(
+        self, search: str, search_mode: SearchMode = "substring"
+    ) -> List[str]:
+        """id всех игр, подходящих под поиск по названию"""
+        query = _apply_filters(select(m.GameModel.id), search=search, search_mode=search_mode)
+        result = await self.session.execute(query)
+        return list(result.scalars().all())
+
+    async def iter_facet_rows(self, batch_size: int = 5000) -> AsyncIterator[Sequence[Row]]:
+        """
+        Потоково отдать атрибуты всех игр для построения индекса фасетов:
+        id, rating, release_date, age_rating и массивы id/названий платформ и жанров
+        (в согласованном порядке).
+        """
+        query = select(
+            m.GameModel.id,
+            m.GameModel.rating,
+            m.GameModel.release_date,
+            m.GameModel.age_rating,
+            _aggregated(m.PlatformModel.id, m.game_platform_links.c.platform_id).label(
+                "platform_ids"
+            ),
+            _aggregated(m.PlatformModel.name, m.game_platform_links.c.platform_id).label(
+                "platform_names"
+            ),
+            _aggregated(m.GenreModel.id, m.game_genre_links.c.genre_id).label("genre_ids"),
+            _aggregated(m.GenreModel.name, m.game_genre_links.c.genre_id).label("genre_names"),
+        ).execution_options(yield_per=batch_size)
+        result = await self.session.stream(query)
+        async for rows in result.partitions():
+            yield rows
+
 
 class SQLScreenshotRepository(ScreenshotRepository):
     def __init__(self, session: AsyncSession):
@@ -201,9 +907,276 @@ class SQLScreenshotRepository(ScreenshotRepository):
         return [Screenshot(id=shot.id, game_id=game_id, url=shot.url) for shot in models]
 
     async def replace_for_game(self, game_id: str, screenshots: List[Screenshot]) -> None:
-        await self.session.execute(
-            delete(m.ScreenshotModel).where(m.ScreenshotModel.game_id == game_id)
+        table = m.ScreenshotModel.__table__.c
+        await _sync_children(
+            self.session, table.game_id, table.url, {game_id: [shot.url for shot in screenshots]}
+        )
+        await self.session.commit()
+
+
+class SQLQuotaRepository(QuotaRepository):
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def record_usage(
+        self, usage: Dict[str, Tuple[int, int]], recorded_at: Optional[datetime] = None
+    ) -> None:
+        """
+        usage: purpose -> (запросов, из них неуспешных); recorded_at - к какому
+        моменту отнести расход (по умолчанию - сейчас)
+        """
+        rows = [
+            {"purpose": purpose, "requests": requests, "failed": failed}
+            for purpose, (requests, failed) in usage.items()
+            if requests or failed
+        ]
+        if not rows:
+            return
+        if recorded_at is not None:
+            for row in rows:
+                row["recorded_at"] = recorded_at
+        await self.session.execute(insert(m.RawgQuotaModel).values(rows))
+        await self.session.commit()
+
+    async def usage_since(self, since: Optional[datetime]) -> Dict[str, Tuple[int, int]]:
+        query = select(
+            m.RawgQuotaModel.purpose,
+            func.sum(m.RawgQuotaModel.requests),
+            func.sum(m.RawgQuotaModel.failed),
+        ).group_by(m.RawgQuotaModel.purpose)
+        if since is not None:
+            query = query.where(m.RawgQuotaModel.recorded_at >= since)
+        result = await self.session.execute(query)
+        return {purpose: (int(requests), int(failed)) for purpose, requests, failed in result.all()}
+
+
+class SQLSyncRunRepository(SyncRunRepository):
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def add(self, run: SyncRun) -> SyncRun:
+        model = mappers.sync_run_to_model(run)
+        self.session.add(model)
+        await self.session.commit()
+        return mappers.sync_run_to_domain(model)
+
+    async def get(self, run_id: str) -> Optional[SyncRun]:
+        model = await self.session.get(m.SyncRunModel, run_id, populate_existing=True)
+        return mappers.sync_run_to_domain(model) if model else None
+
+    async def list_recent(self, limit: int = 20) -> List[SyncRun]:
+        result = await self.session.execute(
+            select(m.SyncRunModel).order_by(m.SyncRunModel.created_at.desc()).limit(limit)
         )
-        for shot in screenshots:
-            self.session.add(m.ScreenshotModel(game_id=game_id, url=shot.url))
+        return [mappers.sync_run_to_domain(model) for model in result.scalars().all()]
+
+    async def update(self, run_id: str, **values) -> Optional[SyncRun]:
+        result = await self.session.execute(
+            update(m.SyncRunModel)
+            .where(m.SyncRunModel.id == run_id)
+            .values(**values, updated_at=m.utcnow())
+            .returning(m.SyncRunModel)
+            .execution_options(populate_existing=True)
+        )
+        model = result.scalars().first()
         await self.session.commit()
+        return mappers.sync_run_to_domain(model) if model else None
+
+    async def claim_interrupted(self, owner: str, stale_before: datetime) -> List[SyncRun]:
+        """
+        Забрать незавершенные задачи: свои (процесс перезапустился) и чужие,
+        которые давно не сохраняли прогресс (реплика упала).
+        """
+        result = await self.session.execute(
+            update(m.SyncRunModel)
+            .where(
+                m.SyncRunModel.status.in_(("queued", "running")),
+                or_(m.SyncRunModel.owner == owner, m.SyncRunModel.updated_at < stale_before),
+            )
+            .values(owner=owner, updated_at=m.utcnow())
+            .returning(m.SyncRunModel)
+            .execution_options(populate_existing=True)
+        )
+        runs = [mappers.sync_run_to_domain(model) for model in result.scalars().all()]
+        await self.session.commit()
+        return runs
+
+
+class SQLSyncStateRepository(SyncStateRepository):
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def get_high_water_mark(self, name: str) -> Optional[datetime]:
+        model = await self.session.get(m.SyncStateModel, name, populate_existing=True)
+        return model.high_water_mark if model else None
+
+    async def advance_high_water_mark(self, name: str, value: datetime) -> datetime:
+        """Отметка только растет: параллельная задача не откатит ее назад"""
+        now = m.utcnow()
+        stmt = pg_insert(m.SyncStateModel).values(name=name, high_water_mark=value, updated_at=now)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[m.SyncStateModel.name],
+            set_={
+                "high_water_mark": func.greatest(
+                    m.SyncStateModel.high_water_mark, stmt.excluded.high_water_mark
+                ),
+                "updated_at": now,
+            },
+        ).returning(m.SyncStateModel.high_water_mark)
+        result = await self.session.execute(stmt)
+        high_water_mark = result.scalar_one()
+        await self.session.commit()
+        return high_water_mark
+
+
+class SQLEventOutboxRepository(EventOutboxRepository):
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def claim(self, limit: int) -> List[OutboxEvent]:
+        """
+        Забрать самые старые готовые к отправке события. Строки остаются
+        заблокированными до settle, другие реплики их пропускают (SKIP LOCKED).
+        """
+        result = await self.session.execute(
+            select(m.EventOutboxModel)
+            .where(
+                m.EventOutboxModel.available_at <= m.utcnow(),
+                m.EventOutboxModel.failed_at.is_(None),
+            )
+            .order_by(m.EventOutboxModel.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        return [
+            OutboxEvent(
+                id=model.id,
+                event_type=model.event_type,
+                payload=model.payload,
+                attempts=model.attempts,
+            )
+            for model in result.scalars().all()
+        ]
+
+    async def settle(
+        self,
+        published: Sequence[int],
+        failed: Sequence[int],
+        *,
+        dead: Sequence[int] = (),
+        postponed: Sequence[int] = (),
+        error: Optional[str] = None,
+        retry_at: Optional[datetime] = None,
+    ) -> None:
+        """
+        Удалить опубликованные события, отложить неудавшиеся до retry_at, пометить
+        исчерпавшие попытки (dead) неотправляемыми, отложить postponed до retry_at
+        без траты попытки (брокер недоступен) и снять блокировки
+        """
+        if published:
+            await self.session.execute(
+                delete(m.EventOutboxModel).where(m.EventOutboxModel.id.in_(published))
+            )
+        if failed:
+            await self.session.execute(
+                update(m.EventOutboxModel)
+                .where(m.EventOutboxModel.id.in_(failed))
+                .values(
+                    attempts=m.EventOutboxModel.attempts + 1,
+                    last_error=error,
+                    available_at=retry_at or m.utcnow(),
+                )
+            )
+        if dead:
+            await self.session.execute(
+                update(m.EventOutboxModel)
+                .where(m.EventOutboxModel.id.in_(dead))
+                .values(
+                    attempts=m.EventOutboxModel.attempts + 1,
+                    last_error=error,
+                    failed_at=m.utcnow(),
+                )
+            )
+        if postponed:
+            await self.session.execute(
+                update(m.EventOutboxModel)
+                .where(m.EventOutboxModel.id.in_(postponed))
+                .values(last_error=error, available_at=retry_at or m.utcnow())
+            )
+        await self.session.commit()
+
+    async def count(self, *, dead: bool = False) -> int:
+        """Сколько событий ждет публикации (dead=True - сколько исчерпало попытки)"""
+        state = (
+            m.EventOutboxModel.failed_at.is_not(None)
+            if dead
+            else m.EventOutboxModel.failed_at.is_(None)
+        )
+        result = await self.session.execute(
+            select(func.count()).select_from(m.EventOutboxModel).where(state)
+        )
+        return result.scalar_one()
+
+
+class SQLGameStatsRepository(GameStatsRepository):
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def apply_comment_deltas(self, deltas: Dict[str, int]) -> List[str]:
+        """
+        Прибавить к счетчикам комментариев накопленные изменения одним
+        UPDATE ... FROM (VALUES ...); игры без строки в game_stats получают ее
+        отдельным INSERT. Счетчик не уходит ниже нуля, события для неизвестных
+        игр пропускаются. Возвращает id игр, счетчики которых изменились.
+        """
+        if not deltas:
+            return []
+        stats = m.GameStatsModel.__table__
+        now = m.utcnow()
+        updated = await self._add_comment_deltas(deltas, now)
+        missing = set(deltas) - set(updated)
+        if missing:
+            fresh = values(column("game_id", String), column("delta", Integer), name="fresh").data(
+                [(game_id, deltas[game_id]) for game_id in missing]
+            )
+            result = await self.session.execute(
+                pg_insert(stats)
+                .from_select(
+                    ["game_id", "comment_count", "updated_at"],
+                    select(fresh.c.game_id, func.greatest(fresh.c.delta, 0), literal(now))
+                    # Только существующие игры: game_id ссылается на games
+                    .join(m.GameModel, m.GameModel.id == fresh.c.game_id),
+                )
+                .on_conflict_do_nothing(index_elements=[stats.c.game_id])
+                .returning(stats.c.game_id)
+            )
+            inserted = list(result.scalars().all())
+            updated.extend(inserted)
+            # Строку успела вставить другая реплика: прибавляем к ней исходное изменение
+            # (в INSERT оно уже обрезано до нуля); неизвестные игры UPDATE не затронет
+            raced = missing - set(inserted)
+            if raced:
+                updated.extend(
+                    await self._add_comment_deltas(
+                        {game_id: deltas[game_id] for game_id in raced}, now
+                    )
+                )
+        await self.session.commit()
+        return updated
+
+    async def _add_comment_deltas(self, deltas: Dict[str, int], now: datetime) -> List[str]:
+        """UPDATE существующих строк game_stats; возвращает id обновленных игр"""
+        stats = m.GameStatsModel.__table__
+        incoming = values(
+            column("game_id", String), column("delta", Integer), name="incoming"
+        ).data(list(deltas.items()))
+        result = await self.session.execute(
+            update(stats)
+            .where(stats.c.game_id == incoming.c.game_id)
+            .values(
+                comment_count=func.greatest(stats.c.comment_count + incoming.c.delta, 0),
+                updated_at=now,
+            )
+            .returning(stats.c.game_id)
+        )
+        return list(result.scalars().all())
@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from game_service.core.logging import get_logger
+from game_service.repo.sql.repositories import SQLGameStatsRepository
+
+log = get_logger(__name__)
+
+
+class CommentStatsAggregator:
+    """
+    Счетчики комментариев игр из событий comment_created/comment_deleted.
+
+    События не пишутся в БД по одному: изменения копятся в памяти (game_id ->
+    сумма +1/-1) и раз в flush_interval, или как только накопится max_batch
+    событий, записываются одним UPDATE на всю пачку (см.
+    SQLGameStatsRepository.apply_comment_deltas). record возвращает future,
+    которая завершается после записи пачки - consumer подтверждает сообщение
+    только тогда, поэтому при падении реплики события не теряются. Если запись
+    не удалась, изменения остаются в памяти и уходят со следующей пачкой.
+    После записи вызывается on_flushed с id изменившихся игр (сброс кэшей).
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        *,
+        flush_interval: float = 0.5,
+        max_batch: int = 100,
+        on_flushed: Optional[Callable[[List[str]], Awaitable[None]]] = None,
+    ):
+        self.session_factory = session_factory
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.on_flushed = on_flushed
+        self._deltas: Dict[str, int] = {}
+        # Ждут записи текущей пачки - по одной на событие
+        self._waiters: List[asyncio.Future] = []
+        self._wake = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self.recorded = 0
+        self.flushes = 0
+        self.games_written = 0
+        self.failed_flushes = 0
+
+    def record(self, game_id: str, delta: int) -> asyncio.Future:
+        """Учесть изменение счетчика; future завершится, когда оно будет в БД"""
+        waiter = asyncio.get_running_loop().create_future()
+        self._deltas[game_id] = self._deltas.get(game_id, 0) + delta
+        self._waiters.append(waiter)
+        self.recorded += 1
+        if len(self._waiters) >= self.max_batch:
+            self._wake.set()
+        return waiter
+
+    async def run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                log.error(f"Comment stats flush failed: {e}")
+
+    async def flush(self) -> int:
+        """Записать накопленные изменения; возвращает число учтенных событий"""
+        async with self._lock:
+            if not self._waiters:
+                return 0
+            deltas, self._deltas = self._deltas, {}
+            waiters, self._waiters = self._waiters, []
+            # +1 и -1 одной игры в пачке взаимно погашаются - такую игру не пишем
+            changed = {game_id: delta for game_id, delta in deltas.items() if delta}
+            try:
+                updated: List[str] = []
+                if changed:
+                    async with self.session_factory() as session:
+                        updated = await SQLGameStatsRepository(session).apply_comment_deltas(
+                            changed
+                        )
+            except Exception:
+                self.failed_flushes += 1
+                # Возвращаем пачку: новые изменения могли накопиться за время записи
+                for game_id, delta in deltas.items():
+                    self._deltas[game_id] = self._deltas.get(game_id, 0) + delta
+                self._waiters = waiters + self._waiters
+                raise
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.set_result(None)
+            self.flushes += 1
+            self.games_written += len(updated)
+        if updated and self.on_flushed:
+            try:
+                await self.on_flushed(updated)
+            except Exception as e:
+                # Пачка уже записана: кэши догонят по своему TTL
+                log.error(f"Comment stats flush callback failed: {e}")
+        return len(waiters)
+
+    def close(self) -> None:
+        """
+        Отбросить незаписанные изменения: их сообщения не подтверждены, и брокер
+        выдаст их заново - запись сейчас учла бы их дважды
+        """
+        for waiter in self._waiters:
+            waiter.cancel()
+        self._waiters = []
+        self._deltas = {}
+
+    def stats(self) -> dict:
+        return {
+            "pending_events": len(self._waiters),
+            "pending_games": len(self._deltas),
+            "recorded": self.recorded,
+            "flushes": self.flushes,
+            "games_written": self.games_written,
+            "failed_flushes": self.failed_flushes,
+            "max_batch": self.max_batch,
+        }
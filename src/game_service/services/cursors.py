@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+import base64
+import binascii
+import json
+
+from game_service.domain.models import PageCursor
+
+
+class InvalidCursorError(ValueError):
+    """Курсор пагинации повреждён или создан не этим сервисом"""
+
+
+def encode_cursor(cursor: PageCursor) -> str:
+    """Упаковать позицию в непрозрачную строку для клиента"""
+    payload = [cursor.rating, cursor.game_id, 1 if cursor.backward else 0]
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(value: str) -> PageCursor:
+    try:
+        padded = value + "=" * (-len(value) % 4)
+        rating, game_id, backward = json.loads(base64.urlsafe_b64decode(padded))
+        return PageCursor(rating=float(rating), game_id=str(game_id), backward=bool(backward))
+    except (binascii.Error, ValueError, TypeError) as e:
+        raise InvalidCursorError(f"Invalid cursor: {value}") from e
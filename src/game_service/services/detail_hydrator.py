@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+import time
+from typing import TYPE_CHECKING, Dict, List, Tuple
+
+from game_service.core.logging import get_logger
+from game_service.services.rawg_budget import RAWGBudget
+
+if TYPE_CHECKING:
+    # sync_jobs импортирует GameAppService, а тот - DetailDemand
+    from game_service.services.sync_jobs import ServiceScope
+
+log = get_logger(__name__)
+
+
+class DetailDemand:
+    """
+    Спрос на детали игр, которые отдали клиенту без описания.
+
+    Каждый такой запрос карточки добавляет игре единицу спроса; спрос затухает
+    экспоненциально с периодом полураспада half_life, так что вперед выходят
+    игры, которые смотрят сейчас, а не когда-то. Отслеживается не больше
+    max_games игр - при переполнении забываются наименее востребованные.
+    Игра, детали которой уже догружали, не отслеживается в течение cooldown:
+    у части игр описания в RAWG нет, и запрашивать их снова бессмысленно.
+    """
+
+    def __init__(self, half_life: float = 3600.0, max_games: int = 10000, cooldown: float = 0):
+        self.half_life = half_life
+        self.max_games = max_games
+        self.cooldown = cooldown or half_life
+        # game_id -> (спрос, момент последнего пересчета)
+        self._scores: Dict[str, Tuple[float, float]] = {}
+        # game_id -> момент, до которого спрос не учитывается
+        self._done: Dict[str, float] = {}
+        self.recorded = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+    def record(self, game_id: str) -> None:
+        now = time.monotonic()
+        done_until = self._done.get(game_id)
+        if done_until is not None:
+            if done_until > now:
+                return
+            del self._done[game_id]
+        self._scores[game_id] = (self._score(game_id, now) + 1.0, now)
+        self.recorded += 1
+        if len(self._scores) > self.max_games:
+            self._evict(now)
+
+    def top(self, n: int, min_score: float = 0.0) -> List[str]:
+        """n самых востребованных игр со спросом не ниже min_score"""
+        now = time.monotonic()
+        ranked = heapq.nlargest(
+            n, ((self._score(game_id, now), game_id) for game_id in self._scores)
+        )
+        return [game_id for score, game_id in ranked if score >= min_score]
+
+    def discard(self, game_id: str) -> None:
+        """Перестать отслеживать игру: детали догружены или загрузить их не удалось"""
+        self._scores.pop(game_id, None)
+        now = time.monotonic()
+        self._done[game_id] = now + self.cooldown
+        if len(self._done) > self.max_games:
+            self._done = {key: until for key, until in self._done.items() if until > now}
+
+    def stats(self) -> dict:
+        return {
+            "tracked": len(self._scores),
+            "max_games": self.max_games,
+            "recorded": self.recorded,
+            "evictions": self.evictions,
+            "cooling_down": len(self._done),
+        }
+
+    def _score(self, game_id: str, now: float) -> float:
+        entry = self._scores.get(game_id)
+        if entry is None:
+            return 0.0
+        score, updated = entry
+        return score * 0.5 ** ((now - updated) / self.half_life)
+
+    def _evict(self, now: float) -> None:
+        # Освобождаем десятую часть, чтобы не пересчитывать спрос на каждой записи
+        excess = len(self._scores) - self.max_games + max(1, self.max_games // 10)
+        coldest = heapq.nsmallest(
+            excess, ((self._score(game_id, now), game_id) for game_id in self._scores)
+        )
+        for _, game_id in coldest:
+            del self._scores[game_id]
+        self.evictions += len(coldest)
+
+
+class DetailHydrator:
+    """
+    Фоновая догрузка деталей игр по спросу.
+
+    Раз в interval берет до batch_size самых востребованных игр без описания и
+    загружает их детали и скриншоты из RAWG (см. GameAppService.hydrate_details).
+    Запросы идут из бюджета синхронизации и не трогают резерв; если бюджета
+    не хватает даже на одну игру, тик пропускается.
+    """
+
+    def __init__(
+        self,
+        demand: DetailDemand,
+        service_scope: ServiceScope,
+        budget: RAWGBudget,
+        *,
+        interval: float = 30.0,
+        batch_size: int = 10,
+        min_score: float = 1.0,
+    ):
+        self.demand = demand
+        self.service_scope = service_scope
+        self.budget = budget
+        self.interval = interval
+        self.batch_size = batch_size
+        self.min_score = min_score
+        self.runs = 0
+        self.loaded = 0
+        self.failed = 0
+        self.skipped_budget = 0
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.hydrate_once()
+            except Exception as e:
+                log.error(f"Detail hydration failed: {e}")
+
+    async def hydrate_once(self) -> int:
+        """Один проход; возвращает число игр, детали которых загружены"""
+        # 2 запроса на игру: детали и скриншоты
+        affordable = self.budget.available_for_sync // 2
+        if affordable < 1:
+            self.skipped_budget += 1
+            return 0
+        game_ids = self.demand.top(min(self.batch_size, affordable), self.min_score)
+        if not game_ids:
+            return 0
+        self.runs += 1
+        async with self.service_scope() as service:
+            result = await service.hydrate_details(game_ids)
+        # Игры, до которых не дошли из-за бюджета, остаются в очереди спроса
+        for game_id in (*result["loaded"], *result["failed"], *result["skipped"]):
+            self.demand.discard(game_id)
+        self.loaded += len(result["loaded"])
+        self.failed += len(result["failed"])
+        if result["loaded"]:
+            log.info(f"Hydrated details for {len(result['loaded'])} games")
+        return len(result["loaded"])
+
+    def stats(self) -> dict:
+        return {
+            **self.demand.stats(),
+            "runs": self.runs,
+            "loaded": self.loaded,
+            "failed": self.failed,
+            "skipped_budget": self.skipped_budget,
+        }
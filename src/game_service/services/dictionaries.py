@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from game_service.repo.sql.repositories import SQLGameRepository
+
+
+@dataclass(frozen=True)
+class DictionarySnapshot:
+    """Неизменяемый снимок справочников фильтров каталога"""
+
+    version: int
+    genres: List[str]
+    platforms: List[str]
+    age_ratings: List[str]
+    digest: str
+    built_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+
+
+class DictionaryCache:
+    """
+    Снимок жанров, платформ и возрастных рейтингов в памяти.
+
+    Синхронизация лишь помечает снимок устаревшим; перечитывается он при
+    следующем запросе, но не чаще min_refresh_interval, поэтому поток событий
+    game_synced во время массовой синхронизации не превращается в поток запросов
+    к БД. Версия увеличивается только при изменении содержимого.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        min_refresh_interval: float = 5.0,
+    ):
+        self.session_factory = session_factory
+        self.min_refresh_interval = min_refresh_interval
+        self._snapshot: Optional[DictionarySnapshot] = None
+        self._stale = True
+        self._refreshed_at = 0.0
+        self._lock = asyncio.Lock()
+
+    def mark_stale(self) -> None:
+        self._stale = True
+
+    async def get(self) -> DictionarySnapshot:
+        if self._snapshot is None or (
+            self._stale and time.monotonic() - self._refreshed_at >= self.min_refresh_interval
+        ):
+            await self.refresh()
+        return self._snapshot
+
+    async def refresh(self) -> DictionarySnapshot:
+        async with self._lock:
+            # Пока ждали блокировку, снимок мог обновить другой запрос
+            if self._snapshot is not None and not self._stale:
+                return self._snapshot
+            self._stale = False
+            self._refreshed_at = time.monotonic()
+            async with self.session_factory() as session:
+                repo = SQLGameRepository(session)
+                genres = await repo.list_genres()
+                platforms = await repo.list_platforms()
+                age_ratings = await repo.list_age_ratings()
+
+            payload = json.dumps([genres, platforms, age_ratings]).encode()
+            digest = hashlib.sha256(payload).hexdigest()
+            if self._snapshot is None or self._snapshot.digest != digest:
+                version = self._snapshot.version + 1 if self._snapshot else 1
+                self._snapshot = DictionarySnapshot(
+                    version=version,
+                    genres=genres,
+                    platforms=platforms,
+                    age_ratings=age_ratings,
+                    digest=digest,
+                )
+            return self._snapshot
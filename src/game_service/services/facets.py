@@ -0,0 +1,280 @@
+from __future__ import annotations
+
+import asyncio
+import math
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Dict, Iterable, List, Optional
+
+from game_service.domain.models import Game
+
+FACETS = ("genres", "platforms", "age_ratings", "years")
+
+
+class FacetIndexNotReadyError(RuntimeError):
+    """Индекс фасетов еще не построен"""
+
+
+@dataclass
+class FacetDocument:
+    """Атрибуты игры, по которым строятся фасеты"""
+
+    game_id: str
+    rating: Optional[float] = None
+    release_date: Optional[date] = None
+    age_rating: Optional[str] = None
+    platforms: Dict[int, str] = field(default_factory=dict)
+    genres: Dict[int, str] = field(default_factory=dict)
+
+    @classmethod
+    def from_game(cls, game: Game) -> "FacetDocument":
+        return cls(
+            game_id=game.id,
+            rating=game.rating,
+            release_date=game.release_date,
+            age_rating=game.age_rating,
+            platforms={p.id: p.name for p in game.platforms},
+            genres={g.id: g.name for g in game.genres},
+        )
+
+    def values(self) -> Dict[str, List[str]]:
+        return {
+            "genres": list(self.genres.values()),
+            "platforms": list(self.platforms.values()),
+            "age_ratings": [self.age_rating] if self.age_rating else [],
+            "years": [str(self.release_date.year)] if self.release_date else [],
+        }
+
+
+def _bitmap(positions: Iterable[int]) -> int:
+    """Собрать битовую карту за O(n), а не через n сдвигов большого int"""
+    positions = list(positions)
+    if not positions:
+        return 0
+    buffer = bytearray(max(positions) // 8 + 1)
+    for pos in positions:
+        buffer[pos >> 3] |= 1 << (pos & 7)
+    return int.from_bytes(buffer, "little")
+
+
+class FacetIndex:
+    """
+    In-memory индекс для подсчета фасетов каталога.
+
+    Каждой игре выдается порядковый номер (бит); для каждого значения фасета
+    хранится битовая карта игр (Python int), для рейтинга - карты по корзинам
+    в 0.01. Пересечение фильтров - AND битовых карт, количество - bit_count().
+    Счетчики фасета считаются с учетом всех фильтров, кроме фильтра по самому
+    фасету, чтобы в UI были видны альтернативы выбранному значению.
+    """
+
+    def __init__(self) -> None:
+        self.ready = False
+        self._reset()
+
+    def _reset(self) -> None:
+        self._positions: Dict[str, int] = {}
+        self._documents: List[Optional[FacetDocument]] = []
+        self._bitmaps: Dict[str, Dict[str, int]] = {name: {} for name in FACETS}
+        self._ratings: Dict[int, int] = {}
+        self._platform_names: Dict[int, str] = {}
+        self._genre_names: Dict[int, str] = {}
+        self._all = 0
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def rebuild(self, documents: Iterable[FacetDocument]) -> None:
+        """
+        Построить индекс заново. Сначала собираются позиции игр для каждого
+        значения, затем каждая карта строится один раз: upsert по одной игре
+        копировал бы растущие int и делал перестроение квадратичным.
+        """
+        self._reset()
+        # Повтор игры в выборке заменяет ее предыдущую версию
+        latest: Dict[str, FacetDocument] = {}
+        for document in documents:
+            latest[document.game_id] = document
+
+        positions: Dict[str, Dict[str, List[int]]] = {name: {} for name in FACETS}
+        ratings: Dict[int, List[int]] = {}
+        for pos, document in enumerate(latest.values()):
+            self._positions[document.game_id] = pos
+            self._documents.append(document)
+            for facet, values in document.values().items():
+                for value in values:
+                    positions[facet].setdefault(value, []).append(pos)
+            if document.rating is not None:
+                ratings.setdefault(round(document.rating * 100), []).append(pos)
+            self._platform_names.update(document.platforms)
+            self._genre_names.update(document.genres)
+
+        for facet, by_value in positions.items():
+            self._bitmaps[facet] = {value: _bitmap(items) for value, items in by_value.items()}
+        self._ratings = {bucket: _bitmap(items) for bucket, items in ratings.items()}
+        self._all = (1 << len(self._documents)) - 1
+        self.ready = True
+
+    def upsert(self, document: FacetDocument) -> None:
+        pos = self._positions.get(document.game_id)
+        if pos is None:
+            pos = len(self._documents)
+            self._positions[document.game_id] = pos
+            self._documents.append(None)
+        else:
+            self._clear(pos)
+
+        bit = 1 << pos
+        for facet, values in document.values().items():
+            bitmaps = self._bitmaps[facet]
+            for value in values:
+                bitmaps[value] = bitmaps.get(value, 0) | bit
+        if document.rating is not None:
+            bucket = round(document.rating * 100)
+            self._ratings[bucket] = self._ratings.get(bucket, 0) | bit
+        self._platform_names.update(document.platforms)
+        self._genre_names.update(document.genres)
+        self._documents[pos] = document
+        self._all |= bit
+
+    async def load(self, game_repo) -> None:
+        """
+        Перестроить индекс по всем играм из БД (SQLGameRepository.iter_facet_rows).
+        Индекс строится в потоке, чтобы не блокировать event loop, и подменяет
+        текущий целиком - запросы до этого момента видят прежнее состояние.
+        """
+        documents = []
+        async for rows in game_repo.iter_facet_rows():
+            for row in rows:
+                documents.append(
+                    FacetDocument(
+                        game_id=row.id,
+                        rating=row.rating,
+                        release_date=row.release_date,
+                        age_rating=row.age_rating,
+                        platforms=dict(zip(row.platform_ids or [], row.platform_names or [])),
+                        genres=dict(zip(row.genre_ids or [], row.genre_names or [])),
+                    )
+                )
+        fresh = FacetIndex()
+        await asyncio.to_thread(fresh.rebuild, documents)
+        self._positions = fresh._positions
+        self._documents = fresh._documents
+        self._bitmaps = fresh._bitmaps
+        self._ratings = fresh._ratings
+        self._platform_names = fresh._platform_names
+        self._genre_names = fresh._genre_names
+        self._all = fresh._all
+        self.ready = True
+
+    def bitmap_for(self, game_ids: Iterable[str]) -> int:
+        return _bitmap(self._positions[i] for i in game_ids if i in self._positions)
+
+    def counts(
+        self,
+        *,
+        platform: Optional[str] = None,
+        genre: Optional[str] = None,
+        platform_id: Optional[int] = None,
+        genre_id: Optional[int] = None,
+        age_rating: Optional[str] = None,
+        year_from: Optional[int] = None,
+        year_to: Optional[int] = None,
+        rating_from: Optional[float] = None,
+        rating_to: Optional[float] = None,
+        candidates: Optional[int] = None,
+    ) -> tuple[int, Dict[str, Dict[str, int]]]:
+        """
+        Общее количество игр по фильтрам и счетчики для каждого значения фасетов.
+
+        candidates - битовая карта игр, уже отобранных фильтрами, которых нет
+        в индексе (например, поиском по названию).
+        """
+        # id фильтруют точнее названия, как и в SQL: неизвестный id не совпадает ни с чем
+        if platform_id is not None:
+            platform = self._platform_names.get(platform_id)
+            platforms = self._exact("platforms", platform) if platform else 0
+        else:
+            platforms = self._exact("platforms", platform) if platform else None
+        if genre_id is not None:
+            genre = self._genre_names.get(genre_id)
+            genres = self._exact("genres", genre) if genre else 0
+        else:
+            genres = self._exact("genres", genre) if genre else None
+
+        base = self._all if candidates is None else self._all & candidates
+        if rating_from is not None or rating_to is not None:
+            base &= self._rating_range(rating_from, rating_to)
+
+        # Фильтры, относящиеся к фасетам (None - фильтр не задан)
+        selected = {
+            "platforms": platforms,
+            "genres": genres,
+            "age_ratings": self._contains("age_ratings", age_rating) if age_rating else None,
+            "years": self._year_range(year_from, year_to) if year_from or year_to else None,
+        }
+
+        total = base
+        for bitmap in selected.values():
+            if bitmap is not None:
+                total &= bitmap
+
+        result: Dict[str, Dict[str, int]] = {}
+        for facet in FACETS:
+            scope = base
+            for other, bitmap in selected.items():
+                if other != facet and bitmap is not None:
+                    scope &= bitmap
+            result[facet] = {
+                value: (bitmap & scope).bit_count()
+                for value, bitmap in sorted(self._bitmaps[facet].items())
+                if bitmap
+            }
+        return total.bit_count(), result
+
+    def _clear(self, pos: int) -> None:
+        document = self._documents[pos]
+        if document is None:
+            return
+        mask = ~(1 << pos)
+        for facet, values in document.values().items():
+            bitmaps = self._bitmaps[facet]
+            for value in values:
+                if value in bitmaps:
+                    bitmaps[value] &= mask
+        if document.rating is not None:
+            bucket = round(document.rating * 100)
+            self._ratings[bucket] &= mask
+
+    def _exact(self, facet: str, value: str) -> int:
+        value = value.lower()
+        result = 0
+        for name, bitmap in self._bitmaps[facet].items():
+            if name.lower() == value:
+                result |= bitmap
+        return result
+
+    def _contains(self, facet: str, value: str) -> int:
+        # Та же семантика, что у фильтра age_rating в SQL (ILIKE '%value%')
+        value = value.lower()
+        result = 0
+        for name, bitmap in self._bitmaps[facet].items():
+            if value in name.lower():
+                result |= bitmap
+        return result
+
+    def _year_range(self, year_from: Optional[int], year_to: Optional[int]) -> int:
+        result = 0
+        for year, bitmap in self._bitmaps["years"].items():
+            if (not year_from or int(year) >= year_from) and (not year_to or int(year) <= year_to):
+                result |= bitmap
+        return result
+
+    def _rating_range(self, rating_from: Optional[float], rating_to: Optional[float]) -> int:
+        low = math.ceil(rating_from * 100 - 1e-9) if rating_from is not None else None
+        high = math.floor(rating_to * 100 + 1e-9) if rating_to is not None else None
+        result = 0
+        for bucket, bitmap in self._ratings.items():
+            if (low is None or bucket >= low) and (high is None or bucket <= high):
+                result |= bitmap
+        return result
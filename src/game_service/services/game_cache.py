@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from game_service.dtos.http import GameDetailResponse
+
+
+class GameDetailCache:
+    """
+    Ограниченный LRU-кэш карточек игр с TTL.
+
+    Карточка хранится один раз по id, slug - лишь ссылка на id, поэтому
+    инвалидация по любому из ключей удаляет обе записи.
+    """
+
+    def __init__(self, maxsize: int = 1000, ttl: float = 300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict[str, Tuple[float, GameDetailResponse]] = OrderedDict()
+        self._slugs: Dict[str, str] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, identifier: str) -> Optional[GameDetailResponse]:
+        game_id = identifier if identifier in self._entries else self._slugs.get(identifier)
+        entry = self._entries.get(game_id) if game_id else None
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, game = entry
+        if expires_at < time.monotonic():
+            self._remove(game_id)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(game_id)
+        self.hits += 1
+        return game
+
+    def put(self, game: GameDetailResponse) -> None:
+        self._remove(game.id)
+        self._entries[game.id] = (time.monotonic() + self.ttl, game)
+        self._slugs[game.slug] = game.id
+        while len(self._entries) > self.maxsize:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def invalidate(self, game_id: Optional[str] = None, slug: Optional[str] = None) -> None:
+        for key in (game_id, slug and self._slugs.get(slug)):
+            if key and self._remove(key):
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._slugs.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+    def _remove(self, game_id: str) -> bool:
+        entry = self._entries.pop(game_id, None)
+        if entry is None:
+            return False
+        slug = entry[1].slug
+        if self._slugs.get(slug) == game_id:
+            del self._slugs[slug]
+        return True
@@ -1,54 +1,107 @@
 from __future__ import annotations
 
-from typing import Optional
+import asyncio
+import functools
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
 
 from game_service.clients.rawg_client import RAWGClient
-from game_service.domain.models import Game
+from game_service.clients.response_cache import CacheMode
+from game_service.domain.models import Game, PageCursor, SavedGame, SyncMode
 from game_service.domain.repositories import GameRepository
 from game_service.domain.services import GameFactory
-from game_service.domain.events import GameSyncedEvent
-from game_service.dtos.http import GameDetailResponse, GameListItem, GameListResponse, GameQuery
+from game_service.domain.events import game_saved_event
+from game_service.dtos.http import (
+    BATCH_DEFAULT_FIELDS,
+    FacetValue,
+    GameBatchMissing,
+    GameBatchRequest,
+    GameBatchResponse,
+    GameDetailResponse,
+    GameFacetsResponse,
+    GameListItem,
+    GameListResponse,
+    GameQuery,
+)
 from game_service.core.config import Settings
+from game_service.core.logging import get_logger
 from game_service.mq.publisher import EventPublisher
+from game_service.services.detail_hydrator import DetailDemand
+from game_service.services.dictionaries import DictionaryCache
+from game_service.services.facets import FacetDocument, FacetIndex, FacetIndexNotReadyError
+from game_service.services.game_cache import GameDetailCache
+from game_service.services.cursors import InvalidCursorError, decode_cursor, encode_cursor
+from game_service.services.rawg_budget import BudgetExceededError
+from game_service.services.sync_pipeline import OnCheckpoint, SyncPipeline
+
+log = get_logger(__name__)
 
 
 class GameAppService:
     def __init__(
         self,
         game_repo: GameRepository,
-        rawg_client: RAWGClient,
+        rawg_client: Optional[RAWGClient],
         settings: Settings,
         event_publisher: Optional[EventPublisher] = None,
+        game_cache: Optional[GameDetailCache] = None,
+        facet_index: Optional[FacetIndex] = None,
+        dictionaries: Optional[DictionaryCache] = None,
+        detail_demand: Optional[DetailDemand] = None,
     ):
         self.game_repo = game_repo
         self.rawg_client = rawg_client
         self.settings = settings
         self.event_publisher = event_publisher
+        self.game_cache = game_cache
+        self.facet_index = facet_index
+        self.dictionaries = dictionaries
+        self.detail_demand = detail_demand
 
     async def list_games(self, query: GameQuery) -> GameListResponse:
-        offset = (query.page - 1) * query.page_size
-        games = await self.game_repo.list_games(
+        cursor = decode_cursor(query.cursor) if query.cursor else None
+        # Ранжированный поиск сортирует по релевантности, а не по ключу курсора
+        ranked = bool(query.search) and query.search_mode != "substring"
+        if ranked and cursor:
+            raise InvalidCursorError("cursor is not supported for ranked search, use page")
+        offset = 0 if cursor else (query.page - 1) * query.page_size
+        filters = dict(
             search=query.search,
+            search_mode=query.search_mode,
             platform=query.platform,
             genre=query.genre,
+            platform_id=query.platform_id,
+            genre_id=query.genre_id,
             age_rating=query.age_rating,
             year_from=query.year_from,
             year_to=query.year_to,
             rating_from=query.rating_from,
             rating_to=query.rating_to,
-            limit=query.page_size,
-            offset=offset,
         )
-        total = await self.game_repo.count_games(
-            search=query.search,
-            platform=query.platform,
-            genre=query.genre,
-            age_rating=query.age_rating,
-            year_from=query.year_from,
-            year_to=query.year_to,
-            rating_from=query.rating_from,
-            rating_to=query.rating_to,
+        # Запрашиваем на одну игру больше, чтобы понять, есть ли следующая страница
+        page = dict(limit=query.page_size + 1, offset=offset, cursor=cursor)
+        games, total = await self.game_repo.list_summaries(
+            **filters, **page, with_total=query.total_mode == "exact"
         )
+        if query.total_mode == "estimate":
+            total = await self.game_repo.estimate_games(**filters)
+
+        has_more = len(games) > query.page_size
+        if has_more:
+            # При движении назад лишняя игра оказывается в начале списка
+            games = games[1:] if cursor and cursor.backward else games[: query.page_size]
+
+        next_cursor = prev_cursor = None
+        if games and not ranked:
+            if cursor and cursor.backward:
+                has_next, has_prev = True, has_more
+            else:
+                has_next, has_prev = has_more, cursor is not None or offset > 0
+            if has_next:
+                next_cursor = encode_cursor(PageCursor.after(games[-1]))
+            if has_prev:
+                prev_cursor = encode_cursor(PageCursor.before(games[0]))
+
         items = [
             GameListItem(
                 id=game.id,
@@ -58,52 +111,174 @@ class GameAppService:
                 metacritic=game.metacritic,
                 rating=game.rating,
                 background_image=game.background_image,
-                platforms=[p.name for p in game.platforms],
-                genres=[g.name for g in game.genres],
+                platforms=game.platforms,
+                genres=game.genres,
+                comment_count=game.comment_count,
             )
             for game in games
         ]
-        return GameListResponse(total=total, items=items)
+        return GameListResponse(
+            total=total,
+            total_is_estimate=query.total_mode == "estimate",
+            items=items,
+            next_cursor=next_cursor,
+            prev_cursor=prev_cursor,
+        )
+
+    async def get_facets(self, query: GameQuery) -> GameFacetsResponse:
+        """
+        Счетчики игр для всех значений фасетов по тем же фильтрам, что и list_games.
+        Поиск по названию выполняется в БД, остальные фильтры - по индексу фасетов.
+        """
+        if not self.facet_index or not self.facet_index.ready:
+            raise FacetIndexNotReadyError("Facet index is not ready")
+        candidates = None
+        if query.search:
+            ids = await self.game_repo.search_game_ids(query.search, query.search_mode)
+            candidates = self.facet_index.bitmap_for(ids)
+        total, counts = self.facet_index.counts(
+            platform=query.platform,
+            genre=query.genre,
+            platform_id=query.platform_id,
+            genre_id=query.genre_id,
+            age_rating=query.age_rating,
+            year_from=query.year_from,
+            year_to=query.year_to,
+            rating_from=query.rating_from,
+            rating_to=query.rating_to,
+            candidates=candidates,
+        )
+        return GameFacetsResponse(
+            total=total,
+            **{
+                facet: [FacetValue(value=value, count=count) for value, count in values.items()]
+                for facet, values in counts.items()
+            },
+        )
+
+    async def get_games_batch(self, request: GameBatchRequest) -> GameBatchResponse:
+        """Массовый поиск игр по id/slug/RAWG id; ненайденные ключи - в missing"""
+        fields = list(request.fields or BATCH_DEFAULT_FIELDS)
+        rows = await self.game_repo.get_many(
+            ids=request.ids, slugs=request.slugs, rawg_ids=request.rawg_ids, fields=fields
+        )
+        found_ids = {row["id"] for row in rows}
+        found_slugs = {row["slug"] for row in rows}
+        found_rawg_ids = {row["rawg_id"] for row in rows}
+        return GameBatchResponse(
+            items=[{name: row[name] for name in fields} for row in rows],
+            missing=GameBatchMissing(
+                ids=[key for key in dict.fromkeys(request.ids) if key not in found_ids],
+                slugs=[key for key in dict.fromkeys(request.slugs) if key not in found_slugs],
+                rawg_ids=[
+                    key for key in dict.fromkeys(request.rawg_ids) if key not in found_rawg_ids
+                ],
+            ),
+        )
+
+    async def get_game_version(self, identifier: str) -> Optional[Tuple[str, str, datetime, int]]:
+        """
+        (id, slug, updated_at, comment_count) игры для проверки условного запроса
+        без загрузки карточки
+        """
+        if self.game_cache and (cached := self.game_cache.get(identifier)):
+            return cached.id, cached.slug, cached.updated_at, cached.comment_count
+        return await self.game_repo.get_version(identifier)
+
+    async def catalog_version(self) -> Optional[datetime]:
+        return await self.game_repo.max_updated_at()
 
     async def get_game(self, identifier: str) -> Optional[GameDetailResponse]:
+        if self.game_cache and (cached := self.game_cache.get(identifier)):
+            self._record_demand(cached)
+            return cached
         game = await self.game_repo.get_by_id(identifier)
         if not game:
             game = await self.game_repo.get_by_slug(identifier)
-        return self._to_detail_response(game) if game else None
+        if not game:
+            return None
+        response = self._to_detail_response(game)
+        if self.game_cache:
+            self.game_cache.put(response)
+        self._record_demand(response)
+        return response
+
+    def _record_demand(self, response: GameDetailResponse) -> None:
+        # Карточка из краткой синхронизации - детали догрузит DetailHydrator
+        if self.detail_demand and response.description is None:
+            self.detail_demand.record(response.id)
+
+    async def hydrate_details(self, game_ids: Sequence[str]) -> Dict[str, List[str]]:
+        """
+        Загрузить из RAWG детали и скриншоты игр, у которых еще нет описания.
+
+        Игры, получившие детали с момента запроса (синхронизацией или другой
+        репликой), пропускаются без запросов к RAWG. При исчерпании бюджета
+        оставшиеся игры не попадают ни в один список - их можно повторить позже.
+
+        Returns:
+            dict со списками id: loaded - детали записаны, failed - RAWG вернул
+            ошибку, skipped - детали уже есть или игры нет в БД
+        """
+        rawg_client = self._rawg(None)
+        rows = await self.game_repo.get_many(ids=game_ids, fields=["description"])
+        pending = [row for row in rows if row["description"] is None and row["rawg_id"]]
+        pending_ids = {row["id"] for row in pending}
+        result: Dict[str, List[str]] = {
+            "loaded": [],
+            "failed": [],
+            "skipped": [game_id for game_id in game_ids if game_id not in pending_ids],
+        }
+
+        async def fetch(row: dict) -> Game:
+            # 2 запроса: game + screenshots, одновременно
+            full_data, screenshots_data = await asyncio.gather(
+                rawg_client.fetch_game(rawg_id=row["rawg_id"], purpose="hydrate_detail"),
+                rawg_client.fetch_screenshots(row["rawg_id"], purpose="hydrate_screenshots"),
+            )
+            full_data["short_screenshots"] = screenshots_data.get("results", [])
+            game = GameFactory.from_rawg(full_data)
+            game.id = row["id"]
+            return game
+
+        responses = await asyncio.gather(*(fetch(row) for row in pending), return_exceptions=True)
+        games = []
+        for row, response in zip(pending, responses):
+            if isinstance(response, BudgetExceededError):
+                continue
+            if isinstance(response, Exception):
+                log.warning(f"Failed to hydrate details for game {row['id']}: {response}")
+                result["failed"].append(row["id"])
+                continue
+            games.append(response)
+
+        for saved in await self.game_repo.upsert_many(games, outbox=self._outbox):
+            result["loaded"].append(saved.game.id)
+            if saved.written:
+                await self._on_synced(saved, buffered=True)
+        await self._flush_events()
+        return result
 
     async def sync_game(
-        self, *, rawg_id: Optional[int] = None, slug: Optional[str] = None
+        self,
+        *,
+        rawg_id: Optional[int] = None,
+        slug: Optional[str] = None,
+        cache_mode: Optional[CacheMode] = None,
     ) -> GameDetailResponse:
-        data = await self.rawg_client.fetch_game(slug=slug, rawg_id=rawg_id)
-        screenshots_data = await self.rawg_client.fetch_screenshots(data["id"])
+        rawg_client = self._rawg(cache_mode)
+        data = await rawg_client.fetch_game(slug=slug, rawg_id=rawg_id)
+        screenshots_data = await rawg_client.fetch_screenshots(data["id"])
         data["short_screenshots"] = screenshots_data.get("results", [])
         domain_game = GameFactory.from_rawg(data)
         domain_game.id = slug or str(domain_game.rawg_id) or domain_game.id
 
-        saved = await self.game_repo.upsert_game(domain_game)
-
-        # Публикуем событие синхронизации
-        if self.event_publisher:
-            try:
-                event = GameSyncedEvent(
-                    game_id=saved.id,
-                    rawg_id=saved.rawg_id,
-                    name=saved.name,
-                    slug=saved.slug,
-                    platforms=[p.name for p in saved.platforms],
-                    genres=[g.name for g in saved.genres],
-                    rating=saved.rating,
-                    release_date=saved.release_date.isoformat() if saved.release_date else None,
-                )
-                await self.event_publisher.publish(event)
-            except Exception as e:
-                # Логируем ошибку, но не прерываем выполнение
-                from game_service.core.logging import get_logger
-
-                log = get_logger(__name__)
-                log.error(f"Failed to publish game_synced event: {e}")
+        saved = await self.game_repo.upsert_game(domain_game, outbox=self._outbox)
+        # Данные не изменились - кэши и подписчиков не трогаем
+        if saved.written:
+            await self._on_synced(saved)
 
-        return self._to_detail_response(saved)
+        return self._to_detail_response(saved.game)
 
     async def sync_games_batch(
         self,
@@ -113,6 +288,11 @@ class GameAppService:
         page_size: int = 40,
         load_details: bool = False,
         details_limit: int = 0,
+        cache_mode: Optional[CacheMode] = None,
+        mode: SyncMode = "full",
+        dates: Optional[str] = None,
+        since: Optional[datetime] = None,
+        on_checkpoint: Optional[OnCheckpoint] = None,
     ) -> dict:
         """
         Массовая синхронизация игр из RAWG API.
@@ -122,127 +302,109 @@ class GameAppService:
         - Сохраняет краткую информацию об играх
         - Опционально загружает детали для популярных игр (если load_details=True)
 
+        Режим delta обходит список RAWG по дате обновления (сначала свежие) и
+        останавливается на играх, обновленных не позже since; детали изменившихся
+        игр загружаются заново. Ночное обновление стоит десятки запросов, а не сотни.
+
+        Загрузка страниц, загрузка деталей и запись в БД идут конвейером
+        (см. SyncPipeline), параллелизм задается настройками sync_*.
+
         Args:
             start_page: Начальная страница для синхронизации
             pages: Количество страниц для синхронизации
             page_size: Размер страницы (максимум 40 для RAWG)
             load_details: Загружать ли детальную информацию (дорого - 2 запроса на игру)
             details_limit: Максимум игр для загрузки деталей (0 = все)
+            cache_mode: Режим кэша ответов RAWG (None = из настроек); cache_only
+                переобрабатывает сохраненные ответы без запросов к RAWG
+            mode: full - обход по рейтингу, delta - только изменения с момента since
+            dates: Окно дат релиза RAWG, например "2024-01-01,2024-12-31"
+            since: Отметка прошлой delta-синхронизации (None - обходить до конца)
+            on_checkpoint: Колбэк продвижения контрольной точки (см. SyncPipeline)
 
         Returns:
-            dict с статистикой синхронизации
+            dict с статистикой синхронизации и пропускной способностью стадий
         """
-        total_synced = 0
-        total_updated = 0
-        total_new = 0
-        requests_used = 0
-        details_loaded = 0
-
-        for page in range(start_page, start_page + pages):
-            # Получаем список игр (1 запрос)
-            list_data = await self.rawg_client.list_games(
-                page=page,
+        rawg_client = self._rawg(cache_mode)
+        pipeline = SyncPipeline(
+            self.game_repo,
+            rawg_client,
+            # События уходят пачками, не задерживая запись в БД
+            on_saved=functools.partial(self._on_synced, buffered=True),
+            page_concurrency=self.settings.sync_page_concurrency,
+            detail_concurrency=self.settings.sync_detail_concurrency,
+            queue_size=self.settings.sync_queue_size,
+            outbox=self._outbox,
+        )
+        try:
+            result = await pipeline.run(
+                start_page=start_page,
+                pages=pages,
                 page_size=page_size,
-                ordering="-rating",  # Популярные сначала
+                load_details=load_details,
+                details_limit=details_limit,
+                # Популярные сначала; для delta - недавно обновленные сначала
+                ordering="-updated" if mode == "delta" else "-rating",
+                dates=dates,
+                stop_at=since if mode == "delta" else None,
+                refresh_details=mode == "delta",
+                on_checkpoint=on_checkpoint,
             )
-            requests_used += 1
-
-            games_list = list_data.get("results", [])
-
-            # Сохраняем игры из списка (краткая информация)
-            for game_data in games_list:
-                domain_game = GameFactory.from_rawg_list_item(game_data)
-                domain_game.id = str(domain_game.rawg_id) or domain_game.slug
-
-                # Проверяем, существует ли игра с деталями
-                existing = await self.game_repo.get_by_id(domain_game.id)
-                is_new = existing is None
-                has_details = existing is not None and existing.description is not None
-
-                # Сохраняем только если игра новая или нет деталей
-                if is_new or not has_details:
-                    saved_game = await self.game_repo.upsert_game(domain_game)
-                    if is_new:
-                        total_new += 1
-                    else:
-                        total_updated += 1
-
-                    # Публикуем событие синхронизации для новых игр
-                    if self.event_publisher and is_new:
-                        try:
-                            event = GameSyncedEvent(
-                                game_id=saved_game.id,
-                                rawg_id=saved_game.rawg_id,
-                                name=saved_game.name,
-                                slug=saved_game.slug,
-                                platforms=[p.name for p in saved_game.platforms],
-                                genres=[g.name for g in saved_game.genres],
-                                rating=saved_game.rating,
-                                release_date=saved_game.release_date.isoformat()
-                                if saved_game.release_date
-                                else None,
-                            )
-                            await self.event_publisher.publish(event)
-                        except Exception as e:
-                            from game_service.core.logging import get_logger
-
-                            log = get_logger(__name__)
-                            log.error(f"Failed to publish game_synced event: {e}")
-
-                total_synced += 1
-
-                # Загружаем детали для популярных игр (если нужно и ещё нет деталей)
-                if (
-                    load_details
-                    and not has_details
-                    and (details_limit == 0 or details_loaded < details_limit)
-                ):
-                    try:
-                        # Загружаем детали (2 запроса: game + screenshots)
-                        full_data = await self.rawg_client.fetch_game(rawg_id=domain_game.rawg_id)
-                        screenshots_data = await self.rawg_client.fetch_screenshots(
-                            domain_game.rawg_id
-                        )
-                        full_data["short_screenshots"] = screenshots_data.get("results", [])
-                        full_game = GameFactory.from_rawg(full_data)
-                        full_game.id = domain_game.id
-                        saved_full = await self.game_repo.upsert_game(full_game)
-                        requests_used += 2
-                        details_loaded += 1
-
-                        # Публикуем событие обновления игры с деталями
-                        if self.event_publisher:
-                            try:
-                                event = GameSyncedEvent(
-                                    game_id=saved_full.id,
-                                    rawg_id=saved_full.rawg_id,
-                                    name=saved_full.name,
-                                    slug=saved_full.slug,
-                                    platforms=[p.name for p in saved_full.platforms],
-                                    genres=[g.name for g in saved_full.genres],
-                                    rating=saved_full.rating,
-                                    release_date=saved_full.release_date.isoformat()
-                                    if saved_full.release_date
-                                    else None,
-                                )
-                                await self.event_publisher.publish(event)
-                            except Exception as e:
-                                from game_service.core.logging import get_logger
-
-                                log = get_logger(__name__)
-                                log.error(f"Failed to publish game_synced event: {e}")
-                    except Exception:
-                        # Игнорируем ошибки при загрузке деталей
-                        pass
-
-        return {
-            "total_synced": total_synced,
-            "new_games": total_new,
-            "updated_games": total_updated,
-            "details_loaded": details_loaded,
-            "requests_used": requests_used,
-            "pages_processed": pages,
-        }
+        finally:
+            await self._flush_events()
+        return result.as_dict()
+
+    @property
+    def _outbox(self) -> bool:
+        return self.settings.event_outbox_enabled
+
+    def _rawg(self, cache_mode: Optional[CacheMode]) -> RAWGClient:
+        if not self.rawg_client:
+            raise RuntimeError("RAWG client is not configured for this service")
+        return self.rawg_client.with_cache_mode(cache_mode) if cache_mode else self.rawg_client
+
+    async def _on_synced(self, saved: SavedGame, buffered: bool = False) -> None:
+        self._after_save(saved.game)
+        await self._publish_synced(saved, buffered)
+
+    async def _publish_synced(self, saved: SavedGame, buffered: bool = False) -> None:
+        """
+        Новая игра - game_synced, изменившаяся - game_updated со списком изменений.
+        С outbox событие уже записано вместе с игрой, его отправит OutboxRelay.
+        Иначе публикуем сразу; ошибка публикации не прерывает синхронизацию.
+        buffered - событие уходит пачкой через буфер издателя, подтверждения
+        дожидается _flush_events.
+        """
+        if not self.event_publisher or self._outbox:
+            return
+        try:
+            event = game_saved_event(saved)
+            if buffered:
+                await self.event_publisher.enqueue(event)
+            else:
+                await self.event_publisher.publish(event)
+        except Exception as e:
+            log.error(f"Failed to publish {saved.status} game event: {e}")
+
+    async def _flush_events(self) -> None:
+        if not self.event_publisher or self._outbox:
+            return
+        try:
+            failed = await self.event_publisher.flush()
+        except Exception as e:
+            log.error(f"Failed to flush game events: {e}")
+            return
+        if failed:
+            log.error(f"{len(failed)} game events were not confirmed by the broker")
+
+    def _after_save(self, game: Game) -> None:
+        # Другие реплики обновятся по событию game_synced / game_updated
+        if self.game_cache:
+            self.game_cache.invalidate(game.id, game.slug)
+        if self.facet_index and self.facet_index.ready:
+            self.facet_index.upsert(FacetDocument.from_game(game))
+        if self.dictionaries:
+            self.dictionaries.mark_stale()
 
     def _to_detail_response(self, game: Optional[Game]) -> Optional[GameDetailResponse]:
         if not game:
@@ -263,8 +425,9 @@ class GameAppService:
             age_rating=game.age_rating,
             platforms=[p.name for p in game.platforms],
             genres=[g.name for g in game.genres],
-            tags=game.tags,
+            tags=[t.name for t in game.tags],
             screenshots=[s.url for s in game.screenshots],
+            comment_count=game.comment_count,
             created_at=game.created_at,
             updated_at=game.updated_at,
         )
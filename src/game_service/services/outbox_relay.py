@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import asyncio
+from datetime import timedelta
+from typing import List
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from game_service.core.logging import get_logger
+from game_service.mq.publisher import EventPublisher
+from game_service.repo.sql.models import utcnow
+from game_service.repo.sql.repositories import SQLEventOutboxRepository
+
+log = get_logger(__name__)
+
+
+class OutboxRelay:
+    """
+    Фоновая доставка событий из event_outbox в RabbitMQ.
+
+    Игры и их события записываются одной транзакцией, поэтому запрос API не
+    ждет брокера, а событие не теряется, если брокер недоступен. Relay берет
+    пачку событий (SELECT ... FOR UPDATE SKIP LOCKED - реплики не мешают друг
+    другу), публикует ее с подтверждениями и удаляет подтвержденные; остальные
+    откладываются с растущей задержкой. Событие, которое брокер отклонил
+    (nack) max_attempts раз, помечается failed_at и больше не берется - его
+    можно вернуть в очередь вручную. Таймауты и потеря связи с брокером
+    попыткой не считаются: пока брокер недоступен, события ждут в outbox
+    сколько угодно долго. Доставка - хотя бы один раз: если
+    реплика упадет между публикацией и удалением, событие уйдет повторно.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        publisher: EventPublisher,
+        *,
+        batch_size: int = 100,
+        interval: float = 1.0,
+        retry_delay: float = 5.0,
+        max_retry_delay: float = 300.0,
+        max_attempts: int = 10,
+    ):
+        self.session_factory = session_factory
+        self.publisher = publisher
+        self.batch_size = batch_size
+        self.interval = interval
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.max_attempts = max_attempts
+        self.relayed = 0
+        self.failed = 0
+        self.dead = 0
+        self.postponed = 0
+        self.batches = 0
+        # Пачки подряд с потерей связи - задержка растет, пока брокер недоступен
+        self._outages = 0
+
+    async def run(self) -> None:
+        while True:
+            try:
+                # Полная пачка - в очереди, вероятно, есть еще: забираем без паузы
+                if await self.relay_once() == self.batch_size:
+                    continue
+            except Exception as e:
+                log.error(f"Outbox relay failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def relay_once(self) -> int:
+        """
+        Одна пачка; возвращает число опубликованных или отклоненных брокером
+        событий (0 - outbox пуст или брокер недоступен: нужна пауза)
+        """
+        if not self.publisher.connected:
+            # Пока нет канала, события остаются в outbox нетронутыми
+            return 0
+        async with self.session_factory() as session:
+            outbox = SQLEventOutboxRepository(session)
+            events = await outbox.claim(self.batch_size)
+            if not events:
+                return 0
+            payloads = [event.payload for event in events]
+            nacked: List[int] = []
+            failed = set(await self.publisher.publish_payloads(payloads, nacked))
+            published = [event.id for i, event in enumerate(events) if i not in failed]
+            rejected = [events[i] for i in sorted(nacked)]
+            # Таймаут или потеря связи - брокер недоступен, попытка не тратится
+            unreachable = [events[i] for i in sorted(failed - set(nacked))]
+            # Эта попытка - последняя: событие уходит из очереди relay
+            dead = [event for event in rejected if event.attempts + 1 >= self.max_attempts]
+            retry = [event for event in rejected if event.attempts + 1 < self.max_attempts]
+            # Задержка повтора растет с числом попыток - одинаковая для всей пачки
+            attempts = max((event.attempts for event in retry), default=0)
+            delay = min(self.retry_delay * 2**attempts, self.max_retry_delay)
+            self._outages = self._outages + 1 if unreachable else 0
+            if unreachable:
+                # Недоступный брокер откладывает и отклоненные события пачки
+                outage_delay = self.retry_delay * 2 ** (self._outages - 1)
+                delay = max(delay, min(outage_delay, self.max_retry_delay))
+            await outbox.settle(
+                published,
+                [event.id for event in retry],
+                dead=[event.id for event in dead],
+                postponed=[event.id for event in unreachable],
+                error="rejected by broker" if rejected else "broker unavailable",
+                retry_at=utcnow() + timedelta(seconds=delay),
+            )
+        self.batches += 1
+        self.relayed += len(published)
+        self.failed += len(rejected)
+        self.dead += len(dead)
+        self.postponed += len(unreachable)
+        if unreachable:
+            log.warning(
+                f"Broker unavailable, {len(unreachable)} outbox events postponed for {delay:.0f}s"
+            )
+        if retry:
+            log.warning(f"{len(retry)} outbox events rejected by broker, retrying in {delay:.0f}s")
+        if dead:
+            ids = ", ".join(str(event.id) for event in dead)
+            log.error(
+                f"{len(dead)} outbox events rejected {self.max_attempts} times "
+                f"and will not be retried: {ids}"
+            )
+        return len(events) - len(unreachable)
+
+    async def stats(self) -> dict:
+        async with self.session_factory() as session:
+            outbox = SQLEventOutboxRepository(session)
+            pending = await outbox.count()
+            dead_total = await outbox.count(dead=True)
+        return {
+            "pending": pending,
+            "dead_total": dead_total,
+            "relayed": self.relayed,
+            "failed": self.failed,
+            "dead": self.dead,
+            "postponed": self.postponed,
+            "batches": self.batches,
+        }
@@ -0,0 +1,194 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Literal, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from game_service.core.logging import get_logger
+from game_service.repo.sql.repositories import SQLQuotaRepository
+
+log = get_logger(__name__)
+
+BudgetPeriod = Literal["monthly", "total"]
+
+# Массовые запросы синхронизации и фоновая догрузка деталей не трогают резерв:
+# он остается для точечных запросов (синхронизация одной игры, поиск)
+SYNC_PURPOSES = frozenset(
+    {"sync_list", "sync_detail", "sync_screenshots", "hydrate_detail", "hydrate_screenshots"}
+)
+
+
+class BudgetExceededError(RuntimeError):
+    """Запрос к RAWG превысил бюджет (для синхронизации - бюджет за вычетом резерва)"""
+
+
+class TokenBucket:
+    """Асинхронный token bucket: rate запросов в секунду, всплески до capacity"""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        # Ожидающие стоят в очереди на блокировке - токены выдаются по порядку
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class RAWGBudget:
+    """
+    Бюджет запросов к RAWG API, общий для всех клиентов процесса.
+
+    Каждый запрос учитывается до отправки (неуспешные тоже расходуют квоту)
+    с указанием назначения (purpose) и проходит через token bucket. Расход
+    периодически сбрасывается в журнал rawg_quota; после записи общий расход
+    перечитывается из журнала, так что учитываются и другие реплики.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        *,
+        budget: int,
+        reserve: int = 0,
+        period: BudgetPeriod = "monthly",
+        rate: float = 5.0,
+        burst: int = 10,
+        flush_interval: float = 10.0,
+    ):
+        self.session_factory = session_factory
+        self.budget = budget
+        self.reserve = reserve
+        self.period = period
+        self.flush_interval = flush_interval
+        self.bucket = TokenBucket(rate, burst)
+        self._period_start = self._current_period_start()
+        # purpose -> [запросов, из них неуспешных]
+        self._recorded: Dict[str, List[int]] = {}
+        self._pending: Dict[str, List[int]] = {}
+        # Незаписанный расход закончившихся периодов: (конец периода, расход)
+        self._carryover: List[Tuple[datetime, Dict[str, List[int]]]] = []
+        self._lock = asyncio.Lock()
+
+    @property
+    def used(self) -> int:
+        return sum(r for r, _ in self._recorded.values()) + sum(
+            r for r, _ in self._pending.values()
+        )
+
+    @property
+    def remaining(self) -> int:
+        return max(0, self.budget - self.used)
+
+    @property
+    def available_for_sync(self) -> int:
+        return max(0, self.budget - self.reserve - self.used)
+
+    async def acquire(self, purpose: str) -> None:
+        """Учесть запрос и дождаться токена; BudgetExceededError - если бюджета нет"""
+        self._roll_period()
+        available = self.available_for_sync if purpose in SYNC_PURPOSES else self.remaining
+        if available < 1:
+            raise BudgetExceededError(
+                f"RAWG request budget exhausted for {purpose}: "
+                f"used {self.used} of {self.budget} (reserve {self.reserve})"
+            )
+        self._pending.setdefault(purpose, [0, 0])[0] += 1
+        await self.bucket.acquire()
+
+    def record_failure(self, purpose: str) -> None:
+        self._pending.setdefault(purpose, [0, 0])[1] += 1
+
+    async def load(self) -> None:
+        """Прочитать расход за текущий период из журнала"""
+        async with self._lock:
+            await self._reload()
+
+    async def flush(self) -> None:
+        """Записать накопленный расход в журнал и перечитать общий расход"""
+        async with self._lock:
+            # Если за время записи начнется новый период, source уйдет в _carryover,
+            # и записанное вычтется оттуда
+            source = self._pending
+            pending = {purpose: tuple(counters) for purpose, counters in source.items()}
+            async with self.session_factory() as session:
+                quota = SQLQuotaRepository(session)
+                while self._carryover:
+                    period_end, usage = self._carryover[0]
+                    await quota.record_usage(
+                        {purpose: tuple(counters) for purpose, counters in usage.items()},
+                        recorded_at=period_end,
+                    )
+                    self._carryover.pop(0)
+                await quota.record_usage(pending)
+            # Сначала перечитываем журнал, потом вычитаем записанное из ожидающего:
+            # расход не пропадает из used ни на момент
+            await self._reload()
+            for purpose, (r, f) in pending.items():
+                counters = source[purpose]
+                counters[0] -= r
+                counters[1] -= f
+
+    async def run(self) -> None:
+        """Фоновая запись расхода в журнал раз в flush_interval"""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                log.error(f"Failed to flush RAWG quota ledger: {e}")
+
+    def snapshot(self) -> Dict[str, Any]:
+        self._roll_period()
+        by_purpose: Dict[str, Dict[str, int]] = {}
+        for source in (self._recorded, self._pending):
+            for purpose, (r, f) in source.items():
+                entry = by_purpose.setdefault(purpose, {"requests": 0, "failed": 0})
+                entry["requests"] += r
+                entry["failed"] += f
+        return {
+            "budget": self.budget,
+            "reserve": self.reserve,
+            "used": self.used,
+            "remaining": self.remaining,
+            "available_for_sync": self.available_for_sync,
+            "period": self.period,
+            "period_start": self._period_start,
+            "rate_per_second": self.bucket.rate,
+            "by_purpose": dict(sorted(by_purpose.items())),
+        }
+
+    async def _reload(self) -> None:
+        async with self.session_factory() as session:
+            usage = await SQLQuotaRepository(session).usage_since(self._period_start)
+        self._recorded = {purpose: [r, f] for purpose, (r, f) in usage.items()}
+
+    def _roll_period(self) -> None:
+        period_start = self._current_period_start()
+        if period_start != self._period_start:
+            # Начался новый месяц - квота RAWG обнулилась. Незаписанный расход
+            # прошлого месяца запишется в журнал концом того месяца, а не новым
+            if any(r or f for r, f in self._pending.values()):
+                self._carryover.append((period_start - timedelta(microseconds=1), self._pending))
+            self._pending = {}
+            self._period_start = period_start
+            self._recorded = {}
+
+    def _current_period_start(self) -> Optional[datetime]:
+        if self.period == "total":
+            return None
+        now = datetime.now(timezone.utc)
+        return now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
@@ -0,0 +1,304 @@
+from __future__ import annotations
+
+import asyncio
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import AsyncContextManager, Callable, Dict, List, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from game_service.core.logging import get_logger
+from game_service.domain.models import SyncMode, SyncRun
+from game_service.repo.sql.repositories import SQLSyncRunRepository, SQLSyncStateRepository
+from game_service.services.game_service import GameAppService
+from game_service.services.sync_pipeline import SyncResult
+
+log = get_logger(__name__)
+
+# Открывает GameAppService со своей сессией БД на время выполнения задачи
+ServiceScope = Callable[[], AsyncContextManager[GameAppService]]
+
+# Счетчики задачи, которые суммируются по всем ее запускам
+COUNTERS = (
+    "total_synced",
+    "new_games",
+    "updated_games",
+    "unchanged_games",
+    "details_loaded",
+    "details_failed",
+    "requests_used",
+)
+
+
+class SyncJobNotFoundError(LookupError):
+    """Задача синхронизации не найдена"""
+
+
+class SyncJobStateError(RuntimeError):
+    """Операция недопустима в текущем статусе задачи"""
+
+
+class SyncJobCancelled(Exception):
+    """Отмена задачи запрошена (возможно, с другой реплики)"""
+
+
+class SyncJobManager:
+    """
+    Фоновые задачи массовой синхронизации.
+
+    Задача выполняется в фоне этого процесса; состояние, контрольная точка и
+    счетчики хранятся в sync_runs, поэтому статус виден с любой реплики, а
+    прерванная задача (перезапуск, падение, исчерпанный бюджет) продолжается
+    со страницы после контрольной точки и не тратит запросы повторно.
+    Отмена с другой реплики - флаг cancel_requested, его замечает heartbeat.
+
+    Задача в режиме delta берет при создании отметку прошлой delta-синхронизации
+    (sync_state) и по завершении сдвигает ее на самую позднюю дату обновления
+    среди загруженных игр - если дошла до уже известных данных.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        service_scope: ServiceScope,
+        *,
+        owner: str,
+        heartbeat_interval: float = 30.0,
+        stale_after: float = 300.0,
+    ):
+        self.session_factory = session_factory
+        self.service_scope = service_scope
+        self.owner = owner
+        self.heartbeat_interval = heartbeat_interval
+        self.stale_after = stale_after
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._shutting_down = False
+
+    async def submit(
+        self,
+        *,
+        start_page: int = 1,
+        pages: int = 1,
+        page_size: int = 40,
+        load_details: bool = False,
+        details_limit: int = 0,
+        cache_mode: Optional[str] = None,
+        mode: SyncMode = "full",
+        dates: Optional[str] = None,
+    ) -> SyncRun:
+        since = None
+        if mode == "delta":
+            async with self.session_factory() as session:
+                since = await SQLSyncStateRepository(session).get_high_water_mark(
+                    _state_name(dates)
+                )
+        run = SyncRun(
+            id=str(uuid.uuid4()),
+            status="queued",
+            start_page=start_page,
+            pages=pages,
+            page_size=page_size,
+            load_details=load_details,
+            details_limit=details_limit,
+            cache_mode=cache_mode,
+            mode=mode,
+            dates=dates,
+            since=since,
+            checkpoint_page=start_page - 1,
+            resumed_from=start_page - 1,
+            owner=self.owner,
+            created_at=_utcnow(),
+            updated_at=_utcnow(),
+        )
+        async with self.session_factory() as session:
+            run = await SQLSyncRunRepository(session).add(run)
+        self._start(run)
+        return run
+
+    async def get(self, run_id: str) -> SyncRun:
+        async with self.session_factory() as session:
+            run = await SQLSyncRunRepository(session).get(run_id)
+        if run is None:
+            raise SyncJobNotFoundError(run_id)
+        return run
+
+    async def list_recent(self, limit: int = 20) -> List[SyncRun]:
+        async with self.session_factory() as session:
+            return await SQLSyncRunRepository(session).list_recent(limit)
+
+    async def cancel(self, run_id: str) -> SyncRun:
+        run = await self.get(run_id)
+        if run.finished:
+            raise SyncJobStateError(f"sync job {run_id} is already {run.status}")
+        run = await self._update(run_id, cancel_requested=True)
+        if task := self._tasks.get(run_id):
+            task.cancel()
+        return run
+
+    async def resume(self, run_id: str) -> SyncRun:
+        """Продолжить остановленную, отмененную или упавшую задачу с контрольной точки"""
+        run = await self.get(run_id)
+        if not run.finished or run.status == "completed":
+            raise SyncJobStateError(f"sync job {run_id} is {run.status}")
+        run = await self._update(
+            run_id,
+            status="queued",
+            cancel_requested=False,
+            budget_exhausted=False,
+            error=None,
+            finished_at=None,
+            owner=self.owner,
+        )
+        self._start(run)
+        return run
+
+    async def resume_interrupted(self) -> int:
+        """При старте: подхватить задачи, прерванные перезапуском или падением реплики"""
+        stale_before = _utcnow() - timedelta(seconds=self.stale_after)
+        async with self.session_factory() as session:
+            runs = await SQLSyncRunRepository(session).claim_interrupted(self.owner, stale_before)
+        for run in runs:
+            log.info(f"Resuming sync job {run.id} after page {run.checkpoint_page}")
+            self._start(run)
+        return len(runs)
+
+    async def shutdown(self) -> None:
+        """Остановить задачи, оставив их в статусе running: после рестарта они продолжатся"""
+        self._shutting_down = True
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    @staticmethod
+    def eta_seconds(run: SyncRun) -> Optional[float]:
+        """Оценка оставшегося времени по скорости текущего запуска"""
+        if run.status != "running" or not run.started_at:
+            return None
+        done = run.checkpoint_page - run.resumed_from
+        if done <= 0:
+            return None
+        elapsed = (_utcnow() - run.started_at).total_seconds()
+        return round(elapsed / done * (run.last_page - run.checkpoint_page), 1)
+
+    def _start(self, run: SyncRun) -> None:
+        task = asyncio.create_task(self._run(run))
+        self._tasks[run.id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(run.id, None))
+
+    async def _run(self, run: SyncRun) -> None:
+        base = {name: getattr(run, name) for name in COUNTERS}
+        base["high_water_mark"] = run.high_water_mark
+        run = await self._update(
+            run.id,
+            status="running",
+            owner=self.owner,
+            started_at=_utcnow(),
+            resumed_from=run.checkpoint_page,
+        )
+        heartbeat = asyncio.create_task(self._heartbeat(run.id))
+
+        async def on_checkpoint(page: int, result: SyncResult) -> None:
+            updated = await self._update(
+                run.id, checkpoint_page=page, **_progress(base, result.as_dict())
+            )
+            if updated.cancel_requested:
+                raise SyncJobCancelled(run.id)
+
+        details_limit = run.details_limit
+        if details_limit:
+            # Лимит деталей - на всю задачу, а не на каждый запуск
+            details_limit = max(0, details_limit - run.details_loaded)
+        try:
+            async with self.service_scope() as service:
+                result = await service.sync_games_batch(
+                    start_page=run.checkpoint_page + 1,
+                    pages=run.last_page - run.checkpoint_page,
+                    page_size=run.page_size,
+                    load_details=run.load_details and (not run.details_limit or details_limit > 0),
+                    details_limit=details_limit,
+                    cache_mode=run.cache_mode,
+                    mode=run.mode,
+                    dates=run.dates,
+                    since=run.since,
+                    on_checkpoint=on_checkpoint,
+                )
+            status = "stopped" if result["budget_exhausted"] else "completed"
+            run = await self._update(
+                run.id,
+                status=status,
+                checkpoint_page=result["checkpoint_page"],
+                budget_exhausted=result["budget_exhausted"],
+                caught_up=result["caught_up"],
+                finished_at=_utcnow(),
+                **_progress(base, result),
+            )
+            if run.mode == "delta" and status == "completed":
+                await self._advance_high_water_mark(run)
+            log.info(f"Sync job {run.id} {status}")
+        except (asyncio.CancelledError, SyncJobCancelled):
+            if self._shutting_down:
+                # Задача продолжится после перезапуска
+                log.info(f"Sync job {run.id} interrupted by shutdown")
+            else:
+                await self._update(run.id, status="cancelled", finished_at=_utcnow())
+                log.info(f"Sync job {run.id} cancelled")
+        except Exception as e:
+            log.error(f"Sync job {run.id} failed: {e}", exc_info=True)
+            await self._update(run.id, status="failed", error=str(e), finished_at=_utcnow())
+        finally:
+            heartbeat.cancel()
+
+    async def _advance_high_water_mark(self, run: SyncRun) -> None:
+        if not run.high_water_mark:
+            return
+        if not run.caught_up and run.since:
+            # Между пройденными страницами и прошлой отметкой остались непросмотренные
+            # изменения: отметку не сдвигаем, следующая delta-задача пройдет их заново
+            log.warning(
+                f"Delta sync job {run.id} did not reach known data after {run.pages} pages, "
+                f"high-water mark stays at {run.since.isoformat()}"
+            )
+            return
+        async with self.session_factory() as session:
+            mark = await SQLSyncStateRepository(session).advance_high_water_mark(
+                _state_name(run.dates), run.high_water_mark
+            )
+        log.info(f"Delta sync high-water mark advanced to {mark.isoformat()}")
+
+    async def _heartbeat(self, run_id: str) -> None:
+        """Отмечать, что задача жива, и замечать отмену, запрошенную с другой реплики"""
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                run = await self._update(run_id)
+            except Exception as e:
+                log.error(f"Sync job {run_id} heartbeat failed: {e}")
+                continue
+            if run.cancel_requested and (task := self._tasks.get(run_id)):
+                task.cancel()
+                return
+
+    async def _update(self, run_id: str, **values) -> SyncRun:
+        async with self.session_factory() as session:
+            run = await SQLSyncRunRepository(session).update(run_id, **values)
+        if run is None:
+            raise SyncJobNotFoundError(run_id)
+        return run
+
+
+def _progress(base: dict, result: dict) -> dict:
+    values = {name: base[name] + result[name] for name in COUNTERS}
+    values["stages"] = result["stages"]
+    marks = [mark for mark in (base["high_water_mark"], result["high_water_mark"]) if mark]
+    values["high_water_mark"] = max(marks, default=None)
+    return values
+
+
+def _state_name(dates: Optional[str]) -> str:
+    """Отметка delta-синхронизации своя для каждого окна дат релиза"""
+    return f"delta:{dates}" if dates else "delta"
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
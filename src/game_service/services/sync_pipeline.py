@@ -0,0 +1,415 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+import httpx
+
+from game_service.clients.rawg_client import RAWGClient
+from game_service.clients.response_cache import ResponseCacheMissError
+from game_service.core.logging import get_logger
+from game_service.domain.models import Game, SavedGame
+from game_service.domain.repositories import GameRepository
+from game_service.domain.services import GameFactory
+from game_service.services.rawg_budget import BudgetExceededError
+
+log = get_logger(__name__)
+
+# Колбэк после записи новой или изменившейся игры
+OnSaved = Callable[[SavedGame], Awaitable[None]]
+# Колбэк продвижения контрольной точки: (последняя завершенная страница, текущая статистика)
+OnCheckpoint = Callable[[int, "SyncResult"], Awaitable[None]]
+
+STAGES = ("pages", "details", "write")
+
+_DONE = object()
+
+
+@dataclass
+class StageStats:
+    """Счетчики стадии конвейера: обработанные элементы и время работы стадии"""
+
+    items: int = 0
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    def mark(self, count: int = 1) -> None:
+        now = time.perf_counter()
+        if self.started_at is None:
+            self.started_at = now
+        self.items += count
+        self.finished_at = now
+
+    def start(self) -> None:
+        if self.started_at is None:
+            self.started_at = time.perf_counter()
+
+    @property
+    def seconds(self) -> float:
+        if self.started_at is None or self.finished_at is None:
+            return 0.0
+        return self.finished_at - self.started_at
+
+    def as_dict(self) -> Dict[str, float]:
+        seconds = self.seconds
+        return {
+            "items": self.items,
+            "seconds": round(seconds, 3),
+            "per_second": round(self.items / seconds, 2) if seconds > 0 else float(self.items),
+        }
+
+
+@dataclass
+class SyncResult:
+    total_synced: int = 0
+    new_games: int = 0
+    updated_games: int = 0
+    unchanged_games: int = 0
+    details_loaded: int = 0
+    details_failed: int = 0
+    requests_used: int = 0
+    pages_processed: int = 0
+    checkpoint_page: int = 0
+    budget_exhausted: bool = False
+    # Самая поздняя дата обновления в RAWG среди загруженных игр
+    high_water_mark: Optional[datetime] = None
+    # Дошли до уже известных данных (stop_at) или до конца списка RAWG
+    caught_up: bool = False
+    elapsed_seconds: float = 0.0
+    stages: Dict[str, StageStats] = field(
+        default_factory=lambda: {name: StageStats() for name in STAGES}
+    )
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "total_synced": self.total_synced,
+            "new_games": self.new_games,
+            "updated_games": self.updated_games,
+            "unchanged_games": self.unchanged_games,
+            "details_loaded": self.details_loaded,
+            "details_failed": self.details_failed,
+            "requests_used": self.requests_used,
+            "pages_processed": self.pages_processed,
+            "checkpoint_page": self.checkpoint_page,
+            "budget_exhausted": self.budget_exhausted,
+            "high_water_mark": self.high_water_mark,
+            "caught_up": self.caught_up,
+            "elapsed_seconds": round(self.elapsed_seconds, 3),
+            "stages": {name: stats.as_dict() for name, stats in self.stages.items()},
+        }
+
+
+class SyncPipeline:
+    """
+    Конвейер массовой синхронизации из RAWG.
+
+    Стадии работают одновременно и связаны очередями:
+    - pages: страницы list_games загружаются параллельно (page_concurrency);
+    - details: детали и скриншоты игр загружаются параллельно (detail_concurrency),
+      запросы game и screenshots одной игры идут одновременно;
+    - write: единственный писатель в БД - сессия SQLAlchemy не допускает
+      конкурентного использования; страница и накопившиеся детали пишутся
+      пачкой через upsert_many.
+    Очередь писателя ограничена (queue_size), так что загрузка не убегает
+    далеко вперед записи. Если закончился бюджет запросов к RAWG, новые
+    запросы не отправляются, а уже загруженное дописывается в БД.
+
+    Страница завершена, когда записаны ее игры и их детали. Контрольная точка -
+    последняя страница, до которой завершены все страницы подряд; о ее
+    продвижении сообщает on_checkpoint, продолжать синхронизацию нужно со
+    следующей страницы.
+
+    Инкрементальный обход (ordering="-updated", stop_at): игры, обновленные в
+    RAWG не позже stop_at, уже известны - они не пишутся, а страницы после первой
+    встретившейся такой игры не запрашиваются. Так же обход останавливается на
+    последней странице списка (например, для окна дат dates).
+
+    outbox - события новых и изменившихся игр пишутся в event_outbox вместе с
+    играми (см. GameRepository.upsert_many).
+    """
+
+    def __init__(
+        self,
+        game_repo: GameRepository,
+        rawg_client: RAWGClient,
+        *,
+        on_saved: OnSaved,
+        page_concurrency: int = 4,
+        detail_concurrency: int = 8,
+        queue_size: int = 200,
+        outbox: bool = False,
+    ):
+        self.game_repo = game_repo
+        self.rawg_client = rawg_client
+        self.on_saved = on_saved
+        self.page_concurrency = max(1, page_concurrency)
+        self.detail_concurrency = max(1, detail_concurrency)
+        self.queue_size = max(1, queue_size)
+        self.outbox = outbox
+
+    async def run(
+        self,
+        *,
+        start_page: int = 1,
+        pages: int = 1,
+        page_size: int = 40,
+        load_details: bool = False,
+        details_limit: int = 0,
+        ordering: str = "-rating",
+        dates: Optional[str] = None,
+        stop_at: Optional[datetime] = None,
+        refresh_details: bool = False,
+        on_checkpoint: Optional[OnCheckpoint] = None,
+    ) -> SyncResult:
+        """
+        refresh_details - заново загружать детали игр, у которых они уже есть
+        (для изменившихся в RAWG игр при инкрементальном обходе).
+        """
+        result = SyncResult(checkpoint_page=start_page - 1)
+        started = time.perf_counter()
+        # ("page", (page, [raw list items])) | ("detail", (page, Game)) | ("done", None)
+        write_queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        # Без ограничения: писатель не должен блокироваться на очереди деталей,
+        # пока загрузчики деталей ждут места в очереди писателя
+        detail_queue: asyncio.Queue = asyncio.Queue()
+        page_semaphore = asyncio.Semaphore(self.page_concurrency)
+        details_requested = 0
+        # page -> сколько игр страницы еще ждут деталей
+        outstanding: Dict[int, int] = {}
+        finished_pages: Set[int] = set()
+        checkpoint_lock = asyncio.Lock()
+        # Страницы после last_page не запрашиваются: список кончился или дальше известные игры
+        last_page = start_page + pages - 1
+
+        def stop_after(page: int) -> None:
+            nonlocal last_page
+            last_page = min(last_page, page)
+            result.caught_up = True
+
+        async def page_done(page: int) -> None:
+            async with checkpoint_lock:
+                finished_pages.add(page)
+                advanced = False
+                while result.checkpoint_page + 1 in finished_pages:
+                    finished_pages.remove(result.checkpoint_page + 1)
+                    result.checkpoint_page += 1
+                    advanced = True
+                if advanced and on_checkpoint:
+                    await on_checkpoint(result.checkpoint_page, result)
+
+        async def detail_done(page: int) -> None:
+            outstanding[page] -= 1
+            if not outstanding[page]:
+                del outstanding[page]
+                await page_done(page)
+
+        def stop_on_budget(error: BudgetExceededError) -> None:
+            # Новые запросы больше не отправляются, уже загруженное дописывается
+            if not result.budget_exhausted:
+                log.warning(f"Sync stopped: {error}")
+            result.budget_exhausted = True
+
+        async def fetch_page(page: int) -> None:
+            async with page_semaphore:
+                if page > last_page:
+                    await page_done(page)
+                    return
+                if result.budget_exhausted:
+                    return
+                result.stages["pages"].start()
+                try:
+                    list_data = await self.rawg_client.list_games(
+                        page=page,
+                        page_size=page_size,
+                        ordering=ordering,
+                        dates=dates,
+                        purpose="sync_list",
+                    )
+                except BudgetExceededError as e:
+                    # Запрос не был отправлен
+                    stop_on_budget(e)
+                    return
+                except ResponseCacheMissError as e:
+                    # cache_only: страницы нет в кэше, остальные обрабатываем
+                    log.warning(f"Sync page {page} skipped: {e}")
+                    await page_done(page)
+                    return
+                except httpx.HTTPStatusError as e:
+                    result.requests_used += 1
+                    if e.response.status_code != 404 or page == start_page:
+                        raise
+                    # RAWG отвечает 404 на страницу за концом списка
+                    stop_after(page - 1)
+                    await page_done(page)
+                    return
+                except Exception:
+                    result.requests_used += 1
+                    raise
+            result.requests_used += 1
+            result.stages["pages"].mark()
+            result.pages_processed += 1
+            items = list_data.get("results", [])
+            if not list_data.get("next"):
+                stop_after(page)
+            fresh = []
+            for item in items:
+                updated_at = GameFactory.rawg_updated_at(item)
+                if stop_at and updated_at and updated_at <= stop_at:
+                    continue
+                fresh.append(item)
+                high_water_mark = result.high_water_mark
+                if updated_at and (high_water_mark is None or updated_at > high_water_mark):
+                    result.high_water_mark = updated_at
+            if len(fresh) < len(items):
+                # Список отсортирован по обновлению: дальше только известные игры
+                stop_after(page)
+            await write_queue.put(("page", (page, fresh)))
+
+        async def fetch_details() -> None:
+            while True:
+                item = await detail_queue.get()
+                if item is _DONE:
+                    return
+                if result.budget_exhausted:
+                    # Страница останется незавершенной и будет повторена при продолжении
+                    continue
+                game_id, rawg_id, page = item
+                result.stages["details"].start()
+                # 2 запроса: game + screenshots, одновременно
+                full_data, screenshots_data = responses = await asyncio.gather(
+                    self.rawg_client.fetch_game(rawg_id=rawg_id, purpose="sync_detail"),
+                    self.rawg_client.fetch_screenshots(rawg_id, purpose="sync_screenshots"),
+                    return_exceptions=True,
+                )
+                budget_errors = [r for r in responses if isinstance(r, BudgetExceededError)]
+                result.requests_used += len(responses) - len(budget_errors)
+                if budget_errors:
+                    stop_on_budget(budget_errors[0])
+                    continue
+                errors = [r for r in responses if isinstance(r, BaseException)]
+                if errors:
+                    # Ошибка деталей одной игры не прерывает синхронизацию
+                    log.error(f"Failed to load details for game {rawg_id}: {errors[0]}")
+                    result.details_failed += 1
+                    await detail_done(page)
+                    continue
+                full_data["short_screenshots"] = screenshots_data.get("results", [])
+                full_game = GameFactory.from_rawg(full_data)
+                full_game.id = game_id
+                result.stages["details"].mark()
+                await write_queue.put(("detail", (page, full_game)))
+
+        async def write() -> None:
+            nonlocal details_requested
+            while True:
+                # Забираем все, что уже накопилось: детали пишутся одной пачкой
+                items = [await write_queue.get()]
+                while len(items) < self.queue_size and not write_queue.empty():
+                    items.append(write_queue.get_nowait())
+                try:
+                    details = [payload for kind, payload in items if kind == "detail"]
+                    if details:
+                        saved_games = await self.game_repo.upsert_many(
+                            [g for _, g in details], outbox=self.outbox
+                        )
+                        for saved in saved_games:
+                            result.details_loaded += 1
+                            result.stages["write"].mark()
+                            if saved.written:
+                                await self.on_saved(saved)
+                        for page, _ in details:
+                            await detail_done(page)
+                    for kind, payload in items:
+                        if kind != "page":
+                            continue
+                        page, page_items = payload
+                        pending = await self._write_page(page_items, result, refresh_details)
+                        queued = 0
+                        for game in pending if load_details else []:
+                            if details_limit and details_requested >= details_limit:
+                                break
+                            details_requested += 1
+                            queued += 1
+                            detail_queue.put_nowait((game.id, game.rawg_id, page))
+                        if queued:
+                            outstanding[page] = queued
+                        else:
+                            await page_done(page)
+                    if any(kind == "done" for kind, _ in items):
+                        return
+                finally:
+                    for _ in items:
+                        write_queue.task_done()
+
+        writer = asyncio.create_task(write())
+        detail_workers = [
+            asyncio.create_task(fetch_details()) for _ in range(self.detail_concurrency)
+        ]
+        page_fetchers = [
+            asyncio.create_task(fetch_page(page)) for page in range(start_page, start_page + pages)
+        ]
+        tasks = [writer, *detail_workers, *page_fetchers]
+        try:
+            await self._wait(asyncio.gather(*page_fetchers), writer)
+            # Все страницы записаны - новых задач на детали больше не будет
+            await self._wait(write_queue.join(), writer)
+            for _ in detail_workers:
+                detail_queue.put_nowait(_DONE)
+            await self._wait(asyncio.gather(*detail_workers), writer)
+            await self._wait(write_queue.join(), writer)
+            await write_queue.put(("done", None))
+            await writer
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        result.elapsed_seconds = time.perf_counter() - started
+        return result
+
+    async def _write_page(
+        self, items: List[Dict[str, Any]], result: SyncResult, refresh_details: bool = False
+    ) -> List[Game]:
+        """
+        Записать краткую информацию об играх страницы одним upsert_many.
+        Возвращает игры, которым нужны детали: все, кроме игр с деталями (kept),
+        а при refresh_details - и их.
+        """
+        games = []
+        for game_data in items:
+            domain_game = GameFactory.from_rawg_list_item(game_data)
+            domain_game.id = str(domain_game.rawg_id) or domain_game.slug
+            games.append(domain_game)
+
+        # Игры с деталями не перезаписываются краткими данными
+        saved = await self.game_repo.upsert_many(games, keep_details=True, outbox=self.outbox)
+        for entry in saved:
+            if entry.status == "inserted":
+                result.new_games += 1
+            elif entry.status == "updated":
+                result.updated_games += 1
+            elif entry.status == "unchanged":
+                result.unchanged_games += 1
+            if entry.written:
+                await self.on_saved(entry)
+
+        result.total_synced += len(items)
+        result.stages["write"].mark(len(items))
+        return [entry.game for entry in saved if refresh_details or entry.status != "kept"]
+
+    @staticmethod
+    async def _wait(awaitable: Awaitable, writer: asyncio.Task) -> None:
+        """Дождаться стадии; если писатель упал - сразу пробросить его ошибку"""
+        waiter = asyncio.ensure_future(awaitable)
+        done, _ = await asyncio.wait({waiter, writer}, return_when=asyncio.FIRST_COMPLETED)
+        if waiter in done:
+            waiter.result()
+            return
+        # Писатель завершился раньше времени - только с ошибкой
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        writer.result()
+        raise RuntimeError("sync writer stopped unexpectedly")
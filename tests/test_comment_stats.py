@@ -0,0 +1,78 @@
+import asyncio
+
+from game_service.services import comment_stats as comment_stats_module
+from game_service.services.comment_stats import CommentStatsAggregator
+
+
+class FakeSession:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakeStats:
+    """game_stats в памяти; игры вне known считаются неизвестными"""
+
+    def __init__(self, known):
+        self.counts = {}
+        self.known = known
+
+    def repository(self, session):
+        stats = self
+
+        class Repository:
+            async def apply_comment_deltas(self, deltas):
+                updated = [game_id for game_id in deltas if game_id in stats.known]
+                for game_id in updated:
+                    stats.counts[game_id] = max(stats.counts.get(game_id, 0) + deltas[game_id], 0)
+                return updated
+
+        return Repository()
+
+
+def test_flush_writes_net_deltas_and_notifies(monkeypatch):
+    stats = FakeStats(known={"1", "2"})
+    monkeypatch.setattr(comment_stats_module, "SQLGameStatsRepository", stats.repository)
+    flushed = []
+
+    async def on_flushed(game_ids):
+        flushed.append(sorted(game_ids))
+
+    async def scenario():
+        aggregator = CommentStatsAggregator(FakeSession, on_flushed=on_flushed)
+        waiters = [
+            aggregator.record("1", 1),
+            aggregator.record("1", 1),
+            aggregator.record("2", 1),
+            aggregator.record("2", -1),
+            aggregator.record("unknown", 1),
+        ]
+        assert await aggregator.flush() == 5
+        assert all(waiter.done() for waiter in waiters)
+        return aggregator
+
+    aggregator = asyncio.run(scenario())
+    # +1 и -1 игры 2 погасились - ее не пишем и не сбрасываем
+    assert stats.counts == {"1": 2}
+    assert flushed == [["1"]]
+    assert aggregator.stats()["games_written"] == 1
+
+
+def test_failed_callback_does_not_fail_flush(monkeypatch):
+    stats = FakeStats(known={"1"})
+    monkeypatch.setattr(comment_stats_module, "SQLGameStatsRepository", stats.repository)
+
+    async def on_flushed(game_ids):
+        raise RuntimeError("broker is down")
+
+    async def scenario():
+        aggregator = CommentStatsAggregator(FakeSession, on_flushed=on_flushed)
+        waiter = aggregator.record("1", 1)
+        assert await aggregator.flush() == 1
+        return waiter
+
+    waiter = asyncio.run(scenario())
+    assert waiter.done() and waiter.exception() is None
+    assert stats.counts == {"1": 1}
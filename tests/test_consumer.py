@@ -0,0 +1,181 @@
+import asyncio
+import json
+
+import pytest
+
+from game_service.core.config import Settings
+from game_service.mq.consumer import EventConsumer
+
+
+class FakeMessage:
+    def __init__(self, delivery_tag: int, **event):
+        self.delivery_tag = delivery_tag
+        self.body = json.dumps(event).encode()
+        self.message_id = None
+        self.routing_key = "games.game_updated"
+        self.timestamp = None
+        self.acked = None
+        self.rejected = False
+
+    async def ack(self, multiple: bool = False):
+        self.acked = multiple
+
+    async def reject(self, requeue: bool = False):
+        self.rejected = True
+
+
+class FakeQueue:
+    """Выдает сообщения, затем ждет, пока сценарий не разрешит остановиться"""
+
+    def __init__(self, messages, until):
+        self.messages = messages
+        self.until = until
+
+    def iterator(self):
+        queue = self
+
+        class Iterator:
+            async def __aenter__(self):
+                return self
+
+            async def __aexit__(self, *exc):
+                return False
+
+            async def __aiter__(self):
+                for message in queue.messages:
+                    yield message
+                await queue.until()
+
+        return Iterator()
+
+
+def make_consumer(concurrency: int = 1) -> EventConsumer:
+    return EventConsumer(
+        Settings(
+            consumer_concurrency=concurrency,
+            consumer_dedupe_enabled=False,
+            consumer_ack_batch_size=100,
+            consumer_ack_interval=0.01,
+        )
+    )
+
+
+async def wait_for(condition, timeout: float = 2.0):
+    async def poll():
+        while not condition():
+            await asyncio.sleep(0.005)
+
+    await asyncio.wait_for(poll(), timeout)
+
+
+def test_flush_acks_only_settled_prefix():
+    consumer = make_consumer()
+    messages = [FakeMessage(tag) for tag in range(1, 5)]
+    consumer._unacked.extend(messages)
+    consumer._settled.update({messages[0]: True, messages[1]: False, messages[3]: True})
+
+    asyncio.run(consumer._flush_acks())
+
+    # Третье еще в обработке: подтверждаем до первого, второе уже отклонено
+    assert messages[0].acked is True
+    assert [m.acked for m in messages[1:]] == [None, None, None]
+    assert list(consumer._unacked) == messages[2:]
+    assert consumer._settled == {messages[3]: True}
+
+    consumer._settled[messages[2]] = True
+    asyncio.run(consumer._flush_acks())
+    assert messages[3].acked is True
+    assert messages[2].acked is None
+    assert not consumer._unacked
+    assert consumer.metrics.ack_batches == 2
+
+
+def test_flush_acks_skips_ack_when_prefix_rejected():
+    consumer = make_consumer()
+    message = FakeMessage(1)
+    consumer._unacked.append(message)
+    consumer._settled[message] = False
+
+    asyncio.run(consumer._flush_acks())
+
+    assert message.acked is None
+    assert not consumer._unacked
+    assert consumer.metrics.ack_batches == 0
+
+
+def test_single_lane_does_not_block_on_deferred_outcome():
+    consumer = make_consumer(concurrency=1)
+    messages = [FakeMessage(tag, event_type="game_updated", game_id=str(tag)) for tag in (1, 2)]
+    seen = []
+
+    async def scenario():
+        deferred = asyncio.get_running_loop().create_future()
+
+        async def handler(event):
+            seen.append(event["game_id"])
+            return deferred if event["game_id"] == "1" else None
+
+        async def until():
+            # Второе сообщение обработано, пока первое ждет отложенную запись
+            await wait_for(lambda: seen == ["1", "2"])
+            await asyncio.sleep(0.03)
+            assert [m.acked for m in messages] == [None, None]
+            deferred.set_result(None)
+            await wait_for(lambda: not consumer._unacked)
+
+        consumer.register_handler("game_updated", handler)
+        await consumer._consume(FakeQueue(messages, until))
+
+    asyncio.run(scenario())
+    assert messages[0].acked is None
+    assert messages[1].acked is True
+
+
+def test_failed_deferred_outcome_is_rejected():
+    consumer = make_consumer(concurrency=1)
+    messages = [FakeMessage(tag, event_type="game_updated", game_id=str(tag)) for tag in (1, 2)]
+
+    async def scenario():
+        async def handler(event):
+            future = asyncio.get_running_loop().create_future()
+            if event["game_id"] == "1":
+                future.set_exception(RuntimeError("write failed"))
+            else:
+                future.set_result(None)
+            return future
+
+        consumer.register_handler("game_updated", handler)
+        await consumer._consume(
+            FakeQueue(messages, lambda: wait_for(lambda: not consumer._unacked))
+        )
+
+    asyncio.run(scenario())
+    assert messages[0].rejected
+    assert messages[1].acked is True
+    assert consumer.metrics.failed == 1
+
+
+@pytest.mark.parametrize("concurrency", [1, 4])
+def test_events_of_one_entity_keep_order(concurrency):
+    consumer = make_consumer(concurrency)
+    messages = [
+        FakeMessage(tag, event_type="game_updated", game_id=str(tag % 3), seq=tag)
+        for tag in range(1, 31)
+    ]
+    order = {}
+
+    async def scenario():
+        async def handler(event):
+            # Поздние события быстрее ранних: без полос порядок бы нарушился
+            await asyncio.sleep(0.001 * (31 - event["seq"]) / 10)
+            order.setdefault(event["game_id"], []).append(event["seq"])
+
+        consumer.register_handler("game_updated", handler)
+        await consumer._consume(
+            FakeQueue(messages, lambda: wait_for(lambda: not consumer._unacked))
+        )
+
+    asyncio.run(scenario())
+    assert order == {key: sorted(seqs) for key, seqs in order.items()}
+    assert sum(map(len, order.values())) == 30
+    assert messages[-1].acked is True
@@ -0,0 +1,47 @@
+import base64
+import json
+
+import pytest
+
+from game_service.domain.models import PageCursor
+from game_service.services.cursors import InvalidCursorError, decode_cursor, encode_cursor
+
+
+def _raw(payload) -> str:
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        PageCursor(rating=4.48, game_id="grand-theft-auto-v"),
+        PageCursor(rating=0.0, game_id="123", backward=True),
+        PageCursor(rating=3.5, game_id="игра/с?символами=&"),
+    ],
+)
+def test_round_trip(cursor):
+    assert decode_cursor(encode_cursor(cursor)) == cursor
+
+
+def test_encoded_cursor_is_url_safe():
+    value = encode_cursor(PageCursor(rating=4.0, game_id="a" * 50))
+    assert "=" not in value
+    assert set(value) <= set("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_")
+
+
+@pytest.mark.parametrize(
+    "value",
+    [
+        "",
+        "not base64 at all!",
+        base64.urlsafe_b64encode(b"not json").decode(),
+        _raw({"rating": 4.0, "game_id": "x"}),
+        _raw([4.0, "x"]),
+        _raw([4.0, "x", 0, "extra"]),
+        _raw([None, "x", 0]),
+        _raw(["high", "x", 0]),
+    ],
+)
+def test_tampered_cursor_is_rejected(value):
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(value)
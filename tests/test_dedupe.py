@@ -0,0 +1,131 @@
+import pytest
+
+from game_service.core.config import Settings
+from game_service.mq import dedupe as dedupe_module
+from game_service.mq.consumer import EventConsumer
+from game_service.mq.dedupe import BloomFilter, EventDeduplicator
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Общие часы для monotonic (LRU) и time (поколения фильтра)"""
+    now = [1000.0]
+    monkeypatch.setattr(dedupe_module.time, "monotonic", lambda: now[0])
+    monkeypatch.setattr(dedupe_module.time, "time", lambda: now[0])
+    return now
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(capacity=1000, error_rate=1e-4)
+    keys = [f"event-{i}" for i in range(1000)]
+    for key in keys:
+        bloom.add(key)
+    assert all(key in bloom for key in keys)
+    assert sum(f"other-{i}" in bloom for i in range(10000)) < 10
+    bloom.clear()
+    assert "event-1" not in bloom
+    assert bloom.count == 0
+
+
+def test_claim_commit_release(clock):
+    dedupe = EventDeduplicator(max_entries=10, ttl=60)
+
+    assert dedupe.claim("a")
+    # Повтор, пока первая доставка в обработке, тоже пропускается
+    assert not dedupe.claim("a")
+    dedupe.commit("a")
+    assert not dedupe.claim("a")
+
+    assert dedupe.claim("b")
+    dedupe.release("b")
+    assert dedupe.claim("b")
+    assert dedupe.stats()["duplicates"] == 2
+
+
+def test_recent_ids_expire_and_are_bounded(clock):
+    dedupe = EventDeduplicator(max_entries=2, ttl=60)
+    for event_id in ("a", "b", "c"):
+        assert dedupe.claim(event_id)
+    # "a" вытеснено из LRU, фильтра Блума нет - снова новое
+    assert dedupe.claim("a")
+
+    clock[0] += 61
+    assert dedupe.claim("c")
+    assert dedupe.stats()["recent"] == 1
+
+
+def test_bloom_survives_restart(tmp_path, clock):
+    path = str(tmp_path / "dedupe.bloom")
+    dedupe = EventDeduplicator(max_entries=100, ttl=60, bloom_path=path)
+    for event_id in ("a", "b"):
+        dedupe.claim(event_id)
+        dedupe.commit(event_id)
+    dedupe.claim("pending")
+    dedupe.save()
+
+    restarted = EventDeduplicator(max_entries=100, ttl=60, bloom_path=path)
+    assert not restarted.claim("a")
+    assert not restarted.claim("b")
+    # Не подтвержденное до рестарта событие обрабатывается заново
+    assert restarted.claim("pending")
+    assert restarted.stats()["bloom_hits"] == 2
+    assert restarted.stats()["bloom_entries"] == 2
+
+
+@pytest.mark.parametrize("content", [b"", b"garbage", None])
+def test_incompatible_file_is_ignored(tmp_path, clock, content):
+    path = tmp_path / "dedupe.bloom"
+    if content is None:
+        # Файл от другого размера фильтра
+        other = EventDeduplicator(max_entries=10, ttl=60, bloom_path=str(path))
+        other.claim("a")
+        other.commit("a")
+        other.save()
+    else:
+        path.write_bytes(content)
+
+    dedupe = EventDeduplicator(max_entries=100, ttl=60, bloom_path=str(path))
+    assert dedupe.claim("a")
+    assert dedupe.stats()["bloom_entries"] == 0
+
+
+def test_generations_rotate_after_ttl(tmp_path, clock):
+    dedupe = EventDeduplicator(max_entries=100, ttl=60, bloom_path=str(tmp_path / "d.bloom"))
+    dedupe.claim("old")
+    dedupe.commit("old")
+
+    # Новое поколение: "old" еще помнит предыдущее
+    clock[0] += 61
+    dedupe.claim("new")
+    dedupe.commit("new")
+    dedupe.release("old")
+    assert not dedupe.claim("old")
+
+    # Еще одна ротация: поколение с "old" очищено
+    clock[0] += 61
+    dedupe.claim("newer")
+    dedupe.commit("newer")
+    dedupe.release("old")
+    dedupe.release("new")
+    assert dedupe.claim("old")
+    assert not dedupe.claim("new")
+
+
+def test_generation_rotates_when_full(tmp_path, clock):
+    dedupe = EventDeduplicator(max_entries=2, ttl=60, bloom_path=str(tmp_path / "d.bloom"))
+    for event_id in ("a", "b", "c", "d", "e"):
+        dedupe.claim(event_id)
+        dedupe.commit(event_id)
+    # Поколения по 2 события: помним последние 3-4, самое старое забыто
+    assert dedupe.stats()["bloom_entries"] == 3
+    assert dedupe.claim("a")
+    assert not dedupe.claim("e")
+
+
+def test_bloom_path_is_per_host():
+    consumer = EventConsumer(
+        Settings(consumer_dedupe_bloom_path="data/dedupe-{hostname}.bloom", hostname="replica-1")
+    )
+    assert consumer.dedupe.bloom_path == "data/dedupe-replica-1.bloom"
+    consumer = EventConsumer(Settings(consumer_dedupe_bloom_path=""))
+    assert consumer.dedupe.bloom_path is None
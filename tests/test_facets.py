@@ -0,0 +1,192 @@
+import asyncio
+import random
+from datetime import date
+from types import SimpleNamespace
+
+import pytest
+
+from game_service.services.facets import FACETS, FacetDocument, FacetIndex
+
+PLATFORMS = {1: "PC", 2: "PlayStation 5", 3: "Xbox Series S/X", 4: "Nintendo Switch"}
+GENRES = {10: "Action", 11: "RPG", 12: "Indie"}
+AGE_RATINGS = ["Everyone", "Everyone 10+", "Teen", "Mature", None]
+
+# Какие фильтры относятся к каждому фасету (их не учитывают счетчики самого фасета)
+FACET_FILTERS = {
+    "platforms": {"platform", "platform_id"},
+    "genres": {"genre", "genre_id"},
+    "age_ratings": {"age_rating"},
+    "years": {"year_from", "year_to"},
+}
+
+
+def make_documents(count: int, seed: int = 7) -> list[FacetDocument]:
+    rnd = random.Random(seed)
+    documents = []
+    for i in range(count):
+        platforms = rnd.sample(sorted(PLATFORMS), rnd.randint(0, 3))
+        genres = rnd.sample(sorted(GENRES), rnd.randint(0, 2))
+        documents.append(
+            FacetDocument(
+                game_id=f"game-{i}",
+                rating=rnd.choice([None, round(rnd.uniform(0, 5), 2)]),
+                release_date=rnd.choice([None, date(rnd.randint(2000, 2024), 6, 1)]),
+                age_rating=rnd.choice(AGE_RATINGS),
+                platforms={k: PLATFORMS[k] for k in platforms},
+                genres={k: GENRES[k] for k in genres},
+            )
+        )
+    return documents
+
+
+def sql_matches(document: FacetDocument, filters: dict) -> bool:
+    """Семантика _apply_filters из SQLGameRepository"""
+    if filters.get("platform_id") is not None:
+        if filters["platform_id"] not in document.platforms:
+            return False
+    elif filters.get("platform"):
+        names = {name.lower() for name in document.platforms.values()}
+        if filters["platform"].lower() not in names:
+            return False
+    if filters.get("genre_id") is not None:
+        if filters["genre_id"] not in document.genres:
+            return False
+    elif filters.get("genre"):
+        names = {name.lower() for name in document.genres.values()}
+        if filters["genre"].lower() not in names:
+            return False
+    if filters.get("age_rating"):
+        if not document.age_rating:
+            return False
+        if filters["age_rating"].lower() not in document.age_rating.lower():
+            return False
+    released = document.release_date
+    if filters.get("year_from") and not (released and released >= date(filters["year_from"], 1, 1)):
+        return False
+    if filters.get("year_to") and not (released and released <= date(filters["year_to"], 12, 31)):
+        return False
+    rating = document.rating
+    if filters.get("rating_from") is not None and not (
+        rating is not None and rating >= filters["rating_from"]
+    ):
+        return False
+    if filters.get("rating_to") is not None and not (
+        rating is not None and rating <= filters["rating_to"]
+    ):
+        return False
+    return True
+
+
+def expected_counts(documents: list[FacetDocument], filters: dict, allowed=None):
+    """Счетчики перебором; allowed - id игр, уже отобранных вне индекса (candidates)"""
+    pool = [d for d in documents if allowed is None or d.game_id in allowed]
+    total = sum(sql_matches(d, filters) for d in pool)
+    counts = {}
+    for facet in FACETS:
+        scope_filters = {k: v for k, v in filters.items() if k not in FACET_FILTERS[facet]}
+        scope = [d for d in pool if sql_matches(d, scope_filters)]
+        values = sorted({value for d in documents for value in d.values()[facet]})
+        counts[facet] = {value: sum(value in d.values()[facet] for d in scope) for value in values}
+    return total, counts
+
+
+@pytest.fixture(scope="module")
+def documents():
+    return make_documents(500)
+
+
+@pytest.fixture(scope="module")
+def index(documents):
+    index = FacetIndex()
+    index.rebuild(documents)
+    return index
+
+
+@pytest.mark.parametrize(
+    "filters",
+    [
+        {},
+        {"platform": "pc"},
+        {"platform_id": 2},
+        {"platform_id": 999},
+        {"genre": "RPG", "platform": "Nintendo Switch"},
+        {"genre_id": 12, "age_rating": "everyone"},
+        {"age_rating": "teen", "year_from": 2010},
+        {"year_from": 2005, "year_to": 2015},
+        {"rating_from": 3.5},
+        {"rating_from": 1.25, "rating_to": 2.5, "platform": "Xbox Series S/X"},
+        {"year_to": 2003, "genre": "action", "rating_to": 4.0},
+    ],
+)
+def test_counts_match_sql_filters(documents, index, filters):
+    assert index.counts(**filters) == expected_counts(documents, filters)
+
+
+@pytest.mark.parametrize("filters", [{}, {"platform": "PC", "year_from": 2012}])
+def test_candidates_restrict_counts(documents, index, filters):
+    allowed = {d.game_id for d in documents if d.game_id.endswith("7")} | {"unknown-game"}
+    candidates = index.bitmap_for(allowed)
+    assert index.counts(candidates=candidates, **filters) == expected_counts(
+        documents, filters, allowed
+    )
+
+
+def test_upsert_replaces_document(documents):
+    index = FacetIndex()
+    index.rebuild(documents)
+    changed = FacetDocument(
+        game_id=documents[0].game_id,
+        rating=4.99,
+        release_date=date(2030, 1, 1),
+        age_rating="Mature",
+        platforms={1: "PC"},
+        genres={},
+    )
+    index.upsert(changed)
+    updated = [changed, *documents[1:]]
+    assert len(index) == len(documents)
+    for filters in ({}, {"year_from": 2030}, {"platform": "PC", "rating_from": 4.9}):
+        assert index.counts(**filters) == expected_counts(updated, filters)
+
+
+def test_rebuild_matches_incremental_upserts(documents):
+    rebuilt = FacetIndex()
+    rebuilt.rebuild(documents)
+    incremental = FacetIndex()
+    for document in documents:
+        incremental.upsert(document)
+    for filters in ({}, {"genre": "Indie"}, {"rating_to": 2.0, "age_rating": "e"}):
+        assert rebuilt.counts(**filters) == incremental.counts(**filters)
+
+
+def test_rebuild_keeps_last_duplicate():
+    first = FacetDocument(game_id="1", genres={10: "Action"})
+    second = FacetDocument(game_id="1", genres={11: "RPG"})
+    index = FacetIndex()
+    index.rebuild([first, second])
+    assert len(index) == 1
+    assert index.counts()[1]["genres"] == {"RPG": 1}
+
+
+def test_load_builds_from_repository_rows(documents):
+    class Repo:
+        async def iter_facet_rows(self):
+            for start in range(0, len(documents), 100):
+                yield [
+                    SimpleNamespace(
+                        id=d.game_id,
+                        rating=d.rating,
+                        release_date=d.release_date,
+                        age_rating=d.age_rating,
+                        platform_ids=list(d.platforms),
+                        platform_names=list(d.platforms.values()),
+                        genre_ids=list(d.genres),
+                        genre_names=list(d.genres.values()),
+                    )
+                    for d in documents[start : start + 100]
+                ]
+
+    index = FacetIndex()
+    asyncio.run(index.load(Repo()))
+    assert index.ready
+    assert index.counts(genre="RPG") == expected_counts(documents, {"genre": "RPG"})
@@ -0,0 +1,99 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from game_service.dtos.http import GameDetailResponse
+from game_service.services import game_cache as game_cache_module
+from game_service.services.game_cache import GameDetailCache
+
+
+def make_game(game_id: str, slug: str | None = None) -> GameDetailResponse:
+    now = datetime(2024, 11, 20, tzinfo=timezone.utc)
+    return GameDetailResponse(
+        id=game_id,
+        name=game_id,
+        slug=slug or f"{game_id}-slug",
+        description=None,
+        metacritic=None,
+        rating=None,
+        release_date=None,
+        developer=None,
+        publisher=None,
+        background_image=None,
+        website=None,
+        playtime=None,
+        age_rating=None,
+        platforms=[],
+        genres=[],
+        tags=[],
+        screenshots=[],
+        created_at=now,
+        updated_at=now,
+    )
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(game_cache_module.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_get_by_id_and_slug():
+    cache = GameDetailCache()
+    game = make_game("1", "gta-v")
+    cache.put(game)
+
+    assert cache.get("1") is game
+    assert cache.get("gta-v") is game
+    assert cache.get("missing") is None
+    assert cache.stats()["hits"] == 2
+    assert cache.stats()["misses"] == 1
+
+
+def test_entry_expires_after_ttl(clock):
+    cache = GameDetailCache(ttl=10)
+    cache.put(make_game("1", "gta-v"))
+
+    clock[0] += 9
+    assert cache.get("gta-v") is not None
+    clock[0] += 2
+    assert cache.get("gta-v") is None
+    assert cache.get("1") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_least_recently_used_is_evicted():
+    cache = GameDetailCache(maxsize=2)
+    cache.put(make_game("1"))
+    cache.put(make_game("2"))
+    cache.get("1")
+    cache.put(make_game("3"))
+
+    assert cache.get("2") is None
+    assert cache.get("2-slug") is None
+    assert cache.get("1") is not None
+    assert cache.get("3") is not None
+    assert cache.stats()["evictions"] == 1
+
+
+@pytest.mark.parametrize("kwargs", [{"game_id": "1"}, {"slug": "gta-v"}])
+def test_invalidate_by_either_key_removes_both(kwargs):
+    cache = GameDetailCache()
+    cache.put(make_game("1", "gta-v"))
+
+    cache.invalidate(**kwargs)
+
+    assert cache.get("1") is None
+    assert cache.get("gta-v") is None
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_renamed_slug_drops_old_mapping():
+    cache = GameDetailCache()
+    cache.put(make_game("1", "old-slug"))
+    cache.put(make_game("1", "new-slug"))
+
+    assert cache.get("old-slug") is None
+    assert cache.get("new-slug").slug == "new-slug"
+    assert cache.stats()["size"] == 1
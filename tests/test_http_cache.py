@@ -0,0 +1,45 @@
+from datetime import datetime, timezone
+
+import pytest
+from starlette.requests import Request
+
+from game_service.api.http_cache import is_not_modified, make_etag
+
+LAST_MODIFIED = datetime(2024, 11, 20, 21, 0, 0, 500000, tzinfo=timezone.utc)
+ETAG = make_etag("game", "1", LAST_MODIFIED)
+
+
+def request(**headers: str) -> Request:
+    raw = [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()]
+    return Request({"type": "http", "method": "GET", "headers": raw})
+
+
+@pytest.mark.parametrize(
+    "header, expected",
+    [
+        ("Wed, 20 Nov 2024 21:00:00 GMT", True),
+        ("Wed, 20 Nov 2024 20:59:59 GMT", False),
+        ("Wed, 20 Nov 2024 21:00:00 -0000", True),
+        ("Wed, 20 Nov 2024 20:59:59 -0000", False),
+        ("Wed, 20 Nov 2024 23:00:00 +0200", True),
+        ("not a date", False),
+        ("Wed, 20 Nov 2024", False),
+    ],
+)
+def test_if_modified_since(header, expected):
+    assert is_not_modified(request(if_modified_since=header), ETAG, LAST_MODIFIED) is expected
+
+
+def test_naive_last_modified_is_utc():
+    naive = LAST_MODIFIED.replace(tzinfo=None)
+    headers = request(if_modified_since="Wed, 20 Nov 2024 21:00:00 -0000")
+    assert is_not_modified(headers, ETAG, naive)
+
+
+@pytest.mark.parametrize(
+    "header, expected",
+    [(ETAG, True), (f'"other", W/{ETAG}', True), ("*", True), ('"other"', False)],
+)
+def test_if_none_match_wins_over_if_modified_since(header, expected):
+    headers = request(if_none_match=header, if_modified_since="Wed, 20 Nov 2030 00:00:00 GMT")
+    assert is_not_modified(headers, ETAG, LAST_MODIFIED) is expected
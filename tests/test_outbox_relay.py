@@ -0,0 +1,115 @@
+import asyncio
+
+import pytest
+
+from game_service.domain.repositories import OutboxEvent
+from game_service.services import outbox_relay as outbox_relay_module
+from game_service.services.outbox_relay import OutboxRelay
+
+
+class FakeSession:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakeOutbox:
+    """event_outbox в памяти: id -> [attempts, failed]; отложенные события не берутся"""
+
+    def __init__(self, attempts):
+        self.rows = {i: [n, False] for i, n in enumerate(attempts, start=1)}
+        self.postponed = set()
+
+    def repository(self, session):
+        outbox = self
+
+        class Repository:
+            async def claim(self, limit):
+                return [
+                    OutboxEvent(id=i, event_type="game_updated", payload={"id": i}, attempts=n)
+                    for i, (n, failed) in sorted(outbox.rows.items())
+                    if not failed and i not in outbox.postponed
+                ][:limit]
+
+            async def settle(
+                self, published, failed, *, dead=(), postponed=(), error=None, retry_at=None
+            ):
+                for i in published:
+                    del outbox.rows[i]
+                for i in failed:
+                    outbox.rows[i][0] += 1
+                for i in dead:
+                    outbox.rows[i] = [outbox.rows[i][0] + 1, True]
+                outbox.postponed.update(postponed)
+
+            async def count(self, *, dead=False):
+                return sum(failed is dead for _, failed in outbox.rows.values())
+
+        return Repository()
+
+
+class FakePublisher:
+    """nacked_ids брокер отклоняет; при down=True события не подтверждаются (нет связи)"""
+
+    def __init__(self, nacked_ids=(), down=False, connected=True):
+        self.nacked_ids = set(nacked_ids)
+        self.down = down
+        self.connected = connected
+        self.calls = 0
+
+    async def publish_payloads(self, payloads, nacked=None):
+        self.calls += 1
+        if self.down:
+            return list(range(len(payloads)))
+        failed = [i for i, payload in enumerate(payloads) if payload["id"] in self.nacked_ids]
+        if nacked is not None:
+            nacked.extend(failed)
+        return failed
+
+
+@pytest.fixture
+def outbox(monkeypatch):
+    outbox = FakeOutbox(attempts=[0, 1, 2])
+    monkeypatch.setattr(outbox_relay_module, "SQLEventOutboxRepository", outbox.repository)
+    return outbox
+
+
+def test_rejected_events_are_marked_failed_after_max_attempts(outbox):
+    relay = OutboxRelay(FakeSession, FakePublisher(nacked_ids={2, 3}), max_attempts=3)
+
+    assert asyncio.run(relay.relay_once()) == 3
+    # 1 опубликовано, 2 отложено (попытка 2 из 3), 3 исчерпало попытки
+    assert outbox.rows == {2: [2, False], 3: [3, True]}
+
+    assert asyncio.run(relay.relay_once()) == 1
+    assert outbox.rows == {2: [3, True], 3: [3, True]}
+    assert asyncio.run(relay.relay_once()) == 0
+
+    stats = asyncio.run(relay.stats())
+    assert stats["pending"] == 0
+    assert stats["dead_total"] == 2
+    assert (stats["relayed"], stats["failed"], stats["dead"]) == (1, 3, 2)
+
+
+def test_broker_outage_does_not_spend_attempts(outbox):
+    publisher = FakePublisher(down=True)
+    relay = OutboxRelay(FakeSession, publisher, max_attempts=3, max_retry_delay=20)
+
+    # Брокер недоступен дольше, чем хватило бы max_attempts попыток
+    for _ in range(10):
+        assert asyncio.run(relay.relay_once()) == 0
+        outbox.postponed.clear()
+    assert outbox.rows == {1: [0, False], 2: [1, False], 3: [2, False]}
+    assert relay.postponed == 30
+    assert relay.dead == 0
+
+    publisher.connected = False
+    assert asyncio.run(relay.relay_once()) == 0
+    assert publisher.calls == 10
+
+    publisher.down, publisher.connected = False, True
+    assert asyncio.run(relay.relay_once()) == 3
+    assert outbox.rows == {}
+    assert relay.relayed == 3
@@ -0,0 +1,101 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from game_service.services import rawg_budget as rawg_budget_module
+from game_service.services.rawg_budget import RAWGBudget
+
+OCTOBER = datetime(2026, 10, 1, tzinfo=timezone.utc)
+NOVEMBER = datetime(2026, 11, 1, tzinfo=timezone.utc)
+
+
+class FakeSession:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakeLedger:
+    """Журнал rawg_quota в памяти: строки (recorded_at, purpose, requests, failed)"""
+
+    def __init__(self):
+        self.rows = []
+        self.now = OCTOBER
+
+    def repository(self, session):
+        ledger = self
+
+        class Repository:
+            async def record_usage(self, usage, recorded_at=None):
+                for purpose, (requests, failed) in usage.items():
+                    if requests or failed:
+                        ledger.rows.append((recorded_at or ledger.now, purpose, requests, failed))
+
+            async def usage_since(self, since):
+                usage = {}
+                for recorded_at, purpose, requests, failed in ledger.rows:
+                    if since is None or recorded_at >= since:
+                        r, f = usage.get(purpose, (0, 0))
+                        usage[purpose] = (r + requests, f + failed)
+                return usage
+
+        return Repository()
+
+
+@pytest.fixture
+def ledger(monkeypatch):
+    ledger = FakeLedger()
+    monkeypatch.setattr(rawg_budget_module, "SQLQuotaRepository", ledger.repository)
+    return ledger
+
+
+def make_budget(ledger, monkeypatch) -> RAWGBudget:
+    monkeypatch.setattr(
+        RAWGBudget,
+        "_current_period_start",
+        lambda self: ledger.now.replace(day=1, hour=0, minute=0, second=0, microsecond=0),
+    )
+    return RAWGBudget(FakeSession, budget=100, reserve=10, rate=1000, burst=1000)
+
+
+def test_unflushed_usage_stays_in_previous_period(ledger, monkeypatch):
+    async def scenario():
+        budget = make_budget(ledger, monkeypatch)
+        for _ in range(3):
+            await budget.acquire("sync_list")
+        budget.record_failure("sync_list")
+
+        ledger.now = NOVEMBER + timedelta(hours=1)
+        await budget.acquire("search")
+        assert budget.used == 1
+
+        await budget.flush()
+        assert budget.used == 1
+        return budget
+
+    budget = asyncio.run(scenario())
+    assert sorted(ledger.rows) == [
+        (NOVEMBER - timedelta(microseconds=1), "sync_list", 3, 1),
+        (NOVEMBER + timedelta(hours=1), "search", 1, 0),
+    ]
+    assert budget.snapshot()["by_purpose"] == {"search": {"requests": 1, "failed": 0}}
+
+
+def test_reserve_is_kept_for_point_requests(ledger, monkeypatch):
+    async def scenario():
+        budget = make_budget(ledger, monkeypatch)
+        for _ in range(90):
+            await budget.acquire("sync_detail")
+        with pytest.raises(rawg_budget_module.BudgetExceededError):
+            await budget.acquire("sync_detail")
+        await budget.acquire("search")
+        await budget.flush()
+        return budget
+
+    budget = asyncio.run(scenario())
+    assert budget.used == 91
+    assert budget.available_for_sync == 0
+    assert budget.remaining == 9